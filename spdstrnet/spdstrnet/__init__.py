@@ -5,8 +5,16 @@ __date__ = "2022-04-16"
 __author__ = "Diogo André Silvares Dias"
 __annotations__ = ""
 
+from .store import *
 from .geometry import *
+from .index import *
+from .manhattan import *
+from .fragment import *
 from .net import *
+from .tiling import *
+from .hierarchy import *
+from .roi import *
+from .stream import *
 
 def verboseInfo():
     print("Version      : {} ({})".format(__version__, __date__))
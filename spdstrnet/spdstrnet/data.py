@@ -34,6 +34,8 @@ class SpeedsterPort(object):
         "resistance",
         "location",
         "width",
+        "x",
+        "y",
     ]
     def __init__(
         self, 
@@ -257,9 +259,134 @@ class SpeedsterResMap(object):
 # TODO : Develop a SpeedsterLayoutResistanceMap to save the
 # resistance map of a GdsCell representing a net
 
-# TODO : Develop a SpeedsterConnectionGraph to save
-# connections between polygons of the same and of different layers
-# treating polygons and vias as nodes and the connections as edges
+class SpeedsterConnectionGraph(object):
+    """_summary_
+    Connection graph between the polygons of the
+    metal and via layers of a layout, treating polygons 
+    and vias as nodes and their contacts as edges.
+    The adjacency is stored in compressed sparse row (CSR)
+    format, and the nets are the connected components of the graph
+    """
+    __slots__ = [
+        "indptr",
+        "indices",
+        "contacts",
+        "layers",
+        "layerKeys",
+        "boxes",
+        "polygons",
+        "labels",
+        "netOrder",
+        "netStarts",
+    ]
+
+    def __init__(
+        self,
+        edges: np.array,
+        layers: np.array,
+        layerKeys: list = [],
+        boxes: np.array = None,
+        polygons: list = None,
+    ):
+        """_summary_
+        Builds the CSR adjacency of the graph
+        Args:
+            edges       (np.array)  : (E, 2) array of connected node pairs (e.g. metal-via contacts)
+            layers      (np.array)  : (N,) array with the index of the layer (in layerKeys) of each node
+            layerKeys   (list)      : list of the (layer, datatype) tuples of the layer stack
+            boxes       (np.array)  : (N, 4) array with the bounding box of each node
+            polygons    (list)      : list with the polygon of each node
+        """
+        self.layers = np.asarray(layers, dtype = np.int64)
+        self.layerKeys = list(layerKeys)
+        self.boxes = boxes
+        self.polygons = polygons
+        n = len(self.layers)
+        edges = np.asarray(edges, dtype = np.int64).reshape(-1, 2)
+        self.contacts = edges
+        # store each edge in both directions
+        src = np.concatenate([edges[:, 0], edges[:, 1]])
+        dst = np.concatenate([edges[:, 1], edges[:, 0]])
+        order = np.argsort(src, kind = "stable")
+        self.indices = dst[order]
+        self.indptr = np.zeros(n + 1, dtype = np.int64)
+        np.cumsum(np.bincount(src, minlength = n), out = self.indptr[1:])
+        self.labels = None
+        self.netOrder = None
+        self.netStarts = None
+
+    def __len__(self) -> int:
+        return len(self.layers)
+
+    def __str__(self) -> str:
+        return "Connection Graph: {} nodes, {} edges".format(len(self), len(self.indices) // 2)
+
+    def neighbours(self, node: int) -> np.array:
+        """_summary_
+        Gets the nodes connected to the given node
+        Args:
+            node (int): node identifier
+        Returns:
+            np.array: identifiers of the neighbour nodes
+        """
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def connected_components(self) -> np.array:
+        """_summary_
+        Labels the connected components of the graph
+        through vectorized hooking and pointer jumping.
+        The result is cached, since the graph is immutable
+        Returns:
+            np.array: (N,) array with the net label of each node,
+                      numbered by order of the smallest node of each net
+        """
+        if self.labels is not None:
+            return self.labels
+        n = len(self)
+        parent = np.arange(n, dtype = np.int64)
+        src = np.repeat(np.arange(n, dtype = np.int64), np.diff(self.indptr))
+        dst = self.indices
+        while True:
+            ps = parent[src]
+            pd = parent[dst]
+            mask = ps != pd
+            if not mask.any():
+                break
+            # hook the larger root onto the smaller one
+            np.minimum.at(parent, np.maximum(ps[mask], pd[mask]), np.minimum(ps[mask], pd[mask]))
+            # pointer jumping, until every node points to its root
+            grand = parent[parent]
+            while not np.array_equal(grand, parent):
+                parent = grand
+                grand = parent[parent]
+        _, self.labels = np.unique(parent, return_inverse = True)
+        self.labels = self.labels.reshape(-1)
+        self.netOrder = np.argsort(self.labels, kind = "stable")
+        self.netStarts = np.searchsorted(self.labels[self.netOrder], np.arange(self.labels.max(initial = -1) + 2))
+        return self.labels
+
+    def get_net(self, node: int) -> np.array:
+        """_summary_
+        Gets the nodes of the net to which the given node belongs
+        Args:
+            node (int): node identifier
+        Returns:
+            np.array: sorted identifiers of the nodes of the net
+        """
+        label = self.connected_components()[node]
+        return self.netOrder[self.netStarts[label]:self.netStarts[label + 1]]
+
+    def get_nets(self) -> list:
+        """_summary_
+        Gets the nodes of every net of the graph
+        Returns:
+            list: list of np.array with the sorted node identifiers of each net
+        """
+        self.connected_components()
+        return [
+            self.netOrder[start:end]
+            for start, end in zip(self.netStarts[:-1], self.netStarts[1:])
+        ]
 
 # TODO : Develop a SpeedsterChargeMobilityGraph
 # to save the generated graphs for current path in the layout
@@ -0,0 +1,689 @@
+"""_summary_
+fragment.py contains the rectilinear fragmentation engine:
+the (merged) polygons of a net are decomposed into maximal
+axis-aligned rectangles through horizontal and vertical cut
+lines at their vertex coordinates (and at the via edges),
+producing a fragment table consumable by the resistance
+network assembly: the neighbouring fragments of the same
+polygon are resistors, and the fragments of the metals
+below and above each via are joined by its conductance
+
+[author]    Diogo André Silvares Dias
+[date]      2026-10-16
+[contact]   das.dias@campus.fct.unl.pt
+"""
+import numpy as np
+from bisect import(
+    bisect_left,
+    bisect_right,
+)
+from concurrent.futures import ProcessPoolExecutor
+from gdstk import(
+    Cell,
+    Polygon,
+    rectangle,
+)
+from .index import(
+    sweep_overlapping_boxes,
+    _expand_ranges,
+)
+from spdstrutil import(
+    GdsTable,
+    timer,
+)
+
+
+class SpeedsterFragmentTable(object):
+    """_summary_
+    Table of the rectangular fragments of a set of polygons:
+    the bounding box, layer and parent polygon of each fragment,
+    the pairs of neighbouring fragments of the same polygon
+    (sharing an edge), with the length of the shared edge and
+    the distance between the fragment centres across it, and
+    the pairs of fragments of the metals below and above a via,
+    with their share of the via conductance
+    """
+    __slots__ = [
+        "boxes",
+        "layers",
+        "parents",
+        "neighbours",
+        "contacts",
+        "distances",
+        "vias",
+        "viaLayers",
+        "viaShares",
+    ]
+
+    def __init__(
+        self,
+        boxes: np.array,
+        layers: np.array,
+        parents: np.array,
+        neighbours: np.array,
+        contacts: np.array,
+        distances: np.array,
+        vias: np.array = None,
+        viaLayers: np.array = None,
+        viaShares: np.array = None,
+    ):
+        """_summary_
+        Args:
+            boxes       (np.array)  : (F, 4) [x0, y0, x1, y1] bounding box of each fragment
+            layers      (np.array)  : (F,) layer index of each fragment
+            parents     (np.array)  : (F,) index of the polygon of each fragment
+            neighbours  (np.array)  : (M, 2) pairs of neighbouring fragments
+            contacts    (np.array)  : (M,) length of the edge shared by each pair
+            distances   (np.array)  : (M,) distance between the centres of each pair, across the shared edge
+            vias        (np.array)  : (V, 2) pairs of (below, above) fragments joined by a via (optional)
+            viaLayers   (np.array)  : (V,) layer index of the via of each pair (optional)
+            viaShares   (np.array)  : (V,) share of the via conductance of each pair (optional)
+        """
+        self.boxes = np.asarray(boxes, dtype = float).reshape(-1, 4)
+        self.layers = np.asarray(layers, dtype = np.int64)
+        self.parents = np.asarray(parents, dtype = np.int64)
+        self.neighbours = np.asarray(neighbours, dtype = np.int64).reshape(-1, 2)
+        self.contacts = np.asarray(contacts, dtype = float)
+        self.distances = np.asarray(distances, dtype = float)
+        self.vias = np.asarray(vias if vias is not None else [], dtype = np.int64).reshape(-1, 2)
+        self.viaLayers = np.asarray(viaLayers if viaLayers is not None else [], dtype = np.int64)
+        self.viaShares = np.asarray(viaShares if viaShares is not None else [], dtype = float)
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def __str__(self) -> str:
+        return "Fragment Table: {} fragments of {} polygons, {} neighbour pairs, {} via pairs".format(
+            len(self), len(np.unique(self.parents)), len(self.neighbours), len(self.vias)
+        )
+
+    def get_resistor_arrays(
+        self,
+        sheetResistances: np.array,
+    ) -> tuple:
+        """_summary_
+        Gets the resistor arrays of the fragment table: each pair of
+        neighbours is a resistor of length equal to the distance between
+        the fragment centres and width equal to the shared edge
+        Args:
+            sheetResistances (np.array): sheet resistance of each layer index [Ohm/sq]
+        Returns:
+            tuple: ((M, 2) node pairs, (M,) lengths, (M,) widths, (M,) sheet resistances)
+        """
+        rs = np.asarray(sheetResistances, dtype = float)[self.layers[self.neighbours[:, 0]]]
+        return self.neighbours, self.distances, self.contacts, rs
+
+    def get_via_arrays(
+        self,
+        viaResistances: np.array,
+    ) -> tuple:
+        """_summary_
+        Gets the via conductance arrays of the fragment table: the fragment
+        pairs of each via are in parallel, each one taking its share of the
+        via conductance
+        Args:
+            viaResistances (np.array): resistance of a via of each layer index [Ohm]
+        Returns:
+            tuple: ((V, 2) node pairs, (V,) conductances [S])
+        """
+        return self.vias, self.viaShares / np.asarray(viaResistances, dtype = float)[self.viaLayers]
+
+
+def decompose_rectilinear(
+    points: np.array,
+    precision: float = 1e-3,
+    cuts: np.array = None,
+) -> np.array:
+    """_summary_
+    Decomposes a rectilinear polygon into maximal rectangles. A sweep line
+    moves upwards through the vertex coordinates, keeping the sorted x
+    coordinates of the vertical edges crossing it with an odd multiplicity
+    (the even-odd rule, so the holes and the zero width keyhole slits of
+    merged polygons are handled): each consecutive pair of them bounds an
+    inside run, broken at the cut lines. The horizontal edges met by the
+    sweep line flip the inside state of their x interval, so only the open
+    runs touching them are closed into fragments and replaced by the new
+    runs touching them. The cut boxes (e.g. the vias over the polygon) add
+    cut lines that the fragments never cross. The memory and the work follow
+    the number of edges and fragments, not the size of the vertex grid
+    Args:
+        points      (np.array)              : (N, 2) vertices of the polygon
+        precision   (float, optional)       : size of the database unit. Defaults to 1e-3.
+        cuts        (np.array, optional)    : (C, 4) [x0, y0, x1, y1] boxes whose edges cut the fragments
+    Returns:
+        np.array: (F, 4) [x0, y0, x1, y1] fragments, sorted by their lower left corner
+    """
+    pts = np.round(np.asarray(points, dtype = float).reshape(-1, 2) / precision).astype(np.int64)
+    nxt = np.roll(pts, -1, axis = 0)
+    dx = nxt[:, 0] - pts[:, 0]
+    dy = nxt[:, 1] - pts[:, 1]
+    if np.any((dx != 0) & (dy != 0)):
+        raise ValueError("The polygon is not rectilinear!")
+    lo = pts.min(axis = 0)
+    hi = pts.max(axis = 0)
+    cutX = []
+    cutY = np.empty(0, dtype = np.int64)
+    if cuts is not None and len(cuts) > 0:
+        boxes = np.round(np.asarray(cuts, dtype = float).reshape(-1, 4) / precision).astype(np.int64)
+        cutX = np.unique(boxes[:, [0, 2]])
+        cutY = np.unique(boxes[:, [1, 3]])
+        cutX = cutX[(cutX > lo[0]) & (cutX < hi[0])].tolist()
+        cutY = cutY[(cutY > lo[1]) & (cutY < hi[1])]
+    # the vertical edges toggle their x coordinate at both of their ends,
+    # only the coordinates toggled an odd number of times change the state
+    vertical = (dx == 0) & (dy != 0)
+    eventX = np.tile(pts[vertical, 0], 2)
+    eventY = np.concatenate([pts[vertical, 1], nxt[vertical, 1]])
+    order = np.lexsort((eventX, eventY))
+    eventX, eventY = eventX[order], eventY[order]
+    first = np.flatnonzero(np.diff(eventX, prepend = lo[0] - 1) | np.diff(eventY, prepend = lo[1] - 1))
+    odd = np.diff(np.append(first, len(eventX))) % 2 == 1
+    eventX, eventY = eventX[first[odd]], eventY[first[odd]]
+    # the cut lines are events without toggles
+    ys = np.union1d(eventY, cutY)
+    breakY = set(cutY.tolist())
+    active = []
+    openStarts, openEnds, openRows = [], [], []
+    fragments = []
+    for y, toggles in zip(ys.tolist(), np.split(eventX, np.searchsorted(eventY, ys[1:]))):
+        toggles = toggles.tolist()
+        for x in toggles:
+            i = bisect_left(active, x)
+            if i < len(active) and active[i] == x:
+                del active[i]
+            else:
+                active.insert(i, x)
+        # the inside state flips between consecutive toggles: the open runs
+        # touching the flipped intervals close, the new runs touching them open
+        removed = set()
+        starts, ends = [], []
+        for a, b in zip(toggles[0::2], toggles[1::2]):
+            removed.update(range(bisect_left(openEnds, a), bisect_right(openStarts, b)))
+            for r in range(bisect_left(active, a) // 2, (bisect_right(active, b) + 1) // 2):
+                # the runs are broken at the cut lines crossing them (only
+                # the cut lines around the flipped interval are visited)
+                s, e = active[2 * r], active[2 * r + 1]
+                l0, h0 = bisect_right(cutX, s), bisect_left(cutX, e)
+                l, h = max(l0, bisect_left(cutX, a) - 1), min(h0, bisect_right(cutX, b) + 1)
+                pieces = [s] * (l == l0) + cutX[l:h] + [e] * (h == h0)
+                for ps, pe in zip(pieces[:-1], pieces[1:]):
+                    if pe >= a and ps <= b and (len(starts) == 0 or ps > starts[-1]):
+                        starts.append(ps)
+                        ends.append(pe)
+        removed = sorted(removed)
+        closed = {(openStarts[i], openEnds[i]): openRows[i] for i in removed}
+        rows = [y] * len(starts)
+        if y not in breakY:
+            # the new runs equal to a closed run continue it
+            for k, key in enumerate(zip(starts, ends)):
+                if key in closed:
+                    rows[k] = closed.pop(key)
+        fragments.extend((s, r, e, y) for (s, e), r in closed.items())
+        for i in reversed(removed):
+            del openStarts[i], openEnds[i], openRows[i]
+        if y in breakY:
+            # the cut line closes all the open runs, which restart from it
+            fragments.extend(zip(openStarts, openRows, openEnds, [y] * len(openStarts)))
+            openRows = [y] * len(openStarts)
+        for s, e, r in zip(starts, ends, rows):
+            i = bisect_left(openStarts, s)
+            openStarts.insert(i, s)
+            openEnds.insert(i, e)
+            openRows.insert(i, r)
+    fragments = np.array(fragments, dtype = np.int64).reshape(-1, 4)
+    fragments = fragments[np.lexsort((fragments[:, 0], fragments[:, 1]))]
+    return fragments * precision
+
+
+def subdivide_fragments(
+    boxes: np.array,
+    step: float = None,
+    aspect: float = None,
+    precision: float = 1e-3,
+) -> np.array:
+    """_summary_
+    Subdivides each fragment into a regular grid of sub-fragments whose
+    sides do not exceed the step, nor the aspect ratio times the shortest
+    side of the fragment, snapped to the database grid
+    Args:
+        boxes       (np.array)          : (F, 4) [x0, y0, x1, y1] fragments
+        step        (float, optional)   : maximal side of the sub-fragments. Defaults to None.
+        aspect      (float, optional)   : maximal aspect ratio of the sub-fragments. Defaults to None.
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+    Returns:
+        np.array: (S, 4) [x0, y0, x1, y1] sub-fragments, in the order of their fragments
+    """
+    if (step is not None and step <= 0) or (aspect is not None and aspect < 1):
+        raise ValueError("The fragment step must be positive and the aspect ratio at least 1!")
+    ints = np.round(np.asarray(boxes, dtype = float).reshape(-1, 4) / precision).astype(np.int64)
+    size = ints[:, 2:] - ints[:, :2]
+    side = np.full(len(ints), np.inf)
+    if step is not None:
+        side = np.minimum(side, step / precision)
+    if aspect is not None:
+        side = np.minimum(side, aspect * size.min(axis = 1))
+    cells = np.maximum(np.ceil(size / side[:, None] - 1e-9), 1).astype(np.int64)
+    counts = cells[:, 0] * cells[:, 1]
+    k = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    cells = np.repeat(cells, counts, axis = 0)
+    size = np.repeat(size, counts, axis = 0)
+    origin = np.repeat(ints[:, :2], counts, axis = 0)
+    index = np.column_stack([k % cells[:, 0], k // cells[:, 0]])
+    return np.concatenate([
+        origin + index * size // cells,
+        origin + (index + 1) * size // cells,
+    ], axis = 1) * precision
+
+
+def _get_abutting_pairs(
+    ints: np.array,
+    axis: int,
+) -> np.array:
+    """_summary_
+    Finds the pairs of disjoint boxes abutting across an edge normal to an
+    axis: the boxes ending at each line and the boxes starting at it are
+    disjoint intervals along the line, sorted by their start, so the
+    intervals overlapping each ending box are found by binary search
+    Args:
+        ints    (np.array)  : (F, 4) [x0, y0, x1, y1] disjoint boxes, in database units
+        axis    (int)       : 0 to abut across vertical edges (side by side), 1 across horizontal edges (stacked)
+    Returns:
+        np.array: (M, 2) pairs of (ending box, starting box)
+    """
+    other = 1 - axis
+    lines, ranks = np.unique(ints[:, [axis, axis + 2]], return_inverse = True)
+    ranks = ranks.reshape(-1, 2)
+    base = ints[:, other].min() if len(ints) > 0 else 0
+    span = (ints[:, other + 2].max() - base + 1) if len(ints) > 0 else 1
+    lo, hi = ints[:, other] - base, ints[:, other + 2] - base
+    # the starting boxes, sorted by (line, start) (and by (line, end), as they are disjoint)
+    order = np.lexsort((lo, ranks[:, 0]))
+    startKeys = ranks[order, 0] * span + lo[order]
+    endKeys = ranks[order, 0] * span + hi[order]
+    first = np.searchsorted(endKeys, ranks[:, 1] * span + lo, side = "right")
+    last = np.searchsorted(startKeys, ranks[:, 1] * span + hi, side = "left")
+    return np.column_stack([
+        np.repeat(np.arange(len(ints)), np.maximum(last - first, 0)),
+        order[_expand_ranges(first, np.maximum(last, first))],
+    ])
+
+
+def get_fragment_neighbours(
+    boxes: np.array,
+    precision: float = 1e-3,
+) -> tuple:
+    """_summary_
+    Finds the pairs of (disjoint) fragments sharing an edge of non null length
+    Args:
+        boxes       (np.array)          : (F, 4) [x0, y0, x1, y1] fragments
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+    Returns:
+        tuple: ((M, 2) pairs, (M,) shared edge lengths, (M,) distances between the centres across the edge)
+    """
+    ints = np.round(np.asarray(boxes, dtype = float).reshape(-1, 4) / precision).astype(np.int64)
+    # touching across a vertical edge (side by side) or a horizontal edge (stacked)
+    sideBySide = _get_abutting_pairs(ints, 0)
+    stacked = _get_abutting_pairs(ints, 1)
+    pairs = np.concatenate([sideBySide, stacked])
+    axis = np.repeat([0, 1], [len(sideBySide), len(stacked)])
+    a, b = ints[pairs[:, 0]], ints[pairs[:, 1]]
+    contacts = np.where(
+        axis == 0,
+        np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1]),
+        np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0]),
+    ) * precision
+    centres = (ints[:, :2] + ints[:, 2:]) / 2.0
+    distances = np.abs(centres[pairs[:, 0], axis] - centres[pairs[:, 1], axis]) * precision
+    pairs = np.sort(pairs, axis = 1)
+    order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+    return pairs[order], contacts[order], distances[order]
+
+
+def _fragment_polygon_task(
+    points: np.array,
+    precision: float,
+    cuts: np.array,
+    step: float = None,
+    aspect: float = None,
+) -> tuple:
+    """_summary_
+    Fragments a single polygon and finds the neighbouring fragments.
+    Takes and returns plain arrays, as it runs in the worker processes
+    Args:
+        points      (np.array)  : (N, 2) vertices of the polygon
+        precision   (float)     : size of the database unit
+        cuts        (np.array)  : (C, 4) cut boxes (or None)
+        step        (float)     : maximal side of the fragments (or None, see subdivide_fragments)
+        aspect      (float)     : maximal aspect ratio of the fragments (or None, see subdivide_fragments)
+    Returns:
+        tuple: ((F, 4) fragments, (M, 2) local pairs, (M,) shared edge lengths, (M,) distances)
+    """
+    boxes = decompose_rectilinear(points, precision, cuts)
+    if step is not None or aspect is not None:
+        boxes = subdivide_fragments(boxes, step, aspect, precision)
+    return (boxes,) + get_fragment_neighbours(boxes, precision)
+
+
+@timer
+def get_fragment_table(
+    polygons: list,
+    layers: list,
+    precision: float = 1e-3,
+    cuts: list = None,
+    workers: int = 1,
+    step: float = None,
+    aspect: float = None,
+) -> SpeedsterFragmentTable:
+    """_summary_
+    Fragments a set of merged rectilinear polygons into a fragment table.
+    The polygons are independent, so they are fragmented in parallel,
+    dispatched as plain vertex arrays to a pool of worker processes
+    Args:
+        polygons    (list)              : list of Polygon objects or (N, 2) vertex arrays
+        layers      (list)              : layer index of each polygon
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+        cuts        (list, optional)    : (C, 4) cut boxes of each polygon (or None). Defaults to None.
+        workers     (int, optional)     : number of worker processes (1 fragments the polygons
+                                          in the calling process). Defaults to 1.
+        step        (float, optional)   : maximal side of the fragments (see subdivide_fragments).
+                                          Defaults to None, the maximal rectangles.
+        aspect      (float, optional)   : maximal aspect ratio of the fragments (see subdivide_fragments).
+                                          Defaults to None, the maximal rectangles.
+    Returns:
+        SpeedsterFragmentTable: the fragments, in the polygon order
+    """
+    points = [np.asarray(poly.points if isinstance(poly, Polygon) else poly) for poly in polygons]
+    cuts = cuts if cuts is not None else [None] * len(points)
+    if workers > 1 and len(points) > 1:
+        with ProcessPoolExecutor(max_workers = min(workers, len(points))) as executor:
+            results = list(executor.map(
+                _fragment_polygon_task, points, [precision] * len(points), cuts,
+                [step] * len(points), [aspect] * len(points),
+                chunksize = max(len(points) // (4 * workers), 1),
+            ))
+    else:
+        results = [_fragment_polygon_task(p, precision, c, step, aspect) for p, c in zip(points, cuts)]
+    counts = np.array([len(boxes) for boxes, _, _, _ in results], dtype = np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return SpeedsterFragmentTable(
+        np.concatenate([np.empty((0, 4))] + [boxes for boxes, _, _, _ in results]),
+        np.repeat(np.asarray(layers, dtype = np.int64), counts),
+        np.repeat(np.arange(len(results)), counts),
+        np.concatenate([np.empty((0, 2), dtype = np.int64)] + [
+            pairs + offset for (_, pairs, _, _), offset in zip(results, offsets)
+        ]),
+        np.concatenate([np.empty(0)] + [contacts for _, _, contacts, _ in results]),
+        np.concatenate([np.empty(0)] + [distances for _, _, _, distances in results]),
+    )
+
+
+def _get_via_fragment_hits(
+    boxes: np.array,
+    layers: np.array,
+    viaBoxes: np.array,
+    viaLayers: np.array,
+    precision: float = 1e-3,
+) -> tuple:
+    """_summary_
+    Finds every pair of a fragment of the layer below and a fragment of
+    the layer above overlapping each via, with the area of their common
+    overlap with the via (see get_via_fragment_pairs)
+    Args:
+        boxes       (np.array)          : (F, 4) [x0, y0, x1, y1] fragments
+        layers      (np.array)          : (F,) layer index of each fragment
+        viaBoxes    (np.array)          : (V, 4) [x0, y0, x1, y1] bounding box of each via
+        viaLayers   (np.array)          : (V,) layer index of each via
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+    Returns:
+        tuple: ((K, 2) (below, above) fragment pairs, (K,) via of each pair, (K,) overlap areas)
+    """
+    boxes = np.round(np.asarray(boxes, dtype = float).reshape(-1, 4) / precision).astype(np.int64)
+    viaBoxes = np.round(np.asarray(viaBoxes, dtype = float).reshape(-1, 4) / precision).astype(np.int64)
+    layers = np.asarray(layers, dtype = np.int64)
+    viaLayers = np.asarray(viaLayers, dtype = np.int64)
+    # the fragments overlapping each via, in the layers below and above it
+    hits = sweep_overlapping_boxes(viaBoxes, boxes, strict = True)
+    delta = layers[hits[:, 1]] - viaLayers[hits[:, 0]]
+    below = hits[delta == -1]
+    above = hits[delta == 1]
+    # every (below, above) combination of the same via
+    starts = np.searchsorted(above[:, 0], below[:, 0], side = "left")
+    ends = np.searchsorted(above[:, 0], below[:, 0], side = "right")
+    via = np.repeat(below[:, 0], ends - starts)
+    pairs = np.column_stack([np.repeat(below[:, 1], ends - starts), above[_expand_ranges(starts, ends), 1]])
+    a, b, v = boxes[pairs[:, 0]], boxes[pairs[:, 1]], viaBoxes[via]
+    width = np.minimum(np.minimum(a[:, 2], b[:, 2]), v[:, 2]) - np.maximum(np.maximum(a[:, 0], b[:, 0]), v[:, 0])
+    height = np.minimum(np.minimum(a[:, 3], b[:, 3]), v[:, 3]) - np.maximum(np.maximum(a[:, 1], b[:, 1]), v[:, 1])
+    area = np.maximum(width, 0) * np.maximum(height, 0)
+    valid = area > 0
+    return pairs[valid], via[valid], area[valid].astype(float)
+
+
+def get_via_fragment_pairs(
+    boxes: np.array,
+    layers: np.array,
+    viaBoxes: np.array,
+    viaLayers: np.array,
+    precision: float = 1e-3,
+) -> tuple:
+    """_summary_
+    Joins the fragments of the metals below and above each via: every
+    pair of a fragment of the layer below and a fragment of the layer above
+    overlapping the via takes the share of the via conductance given by the
+    area of their common overlap with the via (the shares of a via add up to 1)
+    Args:
+        boxes       (np.array)          : (F, 4) [x0, y0, x1, y1] fragments
+        layers      (np.array)          : (F,) layer index of each fragment
+        viaBoxes    (np.array)          : (V, 4) [x0, y0, x1, y1] bounding box of each via
+        viaLayers   (np.array)          : (V,) layer index of each via
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+    Returns:
+        tuple: ((K, 2) (below, above) fragment pairs, (K,) layer index of their via, (K,) conductance shares)
+    """
+    viaLayers = np.asarray(viaLayers, dtype = np.int64)
+    pairs, via, area = _get_via_fragment_hits(boxes, layers, viaBoxes, viaLayers, precision)
+    shares = area / np.bincount(via, area, len(viaLayers))[via]
+    return pairs, viaLayers[via], shares
+
+
+def concatenate_fragment_tables(
+    tables: list,
+) -> SpeedsterFragmentTable:
+    """_summary_
+    Concatenates fragment tables into a single table, renumbering
+    the fragments and the polygons of each table after the previous ones
+    Args:
+        tables (list): list of SpeedsterFragmentTable objects
+    Returns:
+        SpeedsterFragmentTable: the concatenated table
+    """
+    sizes = np.array([len(table) for table in tables], dtype = np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+    polygons = np.array([table.parents.max(initial = -1) + 1 for table in tables], dtype = np.int64)
+    polygonOffsets = np.concatenate([[0], np.cumsum(polygons)[:-1]]).astype(np.int64)
+    return SpeedsterFragmentTable(
+        np.concatenate([np.empty((0, 4))] + [table.boxes for table in tables]),
+        np.concatenate([np.empty(0, dtype = np.int64)] + [table.layers for table in tables]),
+        np.concatenate([np.empty(0, dtype = np.int64)] + [
+            table.parents + offset for table, offset in zip(tables, polygonOffsets)
+        ]),
+        np.concatenate([np.empty((0, 2), dtype = np.int64)] + [
+            table.neighbours + offset for table, offset in zip(tables, offsets)
+        ]),
+        np.concatenate([np.empty(0)] + [table.contacts for table in tables]),
+        np.concatenate([np.empty(0)] + [table.distances for table in tables]),
+        np.concatenate([np.empty((0, 2), dtype = np.int64)] + [
+            table.vias + offset for table, offset in zip(tables, offsets)
+        ]),
+        np.concatenate([np.empty(0, dtype = np.int64)] + [table.viaLayers for table in tables]),
+        np.concatenate([np.empty(0)] + [table.viaShares for table in tables]),
+    )
+
+
+def cut_fragments(
+    table: SpeedsterFragmentTable,
+    owners: np.array,
+    cutBoxes: np.array,
+    precision: float = 1e-3,
+) -> tuple:
+    """_summary_
+    Cuts fragments of a table by boxes (e.g. the vias landing on them),
+    replacing each cut fragment by the fragments of its rectangle cut
+    by its boxes (see decompose_rectilinear). The neighbour pairs of the
+    pieces are found again among the pieces and the former neighbours of
+    their fragment, and the via pairs of a cut fragment (which lies inside
+    its via) are split among its pieces by area
+    Args:
+        table       (SpeedsterFragmentTable)    : fragment table
+        owners      (np.array)                  : (C,) fragment cut by each box
+        cutBoxes    (np.array)                  : (C, 4) [x0, y0, x1, y1] cut boxes
+        precision   (float, optional)           : size of the database unit. Defaults to 1e-3.
+    Returns:
+        tuple: (SpeedsterFragmentTable of the cut fragments, (F',) former fragment of each fragment)
+    """
+    owners = np.asarray(owners, dtype = np.int64)
+    cutBoxes = np.asarray(cutBoxes, dtype = float).reshape(-1, 4)
+    order = np.argsort(owners, kind = "stable")
+    cut, starts = np.unique(owners[order], return_index = True)
+    pieces = [table.boxes[k:k + 1] for k in range(len(table))]
+    for k, start, end in zip(cut, starts, np.append(starts[1:], len(owners))):
+        x0, y0, x1, y1 = table.boxes[k]
+        pieces[k] = decompose_rectilinear(
+            [(x0, y0), (x1, y0), (x1, y1), (x0, y1)], precision, cutBoxes[order[start:end]]
+        )
+    counts = np.array([len(boxes) for boxes in pieces], dtype = np.int64)
+    firsts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+    origins = np.repeat(np.arange(len(table)), counts)
+    boxes = np.concatenate([np.empty((0, 4))] + pieces)
+    isCut = np.zeros(len(table), dtype = bool)
+    isCut[cut] = True
+    # the pairs of uncut fragments are kept, the others are found again
+    keep = ~isCut[table.neighbours].any(axis = 1)
+    local = np.unique(np.concatenate([cut, table.neighbours[~keep].ravel()]))
+    local = _expand_ranges(firsts[local], firsts[local] + counts[local])
+    pairs, contacts, distances = get_fragment_neighbours(boxes[local], precision)
+    pairs = local[pairs]
+    valid = (table.parents[origins[pairs[:, 0]]] == table.parents[origins[pairs[:, 1]]]) & isCut[origins[pairs]].any(axis = 1)
+    # the via pairs are split among the pieces, by area
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    vias, shares = table.vias, table.viaShares
+    viaLayers = table.viaLayers
+    for side in (0, 1):
+        repeats = counts[vias[:, side]]
+        rows = np.repeat(np.arange(len(vias)), repeats)
+        ends = np.cumsum(repeats)
+        ranks = np.arange(len(rows)) - np.repeat(ends - repeats, repeats)
+        vias = vias[rows].copy()
+        vias[:, side] = firsts[vias[:, side]] + ranks
+        total = np.bincount(origins, area, len(table))[origins[vias[:, side]]]
+        shares = shares[rows] * area[vias[:, side]] / total
+        viaLayers = viaLayers[rows]
+    return SpeedsterFragmentTable(
+        boxes,
+        table.layers[origins],
+        table.parents[origins],
+        np.concatenate([firsts[table.neighbours[keep]], pairs[valid]]),
+        np.concatenate([table.contacts[keep], contacts[valid]]),
+        np.concatenate([table.distances[keep], distances[valid]]),
+        vias,
+        viaLayers,
+        shares,
+    ), origins
+
+
+def get_net_fragment_table(
+    net: Cell,
+    gdsTable: GdsTable,
+    precision: float = 1e-3,
+    workers: int = 1,
+    step: float = None,
+    aspect: float = None,
+) -> SpeedsterFragmentTable:
+    """_summary_
+    Fragments the routing metal polygons of a (merged) net. The vias
+    over or under each metal polygon cut its fragments, so that each
+    via lands on whole fragments, and the fragments below and above
+    each via are joined through it (see get_via_fragment_pairs). The
+    fragment layers are the indexes of the layers in the drawing metal
+    layer map (met1, via, met2, ...)
+    Args:
+        net         (Cell)              : Cell object containing the merged net
+        gdsTable    (GdsTable)          : GdsTable object containing the gds information
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+        workers     (int, optional)     : number of worker processes. Defaults to 1.
+        step        (float, optional)   : maximal side of the fragments (see subdivide_fragments). Defaults to None.
+        aspect      (float, optional)   : maximal aspect ratio of the fragments (see subdivide_fragments). Defaults to None.
+    Returns:
+        SpeedsterFragmentTable: the fragments of the metal polygons of the net, and their via pairs
+    """
+    layerMap = gdsTable.getDrawingMetalLayersMap()
+    isVia = np.array(["via" in name for name in layerMap.keys()], dtype = bool)
+    polygons, layers = [], []
+    for index, (layer, datatype) in enumerate(layerMap.values()):
+        for poly in net.get_polygons(layer = layer, datatype = datatype):
+            polygons.append(poly)
+            layers.append(index)
+    layers = np.array(layers, dtype = np.int64)
+    boxes = np.array([np.ravel(poly.bounding_box()) for poly in polygons]).reshape(-1, 4)
+    metal = np.flatnonzero(~isVia[layers])
+    vias = np.flatnonzero(isVia[layers])
+    # the vias over or under each metal polygon cut its fragments
+    hits = sweep_overlapping_boxes(boxes[metal], boxes[vias], strict = True)
+    hits = hits[np.abs(layers[metal[hits[:, 0]]] - layers[vias[hits[:, 1]]]) == 1]
+    bounds = np.searchsorted(hits[:, 0], np.arange(len(metal) + 1))
+    cuts = [boxes[vias[hits[start:end, 1]]] for start, end in zip(bounds[:-1], bounds[1:])]
+    table = get_fragment_table([polygons[k].points for k in metal], layers[metal], precision, cuts, workers, step, aspect)
+    table.vias, table.viaLayers, table.viaShares = get_via_fragment_pairs(
+        table.boxes, table.layers, boxes[vias], layers[vias], precision
+    )
+    return table
+
+
+def fragment_polygon(
+    poly: Polygon,
+    precision: float = 1e-3,
+    cuts: np.array = None,
+) -> list:
+    """_summary_
+    Fragments a rectilinear polygon into maximal rectangles
+    (see decompose_rectilinear)
+    Args:
+        poly        (Polygon)               : the polygon to fragment
+        precision   (float, optional)       : size of the database unit. Defaults to 1e-3.
+        cuts        (np.array, optional)    : (C, 4) boxes whose edges cut the fragments. Defaults to None.
+    Returns:
+        list: list of the rectangle Polygon objects, in the layer and datatype of the polygon
+    """
+    return [
+        rectangle((x0, y0), (x1, y1), layer = poly.layer, datatype = poly.datatype)
+        for x0, y0, x1, y1 in decompose_rectilinear(poly.points, precision, cuts)
+    ]
+
+
+def fragment_net(
+    name: str,
+    cell: Cell,
+    precision: float = 1e-3,
+    workers: int = 1,
+) -> Cell:
+    """_summary_
+    Fragments the net into a Cell of rectangles resulting
+    from horizontal and vertical cuts in each polygon
+    Args:
+        name        (str)               : the name of the cell
+        cell        (Cell)              : Cell object containing the (merged) net
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+        workers     (int, optional)     : number of worker processes. Defaults to 1.
+    Returns:
+        Cell: the Cell with the fragments of each polygon, and the labels of the net
+    """
+    net = Cell(name)
+    polygons = cell.get_polygons()
+    table = get_fragment_table(polygons, np.zeros(len(polygons)), precision, workers = workers)
+    specs = np.array([(poly.layer, poly.datatype) for poly in polygons], dtype = np.int64).reshape(-1, 2)
+    net.add(*[
+        rectangle((x0, y0), (x1, y1), layer = int(specs[parent, 0]), datatype = int(specs[parent, 1]))
+        for (x0, y0, x1, y1), parent in zip(table.boxes, table.parents)
+    ])
+    net.add(*cell.labels)
+    return net
@@ -9,8 +9,8 @@ in order to enable point to point resistance extraction
 """
 from loguru import logger
 import itertools
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
-import warnings
 import numpy as np
 from gdstk import(
     Library,
@@ -24,6 +24,30 @@ from gdstk import(
 )
 from .data import(
     SpeedsterPort,
+    SpeedsterConnectionGraph,
+)
+from .index import(
+    get_bounding_box,
+    get_bounding_boxes,
+    sweep_overlapping_boxes,
+)
+from .store import(
+    LayerIndexedCell,
+    SpeedsterPolygonStore,
+)
+from .fragment import(
+    fragment_polygon,
+    fragment_net,
+    get_fragment_neighbours,
+)
+from .manhattan import(
+    manhattan_engine_enabled,
+    get_rectangles,
+    rect_overlap,
+    rect_contains,
+    rect_intersection,
+    rect_union,
+    rect_common_edges,
 )
 from spdstrutil import (
     GdsTable,
@@ -73,6 +97,69 @@ def check_point_inside_polygon(
         raise ValueError("Point must be a tuple of 2 floats.")
     return inside([point], polygon)[0]
 
+def _as_polygon_list(
+    polygon,
+) -> list:
+    """_summary_
+    Wraps a single polygon in a list
+    Args:
+        polygon (Polygon | list): Polygon object or list of Polygon objects
+    Returns:
+        list: list of Polygon objects
+    """
+    return list(polygon) if isinstance(polygon, (list, tuple)) else [polygon]
+
+def _get_manhattan_operands(
+    polygonsA: list,
+    polygonsB: list,
+    precision = 1e-3,
+) -> tuple:
+    """_summary_
+    Gets the integer rectangles of both operands of a geometry operation,
+    if the Manhattan engine is enabled and all the polygons are rectangles
+    Args:
+        polygonsA   (list)  : list of Polygon objects
+        polygonsB   (list)  : list of Polygon objects
+        precision   (float) : size of the database unit
+    Returns:
+        tuple: (rectsA, rectsB) int64 arrays, or None if the operation can't be dispatched to the engine
+    """
+    if not manhattan_engine_enabled():
+        return None
+    rectsA = get_rectangles(polygonsA, precision)
+    if rectsA is None:
+        return None
+    rectsB = get_rectangles(polygonsB, precision)
+    if rectsB is None:
+        return None
+    return rectsA, rectsB
+
+def check_bounding_box_overlap(
+    polygonA,
+    polygonsB,
+    boxesB: np.array = None,
+) -> np.array:
+    """_summary_
+    Vectorized check of the overlap between the bounding box
+    of polygon A and the bounding boxes of a batch of polygons
+    (touching bounding boxes are considered to overlap)
+    Args:
+        polygonA  (Polygon | list)       : Polygon object or list of Polygon objects
+        polygonsB (Polygon | list)       : Polygon object or list of Polygon objects (e.g. a whole layer)
+        boxesB    (np.array, optional)   : precomputed (N, 4) bounding boxes of polygonsB
+    Returns:
+        np.array: (N,) boolean mask, True where the bounding boxes overlap
+    """
+    if boxesB is None:
+        boxesB = get_bounding_boxes(_as_polygon_list(polygonsB))
+    boxA = get_bounding_box(polygonA)
+    if boxA is None:
+        return np.zeros(len(boxesB), dtype = bool)
+    return (
+        (boxesB[:, 0] <= boxA[2]) & (boxesB[:, 2] >= boxA[0]) &
+        (boxesB[:, 1] <= boxA[3]) & (boxesB[:, 3] >= boxA[1])
+    )
+
 def check_polygon_overlap(
     polygonA,
     polygonB,
@@ -82,17 +169,33 @@ def check_polygon_overlap(
 ) -> list:
     """_summary_
     Checks if two polygons overlap, and 
-    returns the overlapping region, in case they do
+    returns the overlapping region, in case they do.
+    The pairs of polygons with disjoint bounding boxes are 
+    rejected before performing the boolean operation
     Args:
-        polygonA (Polygon): Polygon object
-        polygonB (Polygon): Polygon object
+        polygonA (Polygon | list): Polygon object or list of Polygon objects
+        polygonB (Polygon | list): Polygon object or list of Polygon objects
         layer    (int)       : layer of the resulting polygon from the boolean operation
         dataType (int)       : datatype of the resulting polygon from the boolean operation
         precision(float)     : precision of the cuts
     """
+    polygonsA = _as_polygon_list(polygonA)
+    polygonsB = _as_polygon_list(polygonB)
+    # keep only the polygons that can touch the other operand
+    polygonsB = list(itertools.compress(polygonsB, check_bounding_box_overlap(polygonsA, polygonsB)))
+    if len(polygonsB) == 0:
+        return None
+    polygonsA = list(itertools.compress(polygonsA, check_bounding_box_overlap(polygonsB, polygonsA)))
+    if len(polygonsA) == 0:
+        return None
+    operands = _get_manhattan_operands(polygonsA, polygonsB, precision)
+    if operands is not None:
+        inter = rect_union(rect_intersection(*operands)) * precision
+        polyList = [rectangle( (x0, y0), (x1, y1), layer = layer, datatype = datatype ) for x0, y0, x1, y1 in inter]
+        return polyList if len(polyList) > 0 else None
     polyList = boolean(
-        polygonA, 
-        polygonB,
+        polygonsA, 
+        polygonsB,
         'and', 
         layer = layer, 
         datatype = datatype, 
@@ -100,93 +203,248 @@ def check_polygon_overlap(
     ) 
     return polyList if len(polyList) > 0 else None
 
+def check_rectangles(
+    polygons: list,
+    boxes: np.array = None,
+) -> np.array:
+    """_summary_
+    Checks which polygons are axis-aligned rectangles,
+    i.e. polygons filling their whole bounding box
+    Args:
+        polygons (list)                 : list of Polygon objects
+        boxes    (np.array, optional)   : precomputed (N, 4) bounding boxes of the polygons
+    Returns:
+        np.array: (N,) boolean mask, True for the rectangles
+    """
+    if boxes is None:
+        boxes = get_bounding_boxes(polygons)
+    areas = np.array([poly.area() for poly in polygons], dtype = float)
+    boxAreas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return np.isclose(areas, boxAreas, rtol = 1e-9, atol = 0.0)
+
+def get_layer_pair_contacts(
+    polygonsA: list,
+    polygonsB: list,
+    boxesA: np.array = None,
+    boxesB: np.array = None,
+) -> np.array:
+    """_summary_
+    Finds all the overlapping polygon pairs between two layers
+    (e.g. a routing metal layer and an adjacent via layer) at once.
+    The candidate pairs are obtained through a plane sweep over the 
+    bounding boxes; pairs of rectangles are resolved by their bounding boxes
+    and only the remaining pairs are checked through a boolean operation
+    Args:
+        polygonsA (list)                : polygons of the first layer
+        polygonsB (list)                : polygons of the second layer
+        boxesA    (np.array, optional)  : precomputed (N, 4) bounding boxes of polygonsA
+        boxesB    (np.array, optional)  : precomputed (M, 4) bounding boxes of polygonsB
+    Returns:
+        np.array: (K, 2) array of (index in polygonsA, index in polygonsB) overlapping pairs
+    """
+    if boxesA is None:
+        boxesA = get_bounding_boxes(polygonsA)
+    if boxesB is None:
+        boxesB = get_bounding_boxes(polygonsB)
+    pairs = sweep_overlapping_boxes(boxesA, boxesB)
+    if len(pairs) == 0:
+        return pairs
+    rectsA = check_rectangles(polygonsA, boxesA)
+    rectsB = check_rectangles(polygonsB, boxesB)
+    a = boxesA[pairs[:, 0]]
+    b = boxesB[pairs[:, 1]]
+    # two rectangles overlap when their boxes overlap with a non-null area
+    boxOverlap = (b[:, 0] < a[:, 2]) & (b[:, 2] > a[:, 0]) & (b[:, 1] < a[:, 3]) & (b[:, 3] > a[:, 1])
+    bothRects = rectsA[pairs[:, 0]] & rectsB[pairs[:, 1]]
+    keep = bothRects & boxOverlap
+    for k in np.flatnonzero(~bothRects & boxOverlap):
+        keep[k] = bool_polygon_overlap_check(polygonsA[pairs[k, 0]], polygonsB[pairs[k, 1]])
+    return pairs[keep]
+
+def get_layer_joins(
+    polygonsA: list,
+    polygonsB: list,
+    boxesA: np.array = None,
+    boxesB: np.array = None,
+) -> np.array:
+    """_summary_
+    Finds all the polygon pairs of a single layer which are joined by the
+    boolean or operation (see join_overlapping_polygons_cell): the ones
+    overlapping or abutting along an edge. Pairs of rectangles are resolved
+    by their bounding boxes, and only the remaining pairs of touching
+    bounding boxes are checked through a boolean operation
+    Args:
+        polygonsA (list)                : polygons of the layer
+        polygonsB (list)                : polygons of the same layer
+        boxesA    (np.array, optional)  : precomputed (N, 4) bounding boxes of polygonsA
+        boxesB    (np.array, optional)  : precomputed (M, 4) bounding boxes of polygonsB
+    Returns:
+        np.array: (K, 2) array of (index in polygonsA, index in polygonsB) joined pairs
+    """
+    if boxesA is None:
+        boxesA = get_bounding_boxes(polygonsA)
+    if boxesB is None:
+        boxesB = get_bounding_boxes(polygonsB)
+    pairs = sweep_overlapping_boxes(boxesA, boxesB)
+    if len(pairs) == 0:
+        return pairs
+    rectsA = check_rectangles(polygonsA, boxesA)
+    rectsB = check_rectangles(polygonsB, boxesB)
+    a = boxesA[pairs[:, 0]]
+    b = boxesB[pairs[:, 1]]
+    # two rectangles are joined unless they only touch at a corner
+    overlapX = np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0])
+    overlapY = np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1])
+    bothRects = rectsA[pairs[:, 0]] & rectsB[pairs[:, 1]]
+    keep = bothRects & ((overlapX > 0) | (overlapY > 0))
+    for k in np.flatnonzero(~bothRects):
+        keep[k] = len(boolean( polygonsA[pairs[k, 0]], polygonsB[pairs[k, 1]], 'or' )) == 1
+    return pairs[keep]
+
+def _get_edges(
+    points: np.array,
+) -> np.array:
+    """_summary_
+    Gets the edges of a closed polygon
+    Args:
+        points (np.array): (N, 2) vertices of the polygon
+    Returns:
+        np.array: (N, 2, 2) array of [start point, end point] edges
+    """
+    points = np.asarray(points, dtype = float)
+    return np.stack([points, np.roll(points, -1, axis = 0)], axis = 1)
+
+def _common_edges_kernel(
+    edgesA: np.array,
+    edgesB: np.array,
+) -> tuple:
+    """_summary_
+    Computes the superposition of every pair of collinear edges
+    of two sets of edges at once.
+    For each edge pair (e1, e2), the endpoints of e2 are projected on e1 
+    and clipped to it, resulting in the superposed segment, oriented as e2
+    Args:
+        edgesA (np.array): (N, 2, 2) array of edges
+        edgesB (np.array): (M, 2, 2) array of edges
+    Returns:
+        tuple: (indices of the edges of A, indices of the edges of B, (K, 2, 2) superposed edges),
+               in row-major order of the (A, B) edge pairs
+    """
+    p = edgesA[:, None, 0, :]
+    d1 = edgesA[:, None, 1, :] - edgesA[:, None, 0, :]
+    r = edgesB[None, :, 0, :]
+    s = edgesB[None, :, 1, :]
+    d2 = s - r
+    # colinearity exists when |e1 x e2| = 0 and e2 lies on the straight line defined by e1
+    cross = d1[..., 0] * d2[..., 1] - d1[..., 1] * d2[..., 0]
+    offset = (r[..., 0] - p[..., 0]) * d1[..., 1] - (r[..., 1] - p[..., 1]) * d1[..., 0]
+    norm = (d1 ** 2).sum(axis = -1)
+    collinear = (cross == 0.0) & (offset == 0.0) & (norm > 0.0) & ((d2 ** 2).sum(axis = -1) > 0.0)
+    ia, ib = np.nonzero(collinear)
+    p = p[ia, 0]
+    d1 = d1[ia, 0]
+    r = r[0, ib]
+    s = s[0, ib]
+    norm = norm[ia, 0][:, None]
+    tr = ((r - p) * d1).sum(axis = -1)[:, None] / norm
+    ts = ((s - p) * d1).sum(axis = -1)[:, None] / norm
+    # the endpoints of e2 inside e1 are kept, the remaining ones are clipped to e1
+    start = np.where((tr >= 0.0) & (tr <= 1.0), r, p + d1 * np.clip(tr, 0.0, 1.0))
+    end = np.where((ts >= 0.0) & (ts <= 1.0), s, p + d1 * np.clip(ts, 0.0, 1.0))
+    # filter the edges defining a single point
+    keep = (start != end).any(axis = -1)
+    return ia[keep], ib[keep], np.stack([start[keep], end[keep]], axis = 1)
+
+def _rect_common_edges_kernel(
+    edgesA: np.array,
+    edgesB: np.array,
+    rectA: np.array,
+    rectB: np.array,
+    precision = 1e-3,
+) -> np.array:
+    """_summary_
+    Computes the common edges of two rectangles through the Manhattan
+    engine, ordered by the edges of A and B and oriented as the edges
+    of B, as the ones of the common edges kernel (see _common_edges_kernel)
+    Args:
+        edgesA      (np.array)  : (4, 2, 2) array with the edges of rectangle A
+        edgesB      (np.array)  : (4, 2, 2) array with the edges of rectangle B
+        rectA       (np.array)  : int64 [x0, y0, x1, y1] rectangle A
+        rectB       (np.array)  : int64 [x0, y0, x1, y1] rectangle B
+        precision   (float)     : size of the database unit
+    Returns:
+        np.array: (K, 2, 2) superposed edges
+    """
+    segments = rect_common_edges(rectA, rectB)
+    if len(segments) == 0:
+        return segments.astype(float)
+    horizontal = segments[:, 0, 1] == segments[:, 1, 1]
+    level = np.where(horizontal, segments[:, 0, 1], segments[:, 0, 0])
+
+    def owners(edges):
+        # the edge of the rectangle lying on the line of each segment
+        edges = np.round(edges / precision).astype(np.int64)
+        edgeHorizontal = edges[:, 0, 1] == edges[:, 1, 1]
+        edgeLevel = np.where(edgeHorizontal, edges[:, 0, 1], edges[:, 0, 0])
+        match = (edgeHorizontal[None, :] == horizontal[:, None]) & (edgeLevel[None, :] == level[:, None])
+        return np.argmax(match, axis = 1), (edges[:, 1] - edges[:, 0]).sum(axis = -1)
+
+    ia, _ = owners(edgesA)
+    ib, directions = owners(edgesB)
+    segments = np.where((directions[ib] < 0)[:, None, None], segments[:, ::-1], segments)
+    return segments[np.lexsort((ib, ia))] * precision
+
 def get_common_edges(
     polyA,
     polyB
 ) -> list:
-    pointsA = polyA.points
-    pointsB = polyB.points
-    edges = []
-    def _superposed_collinear_edge(e1, e2):
-        """_summary_
-        Checks if two edges e1 and e2 are collinear and intersect
-        to infer about their intersection, returning it in case 
-        it exists
-        Args:
-            e1 ( array( [p1, p2] ) ): edge1/vector1
-            e2 ( array( [p1, p2] ) ): edge2/vector2
-
-        Returns:
-            ( array( [p1, p2] ) ) : the superposed edge
-        """
-        # compute colinearity
-        # get 3D vectors defined by e1 and e2
-        v1 = [ e1[1][0] - e1[0][0], e1[1][1]- e1[0][1], 0 ]
-        v2 = [ e2[1][0] - e2[0][0], e2[1][1]- e2[0][1], 0 ]
-        # get cross product
-        cp = np.cross(v1,v2)
-        norm_cp = np.sqrt(cp.dot(cp))
-        # infer colinearity
-        if norm_cp != 0.0: # colinearity exists when |v1xv2| = 0
-            return None
-        # compute intersection
-        # get the straight line defined by e1 : y = ax + b -> y-y0 = a * (x-x0) where a = (y1-y0)/(x1-x0) and b = y0 - a*x0
-        with warnings.catch_warnings():
-            warnings.simplefilter("error") # set warnings to error to catch div by zero
-            try:
-                a = (e1[1][1] - e1[0][1]) / ( (e1[1][0] - e1[0][0]) )
-                b = e1[0][1] - a*e1[0][0]
-                # check if the first point of e2 is on top of the straight line defined by the vertices of e1
-                if not np.equal(e2[0][1], ( a*e2[0][0] + b ) ): # y2 == a*x2 + b ?
-                    return None
-            except Exception: # division by zero, infinite slope, the defined line is : x = e1[0][0]
-                a = None
-                # only have to check if the abciss of e2[0] == e1[0][0]
-                if not np.equal(e2[0][0], e1[0][0]):
-                    return None
-        # if it is, check if either the final or the sstarting point of e2 is in the bounding box defined by the vertices of e1
-        bbox = rectangle( e1[0], e1[1] )
-        if not( inside([e2[0]], bbox)[0] or inside([e2[1]], bbox)[0] ):
-            return None
-        # finally, there is actually an intersection, and we must return it
-        # check e2 fully contained in e1
-        if inside([e2[0]], bbox)[0] and inside([e2[1]], bbox)[0]:
-            return e2
-        # check for partial intersection
-        if inside([e2[0]], bbox)[0]:
-            return (e2[0], e1[1])
-        
-        if inside([e2[1]], bbox)[0]:
-            return (e1[0], e2[1])
-        
-        return None
-        
-    for edgeA in zip(pointsA, pointsA[1:]):
-        for edgeB in zip(pointsB, pointsB[1:]):
-            superposed = _superposed_collinear_edge(edgeA, edgeB)
-            if superposed is not None:
-                edges.append(list(superposed))
-        # check last edge
-        edgeB = (pointsB[-1], pointsB[0])
-        superposed = _superposed_collinear_edge(edgeA, edgeB)
-        if superposed is not None:
-            edges.append(list(superposed))
-    # LAST ITERATION 
-    # check last edge
-    edgeA = (pointsA[-1], pointsA[0])
-    for edgeB in zip(pointsB[:-1], pointsB[1:]):
-        superposed = _superposed_collinear_edge(edgeA, edgeB)
-        if superposed is not None:
-            edges.append(list(superposed))
-    # check last edge
-    edgeB = (pointsB[-1], pointsB[0])
-    superposed = _superposed_collinear_edge(edgeA, edgeB)
-    if superposed is not None:
-        edges.append(list(superposed))
-    # convert edges to list of tuples and filter the edges defining a single point
-    edges = [ [tuple(p) for p in edge] for edge in edges if not np.array_equal(edge[0], edge[1])]
+    """_summary_
+    Gets the common (superposed collinear) edges of two polygons.
+    If the Manhattan engine is enabled and both polygons are
+    rectangles, the edges are computed through interval arithmetic
+    Args:
+        polyA (Polygon): Polygon object
+        polyB (Polygon): Polygon object
+    Returns:
+        list: list of [(x0, y0), (x1, y1)] common edges, or None if there are none
+    """
+    operands = _get_manhattan_operands([polyA], [polyB])
+    if operands is not None:
+        edges = _rect_common_edges_kernel(
+            _get_edges(polyA.points), _get_edges(polyB.points), operands[0][0], operands[1][0]
+        )
+    else:
+        _, _, edges = _common_edges_kernel(_get_edges(polyA.points), _get_edges(polyB.points))
+    edges = [ [tuple(p) for p in edge] for edge in edges.tolist() ]
     return edges if len(edges)>0 else None
 
+def get_common_edges_batch(
+    polyA,
+    polys: list,
+) -> list:
+    """_summary_
+    Gets the common edges of a polygon and each polygon
+    of a batch of neighbour candidates at once
+    Args:
+        polyA (Polygon) : Polygon object
+        polys (list)    : list of Polygon objects
+    Returns:
+        list: for each polygon of the batch, the list of common edges with polyA, or None
+    """
+    ret = [None] * len(polys)
+    # polygons with disjoint bounding boxes can't share edges
+    candidates = np.flatnonzero(check_bounding_box_overlap(polyA, polys))
+    if len(candidates) == 0:
+        return ret
+    edgesB = [_get_edges(polys[k].points) for k in candidates]
+    owners = np.repeat(candidates, [len(edges) for edges in edgesB])
+    _, ib, edges = _common_edges_kernel(_get_edges(polyA.points), np.concatenate(edgesB))
+    for owner, edge in zip(owners[ib], edges.tolist()):
+        if ret[owner] is None:
+            ret[owner] = []
+        ret[owner].append([tuple(p) for p in edge])
+    return ret
+
 
 def bool_polygon_overlap_check(
     polygonA,
@@ -218,11 +476,108 @@ def check_neighbour_polygons(
         bool:   returns wether the two polygons have common edges
                 True: They have common edges; False: They don't have common edges
     """
-    if polyA.layer == polyB.layer and polyA.datatype == polyB.datatype:
-        if get_common_edges(polyA,polyB) is not None:
-            return True if not bool_polygon_overlap_check(polyA,polyB) else False
-    return False
+    return bool(get_neighbour_polygons(polyA, [polyB])[0])
 
+def get_neighbour_polygons(
+    polyA,
+    polys: list,
+) -> np.array:
+    """_summary_
+    Checks which polygons of a batch have common edges 
+    with polygon A and don't overlap it
+    Args:
+        polyA (Polygon) : Polygon object
+        polys (list)    : list of Polygon objects (e.g. fragments)
+    Returns:
+        np.array: (N,) boolean mask, True for the neighbours of polygon A
+    """
+    mask = np.zeros(len(polys), dtype = bool)
+    sameLayer = [k for k, poly in enumerate(polys) if poly.layer == polyA.layer and poly.datatype == polyA.datatype]
+    if len(sameLayer) == 0:
+        return mask
+    candidates = [polys[k] for k in sameLayer]
+    operands = _get_manhattan_operands([polyA], candidates)
+    if operands is not None:
+        # rectangles are neighbours if they share an edge segment and don't overlap
+        rectA, rects = operands[0][0], operands[1]
+        for k, rect in zip(sameLayer, rects):
+            mask[k] = len(rect_common_edges(rectA, rect)) > 0 and not rect_overlap(rectA, rect)
+        return mask
+    edges = get_common_edges_batch(polyA, candidates)
+    for k, poly, common in zip(sameLayer, candidates, edges):
+        if common is None:
+            continue
+        if check_rectangles([polyA, poly]).all():
+            # two rectangles with common edges overlap if their boxes overlap with a non-null area
+            a = get_bounding_box(polyA)
+            b = get_bounding_box(poly)
+            mask[k] = not (b[0] < a[2] and b[2] > a[0] and b[1] < a[3] and b[3] > a[1])
+        else:
+            mask[k] = not bool_polygon_overlap_check(polyA, poly)
+    return mask
+
+
+def get_canonical_polygon(
+    polygon,
+    precision = 1e-3,
+) -> tuple:
+    """_summary_
+    Computes the canonical form of a polygon: the vertices are snapped
+    to integer database units (of size precision), duplicated and collinear
+    vertices are removed, the orientation is set to counter-clockwise and the
+    vertices are rotated to start at the lowest-leftmost vertex.
+    Two simple polygons cover the same region if and only if their canonical forms are equal,
+    so the canonical form can be hashed for constant time comparisons
+    Args:
+        polygon     (Polygon)   : Polygon object
+        precision   (float)     : size of the database unit
+    Returns:
+        tuple: (layer, datatype, (x0, y0, x1, y1, ...)) canonical form, 
+               or None for degenerate polygons (null area, repeated vertices as in
+               polygons with holes) which have no canonical form
+    """
+    points = np.round(np.asarray(polygon.points) / precision).astype(np.int64)
+    # remove the collinear and repeated vertices until none is left
+    while len(points) >= 3:
+        prev = np.roll(points, 1, axis = 0)
+        nxt = np.roll(points, -1, axis = 0)
+        cross = (points[:, 0] - prev[:, 0]) * (nxt[:, 1] - points[:, 1]) - (points[:, 1] - prev[:, 1]) * (nxt[:, 0] - points[:, 0])
+        keep = cross != 0
+        if keep.all():
+            break
+        points = points[keep]
+    if len(points) < 3:
+        return None
+    # repeated vertices only remain in self touching polygons (e.g. holes)
+    if len(np.unique(points, axis = 0)) != len(points):
+        return None
+    x = points[:, 0]
+    y = points[:, 1]
+    signedArea = np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y)
+    if signedArea == 0:
+        return None
+    if signedArea < 0:
+        points = points[::-1]
+    start = np.lexsort((points[:, 1], points[:, 0]))[0]
+    points = np.roll(points, -start, axis = 0)
+    return (polygon.layer, polygon.datatype, tuple(points.reshape(-1).tolist()))
+
+def get_polygon_hashes(
+    polygons: list,
+    precision = 1e-3,
+) -> set:
+    """_summary_
+    Gets the set of the canonical forms of the polygons,
+    to be kept alongside a net for constant time membership tests
+    Args:
+        polygons    (list)  : list of Polygon objects (e.g. cell.polygons)
+        precision   (float) : size of the database unit
+    Returns:
+        set: set of canonical forms (degenerate polygons are not included)
+    """
+    hashes = set(get_canonical_polygon(poly, precision) for poly in polygons)
+    hashes.discard(None)
+    return hashes
 
 def check_same_polygon(
     polyA,
@@ -247,6 +602,11 @@ def check_same_polygon(
     if polyA.datatype != polyB.datatype:
         return False
     datatype = polyA.datatype
+    canonA = get_canonical_polygon(polyA, precision)
+    canonB = get_canonical_polygon(polyB, precision)
+    if canonA is not None and canonB is not None:
+        return canonA == canonB
+    # degenerate polygons have no canonical form:
     # check if the interception of the two polygons is equal to both of them, or
     # if the not operation (polyA - polyB) and (polyB - polyA) is equal to an empty space of points/polygons
     notAB = boolean( polyA, polyB, "not" )
@@ -273,6 +633,15 @@ def check_polygon_contains_polygon(
         return False
     if polyA.datatype != polyB.datatype:
         return False
+    # polygon A can only contain polygon B if its bounding box contains the bounding box of B
+    boxA = get_bounding_box(polyA)
+    boxB = get_bounding_box(polyB)
+    tol = 1e-9
+    if boxB[0] < boxA[0] - tol or boxB[1] < boxA[1] - tol or boxB[2] > boxA[2] + tol or boxB[3] > boxA[3] + tol:
+        return False
+    operands = _get_manhattan_operands([polyA], [polyB])
+    if operands is not None:
+        return bool(rect_contains(operands[0][0], operands[1][0]))
     # if the union of the two polygons is equal to the polygon A, then polygon A contains polygon B
     # which is equal to checking if : (polyA U polyB) NOT polyA == 0
     unionAB = boolean(
@@ -437,59 +806,27 @@ def get_direction_between_rects(
     return retDir
 
 
-def fragment_polygon(
-    poly: Polygon,
-    maxPoints = 199,
-    precision = 1e-3,
-) -> Polygon:
-    """_summary_
-    #! Deprecated
-    Fragments the polygon into a Polygon object
-    Args:
-        poly        (Polygon)   : the polygon to fragment
-        maxPoints   (int)       : the maximum number of points to keep
-        precision   (float)     : the precision to use
-    Returns:
-        Polygon: the polygon set resulting from the fragmentation operation
-    """
-    raise DeprecationWarning("This function is deprecated!")
-    #return poly.fracture(max_points = maxPoints, precision = precision)
-
-
-def fragment_net(
-    name: str,
-    cell: Cell,
-    maxPoints = 199,
-    precision = 1e-3,
-) -> Cell:
-    """_summary_
-    Fragments the net into a Cell of Polygon
-    objects resulting from horizontal and vertical
-    cuts in each polygon, and returns it
-    Args:
-        name        (str)       : the name of the cell
-        cell        (Cell)   : Cell object containing the net
-        maxPoints   (int)       : maximum number of points inside the polygon
-        precision   (float)     : precision of the cuts
-    """
-    # create a new gds cell, to which the fragments will be added
-    net = Cell(name, exclude_from_current = True)
-    for (poly, path, label, references) in cell:
-        net.add(fragment_polygon(poly, maxPoints, precision))
-        net.add(fragment_polygon(path, maxPoints, precision))
-        net.add(label)
-        net.add(references)
-    return net
-
 def get_polygons_by_spec(
     cell: Cell,
     layer,
     datatype,
 ) -> list:
-    polys = []
-    for poly in itertools.chain(cell.get_polygonsets(), cell.get_paths()):
-        if poly.layers[0] == layer and poly.datatypes[0] == datatype:
-            polys.append(poly)
+    """_summary_
+    Gets the polygons of a cell with the given (layer, datatype)
+    Args:
+        cell        (Cell | LayerIndexedCell | SpeedsterPolygonStore)   : Cell object. A LayerIndexedCell is
+                                                                          served from its buckets, without a rescan,
+                                                                          and a SpeedsterPolygonStore from its columns
+        layer       (int)                                               : gds layer
+        datatype    (int)                                               : gds datatype
+    Returns:
+        list: list of Polygon objects
+    """
+    if isinstance(cell, (LayerIndexedCell, SpeedsterPolygonStore)):
+        return cell.get_polygons_by_spec(layer, datatype)
+    polys = [poly for poly in cell.polygons if poly.layer == layer and poly.datatype == datatype]
+    for path in cell.paths:
+        polys += [poly for poly in path.to_polygons() if poly.layer == layer and poly.datatype == datatype]
     return polys
 
 def get_polygon_dict(
@@ -499,7 +836,7 @@ def get_polygon_dict(
     """_summary_
     Gets a dictionary of polygons by spec
     Args:
-        cell        (Cell)   : Cell object containing the net
+        cell        (Cell | LayerIndexedCell | SpeedsterPolygonStore)   : Cell object containing the net
         spec        (list)      : list of layer, datatype and name
     Returns:
         dict: dictionary of {(layer,datatype): [polygons]}
@@ -509,6 +846,9 @@ def get_polygon_dict(
         return ret
     if type(specs[0]) != tuple or type(specs[0]) != list and len(specs[0]) != 2:
         raise TypeError("The specifications must be a list of tuples or lists of length 2!")
+    # bucket the cell once instead of rescanning it for each spec
+    if isinstance(cell, Cell) and len(specs) > 1:
+        cell = LayerIndexedCell(cell)
     for spec in specs:
         layer = spec[0]
         datatype = spec[1]
@@ -520,23 +860,32 @@ def get_polygon_dict(
 def check_polygon_in_cell(
     polygon,
     cell: Cell,
+    hashes: set = None,
+    precision = 1e-3,
 ) -> bool:
     """_summary_
     Checks if a polygon is inside a cell already
     Args:
-        polygon (_type_): _description_
-        cell (Cell): _description_
-
+        polygon     (Polygon)                   : Polygon object
+        cell        (Cell | LayerIndexedCell)   : Cell object
+        hashes      (set, optional)             : set of the canonical forms of the cell polygons,
+                                                  see get_polygon_hashes. If provided, the test is
+                                                  performed in constant time for non degenerate polygons
+        precision   (float)                     : size of the database unit, the one the hashes were computed with
     Returns:
-        bool: _description_
+        bool: True if the cell already contains the polygon
     """
     # check if the received polygons are valid
     if type(polygon) != Polygon and type(polygon) != Polygon and type(polygon) != rectangle and type(polygon) != RobustPath:
         raise TypeError("polyA must be a Polygon, Polygon, rectangle or RobustPath object!")
-    layer = polygon.layers[0]
-    datatype = polygon.datatypes[0]
+    if hashes is not None:
+        canon = get_canonical_polygon(polygon, precision)
+        if canon is not None:
+            return canon in hashes
+    layer = polygon.layer
+    datatype = polygon.datatype
     for other in get_polygons_by_spec(cell, layer, datatype):
-        if check_same_polygon(polygon, other):
+        if check_same_polygon(polygon, other, precision):
             return True
     return False
 
@@ -567,45 +916,242 @@ def check_via_connection(
         raise TypeError("polyB must be a Polygon, Polygon, rectangle or RobustPath object!")
     if type(via) != Polygon and type(via) != Polygon and type(via) != rectangle and type(via) != RobustPath:
         raise TypeError("via must be a Polygon, Polygon, rectangle or RobustPath object!")
-    # check if the polygons are the same in pairs
-    if check_same_polygon(polyA, polyB):
-        return False
-    if check_same_polygon(polyA, via):
-        return False
-    if check_same_polygon(polyB, via):
-        return False
-    
     # check if the layers are not the same
-    if polyA.layers[0] == polyB.layers[0]:
+    # (polygons of different layers are never the same polygon)
+    if polyA.layer == polyB.layer:
         return False
-    if polyA.layers[0] == via.layers[0]:
+    if polyA.layer == via.layer:
         return False
-    if polyB.layers[0] == via.layers[0]:
+    if polyB.layer == via.layer:
+        return False
+    # the via must overlap the bounding boxes of both polygons
+    if not check_bounding_box_overlap(via, [polyA, polyB]).all():
         return False
     # finally , check for mutual overlap of vias by the two polygons
     return bool_polygon_overlap_check(polyA,via) and bool_polygon_overlap_check(polyB,via)
 
 
+def _pack_polygons(
+    polygons: list,
+) -> tuple:
+    """_summary_
+    Packs a list of polygons into a vertex buffer and its offsets,
+    to be transferred between processes as plain arrays
+    Args:
+        polygons (list): list of Polygon objects
+    Returns:
+        tuple: ((V, 2) vertex buffer, (N+1,) offsets of each polygon)
+    """
+    offsets = np.zeros(len(polygons) + 1, dtype = np.int64)
+    np.cumsum([len(poly.points) for poly in polygons], out = offsets[1:])
+    if len(polygons) == 0:
+        return np.empty((0, 2)), offsets
+    return np.concatenate([poly.points for poly in polygons]), offsets
+
+
+def _unpack_polygons(
+    vertices: np.array,
+    offsets: np.array,
+    layer: int,
+    datatype: int,
+) -> list:
+    """_summary_
+    Unpacks a vertex buffer into polygons (see _pack_polygons)
+    Args:
+        vertices    (np.array)  : (V, 2) vertex buffer
+        offsets     (np.array)  : (N+1,) offsets of each polygon
+        layer       (int)       : gds layer
+        datatype    (int)       : gds datatype
+    Returns:
+        list: list of Polygon objects
+    """
+    return [
+        Polygon(vertices[start:end], layer = layer, datatype = datatype)
+        for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+
+
+def _split_store_layer(
+    store: SpeedsterPolygonStore,
+) -> tuple:
+    """_summary_
+    Splits the polygons of a single layer store into the polygons whose
+    bounding box touches no other one, which are built as they are, and
+    the vertex buffer of the others, to be joined by the boolean operation
+    Args:
+        store (SpeedsterPolygonStore): store of the polygons of a single layer
+    Returns:
+        tuple: (list of isolated Polygon objects, ((V, 2) vertex buffer, (N+1,) offsets) of the others)
+    """
+    pairs = sweep_overlapping_boxes(store.boxes, store.boxes)
+    touching = np.zeros(len(store), dtype = bool)
+    touching[pairs[pairs[:, 0] != pairs[:, 1]].ravel()] = True
+    others = store.select(np.flatnonzero(touching))
+    return (
+        [store.get_polygon(k) for k in np.flatnonzero(~touching)],
+        (np.asarray(others.vertices) * others.precision, np.asarray(others.offsets)),
+    )
+
+
+def _merge_layer(
+    vertices: np.array,
+    offsets: np.array,
+    layer: int,
+    datatype: int,
+) -> tuple:
+    """_summary_
+    Joins the overlapping polygons of a single layer. 
+    Takes and returns packed polygons (see _pack_polygons), 
+    as it runs in the worker processes
+    Args:
+        vertices    (np.array)  : (V, 2) vertex buffer
+        offsets     (np.array)  : (N+1,) offsets of each polygon
+        layer       (int)       : gds layer
+        datatype    (int)       : gds datatype
+    Returns:
+        tuple: packed joined polygons
+    """
+    polygons = [vertices[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+    return _pack_polygons(_sort_polygons(boolean( polygons, polygons, 'or', layer = layer, datatype = datatype )))
+
+
+def _join_rectangles(
+    rects: np.array,
+    layer: int,
+    datatype: int,
+    precision = 1e-3,
+) -> list:
+    """_summary_
+    Joins the overlapping rectangles of a single layer through the
+    Manhattan engine: the union is computed as disjoint rectangles,
+    which are grouped by shared edges or corners (the boolean operation
+    may join polygons touching at a single vertex). The isolated rectangles
+    are returned as they are, and only the original rectangles of the
+    groups of several pieces are joined by the gdstk boolean operation
+    Args:
+        rects       (np.array)  : (N, 4) int64 array of rectangles
+        layer       (int)       : gds layer
+        datatype    (int)       : gds datatype
+        precision   (float)     : size of the database unit
+    Returns:
+        list: list of joined Polygon objects
+    """
+    pieces = rect_union(rects)
+    pairs, _, _ = get_fragment_neighbours(pieces, 1.0)
+    # the rectangles touching at a single point share a corner
+    _, corners = np.unique(pieces[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 2), axis = 0, return_inverse = True)
+    order = np.argsort(corners.reshape(-1), kind = "stable")
+    same = corners.reshape(-1)[order][1:] == corners.reshape(-1)[order][:-1]
+    pairs = np.concatenate([pairs, np.column_stack([order[:-1][same] // 4, order[1:][same] // 4])])
+    labels = SpeedsterConnectionGraph(pairs, np.zeros(len(pieces), dtype = np.int64)).connected_components()
+    counts = np.bincount(labels)
+    polyList = [
+        rectangle( (x0, y0), (x1, y1), layer = layer, datatype = datatype )
+        for x0, y0, x1, y1 in pieces[counts[labels] == 1] * precision
+    ]
+    # each original rectangle lies inside a single group
+    owners = sweep_overlapping_boxes(rects, pieces, strict = True)
+    owners = owners[np.unique(owners[:, 0], return_index = True)[1]]
+    rectLabels = labels[owners[:, 1]]
+    grouped = counts[rectLabels] > 1
+    order = np.argsort(rectLabels[grouped], kind = "stable")
+    groupLabels = rectLabels[grouped][order]
+    groupRects = rects[owners[grouped, 0]][order] * precision
+    bounds = np.flatnonzero(np.diff(groupLabels)) + 1
+    for group in np.split(groupRects, bounds) if len(groupRects) > 0 else []:
+        group = [rectangle( (x0, y0), (x1, y1) ) for x0, y0, x1, y1 in group]
+        polyList += boolean( group, group, 'or', layer = layer, datatype = datatype )
+    return polyList
+
+
+def _sort_polygons(
+    polygons: list,
+    precision = 1e-3,
+) -> list:
+    """_summary_
+    Sorts the polygons of a layer by their bounding box (snapped to the
+    database unit), so that the joined layers don't depend on the order
+    in which the boolean operation (or the Manhattan engine) outputs them
+    Args:
+        polygons    (list)  : list of Polygon objects
+        precision   (float) : size of the database unit
+    Returns:
+        list: sorted list of Polygon objects
+    """
+    if len(polygons) < 2:
+        return list(polygons)
+    boxes = np.round(get_bounding_boxes(polygons) / precision).astype(np.int64)
+    order = np.lexsort((boxes[:, 3], boxes[:, 2], boxes[:, 1], boxes[:, 0]))
+    return [polygons[k] for k in order]
+
+
 def join_overlapping_polygons_cell(
     cell: Cell,
     layerMap: dict,
+    workers: int = 1,
 ) -> Cell:
     """_summary_
     Joins overlapping the overlapping polygons for each metal 
     layer of a gds cell (resembling a layout), in order to
     join multiple intercepting polygons in a single polygon.
+    The layers are independent, so they can be merged in parallel:
+    the gdstk boolean operations hold the GIL, so each layer is
+    dispatched to a worker process as a packed vertex buffer.
+    If the Manhattan engine is enabled, the layers made only of
+    rectangles are joined through it, in the calling process.
+    The polygons of each layer are sorted by their bounding box
+    (see _sort_polygons), so both paths output the same cell
     Args:
-        cell        (Cell)  : the gdspy.Cell object
-        layerMap    (dict)  : dictionary of {"layer name": (layer, datatype)} tuples
+        cell        (Cell | SpeedsterPolygonStore)  : the gdstk.Cell object, or its columnar store
+        layerMap    (dict)                          : dictionary of {"layer name": (layer, datatype)} tuples
+        workers     (int, optional)                 : number of worker processes (1 merges the layers
+                                                      in the calling process). Defaults to 1.
     Returns:
-        Cell: the new gdspy.Cell object with the joined polygons
+        Cell: the new gdstk.Cell object with the joined polygons, added in the layer map order
     """
-    newCell = Cell(cell.name+"_joined", exclude_from_current = True)
-    polygons = cell.get_polygons(by_spec = list(layerMap.values()))
-    for layer, datatype in polygons.keys():
-        poly = boolean( polygons[(layer, datatype)], polygons[(layer, datatype)], 'or', layer = layer, datatype = datatype )
-        poly = Polygon( poly ,layer = layer, datatype = datatype )
-        newCell.add(poly)
+    newCell = Cell(cell.name+"_joined")
+    layers = []
+    for layer, datatype in layerMap.values():
+        if isinstance(cell, SpeedsterPolygonStore):
+            # the store layers are handed over as vertex buffers, without building their polygons
+            polygons = cell.select(cell.get_indices_by_spec(layer, datatype))
+            rects = polygons.get_rectangles() if manhattan_engine_enabled() else None
+            precision = polygons.precision
+        else:
+            polygons = cell.get_polygons(layer = layer, datatype = datatype)
+            rects = get_rectangles(polygons) if manhattan_engine_enabled() else None
+            precision = 1e-3
+        if len(polygons) == 0:
+            continue
+        layers.append((layer, datatype, polygons, rects, precision))
+    boolLayers = [(layer, datatype, polygons) for layer, datatype, polygons, rects, _ in layers if rects is None]
+    if workers > 1 and len(boolLayers) > 1:
+        with ProcessPoolExecutor(max_workers = min(workers, len(boolLayers))) as executor:
+            futures = []
+            for layer, datatype, polygons in boolLayers:
+                if isinstance(polygons, SpeedsterPolygonStore):
+                    isolated, packed = _split_store_layer(polygons)
+                else:
+                    isolated, packed = [], _pack_polygons(polygons)
+                futures.append((isolated, executor.submit(_merge_layer, *packed, layer, datatype)))
+            # collect the results in the layer order, for a deterministic cell
+            futures = iter(futures)
+            for layer, datatype, _, rects, precision in layers:
+                if rects is not None:
+                    newCell.add(*_sort_polygons(_join_rectangles(rects, layer, datatype, precision)))
+                    continue
+                isolated, future = next(futures)
+                newCell.add(*_sort_polygons(isolated + _unpack_polygons(*future.result(), layer, datatype)))
+        return newCell
+    for layer, datatype, polygons, rects, precision in layers:
+        if rects is not None:
+            poly = _join_rectangles(rects, layer, datatype, precision)
+        elif isinstance(polygons, SpeedsterPolygonStore):
+            isolated, packed = _split_store_layer(polygons)
+            poly = isolated + _unpack_polygons(*_merge_layer(*packed, layer, datatype), layer, datatype)
+        else:
+            poly = boolean( polygons, polygons, 'or', layer = layer, datatype = datatype )
+        newCell.add(*_sort_polygons(poly))
     return newCell
 
 
@@ -619,29 +1165,27 @@ def fuse_overlapping_cells(
     Fuses both cells into a single cell if both cells
     have at least one polygon of any layer in common
     Args:
-        cellA       (Cell): gdspy Cell object
-        cellB       (Cell): gdspy Cell object
+        cellA       (Cell | LayerIndexedCell): gdstk Cell object
+        cellB       (Cell | LayerIndexedCell): gdstk Cell object
         maxPoints   (int, optional): Maximum number of points inside polys when uniting cells. Defaults to 199.
-        precision (float, optional): Precision of the cuts when performing union of cells.Defaults to 1e-3.
+        precision (float, optional): Size of the database unit the common polygons are compared on. Defaults to 1e-3.
 
     Returns:
         Cell: Cells resulting from the union of cellA and cellB
         None: If no polygon of any layer in common
     """
-    # get the layers that are common to both cells
-    layersA = cellA.get_layers()
-    datatypesA = cellA.get_datatypes()
-    ldA = list(zip(layersA, datatypesA))
-    layersB = cellB.get_layers()
-    datatypesB = cellB.get_datatypes()
-    ldB = list(zip(layersB, datatypesB))
-    commonLd = [ld for ld in ldA if ld in ldB] # get the common layer,datatype tuples to both cells
+    indexedA = cellA if isinstance(cellA, LayerIndexedCell) else LayerIndexedCell(cellA)
+    indexedB = cellB if isinstance(cellB, LayerIndexedCell) else LayerIndexedCell(cellB)
+    # get the layer, datatype tuples that are common to both cells
+    commonLd = [ld for ld in indexedA.get_specs() if ld in indexedB.buckets]
     for layer,datatype in commonLd:
-        for polyA in get_polygons_by_spec(cellA, layer, datatype):
-            if check_polygon_in_cell(polyA, cellB):
+        hashesB = get_polygon_hashes(indexedB.get_polygons_by_spec(layer, datatype), precision)
+        for polyA in indexedA.get_polygons_by_spec(layer, datatype):
+            if check_polygon_in_cell(polyA, indexedB, hashesB, precision):
                 # fuse the cells together and return it
-                fuseCell = cellA.copy(cellA.name)
-                [fuseCell.add(item) for item in cellB]
+                fuseCell = indexedA.cell.copy(indexedA.name)
+                cell = indexedB.cell
+                fuseCell.add(*cell.polygons, *cell.paths, *cell.labels, *cell.references)
                 return fuseCell
     return None
 
@@ -655,6 +1199,8 @@ def select_abstraction_depth(
     Extracts the selected layers of the 
     cells of the library at a given 
     abstraction depth, and returns a new Library
+    (see hierarchical_extract for the extraction of
+    the nets without flattening the cells)
     Args:
         name   (str)        : name of the returning library
         lib    (Library) : Library object to be extracted from
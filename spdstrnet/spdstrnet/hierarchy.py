@@ -0,0 +1,935 @@
+"""_summary_
+hierarchy.py contains the hierarchical net extraction:
+the connectivity and the fragment table of each unique
+cell definition are extracted once, from its own geometry,
+and every reference of the cell is an instance of these
+results under the reference transform. The geometry is
+only flattened inside the windows where the geometry of
+a cell touches the geometry of the cells it references.
+It also contains the lazy flattening of the references
+reached by a single traced net
+
+[author]    Diogo André Silvares Dias
+[date]      2026-10-16
+[contact]   das.dias@campus.fct.unl.pt
+"""
+import numpy as np
+from loguru import logger
+from gdstk import(
+    Cell,
+    Polygon,
+    boolean,
+)
+from .data import(
+    SpeedsterConnectionGraph,
+)
+from .geometry import(
+    check_rectangles,
+    bool_polygon_overlap_check,
+    check_polygon_contains_polygon,
+    get_polygon_dict,
+    join_overlapping_polygons_cell,
+)
+from .index import(
+    SpeedsterRTree,
+    get_bounding_box,
+    get_bounding_boxes,
+    sweep_overlapping_boxes,
+    SpeedsterGrowingRTree,
+)
+from .fragment import(
+    SpeedsterFragmentTable,
+    get_fragment_table,
+    get_via_fragment_pairs,
+    concatenate_fragment_tables,
+    cut_fragments,
+    _get_via_fragment_hits,
+)
+from .net import(
+    _build_layer_map_graph,
+    _find_layer_polygon,
+    _trace_net,
+)
+from spdstrutil import(
+    GdsTable,
+    timer,
+)
+
+
+class SpeedsterCellAbstract(object):
+    """_summary_
+    Extraction results of a unique cell definition: the connection
+    graph and the fragment table of its own geometry, the transform of
+    each placed instance of its child cells, and the net labels of its
+    own polygons and of the nets of each instance, joined through the
+    contacts found at the boundaries between them. The vias landing on
+    the metal of another level (own vias on instance metal, instance vias
+    on own metal or on the metal of another instance) are kept as the
+    boundary vias, joining the fragments of the levels (see assemble_fragment_mesh)
+    """
+    __slots__ = [
+        "name",
+        "bbox",
+        "graph",
+        "ownIndex",
+        "children",
+        "transforms",
+        "instanceBoxes",
+        "instanceIndex",
+        "instanceOffsets",
+        "instanceNets",
+        "ownNets",
+        "nNets",
+        "fragments",
+        "fragmentNodes",
+        "boundaryVias",
+        "boundaryViaLayers",
+        "boundaryViaSources",
+    ]
+
+    def __init__(
+        self,
+        name: str,
+        graph: SpeedsterConnectionGraph,
+        children: list,
+        transforms: np.array,
+        instanceBoxes: np.array,
+    ):
+        """_summary_
+        Args:
+            name            (str)                       : name of the cell
+            graph           (SpeedsterConnectionGraph)  : connection graph of the own geometry of the cell
+            children        (list)                      : name of the child cell of each instance
+            transforms      (np.array)                  : (K, 5) transform of each instance (see get_reference_transforms)
+            instanceBoxes   (np.array)                  : (K, 4) bounding box of each instance, in the cell coordinates
+        """
+        self.name = name
+        self.graph = graph
+        self.ownIndex = SpeedsterRTree(graph.boxes)
+        self.children = list(children)
+        self.transforms = np.asarray(transforms, dtype = float).reshape(-1, 5)
+        self.instanceBoxes = np.asarray(instanceBoxes, dtype = float).reshape(-1, 4)
+        self.instanceIndex = SpeedsterRTree(self.instanceBoxes)
+        boxes = np.concatenate([graph.boxes, self.instanceBoxes])
+        self.bbox = None if len(boxes) == 0 else np.concatenate([boxes[:, :2].min(axis = 0), boxes[:, 2:].max(axis = 0)])
+        self.instanceOffsets = np.zeros(len(self.children), dtype = np.int64)
+        self.instanceNets = np.empty(0, dtype = np.int64)
+        self.ownNets = np.zeros(len(graph), dtype = np.int64)
+        self.nNets = 0
+        self.fragments = None
+        self.fragmentNodes = np.empty(0, dtype = np.int64)
+        self.boundaryVias = np.empty((0, 4))
+        self.boundaryViaLayers = np.empty(0, dtype = np.int64)
+        # 0 for the own vias, k + 1 for the vias of the instance k
+        self.boundaryViaSources = np.empty(0, dtype = np.int64)
+
+    def __len__(self) -> int:
+        return len(self.children)
+
+    def __str__(self) -> str:
+        return "Cell Abstract {}: {} polygons, {} instances, {} nets".format(
+            self.name, len(self.graph), len(self), self.nNets
+        )
+
+
+def get_cell_order(
+    top: Cell,
+) -> list:
+    """_summary_
+    Gets the unique cell definitions under a top cell,
+    ordered bottom-up (every cell after the cells it references)
+    Args:
+        top (Cell): top cell of the layout
+    Returns:
+        list: list of the unique Cell objects, ending in the top cell
+    """
+    order = []
+    visited = set()
+
+    def visit(cell):
+        visited.add(cell.name)
+        for ref in cell.references:
+            if isinstance(ref.cell, Cell) and ref.cell.name not in visited:
+                visit(ref.cell)
+        order.append(cell)
+
+    visit(top)
+    return order
+
+
+def get_reference_transforms(
+    ref,
+) -> np.array:
+    """_summary_
+    Gets the transforms of the instances placed by a reference,
+    expanding its repetition (if any) into one transform per instance
+    Args:
+        ref (Reference): gdstk.Reference object
+    Returns:
+        np.array: (K, 5) array of [x, y, rotation, magnification, x reflection] transforms
+    """
+    offsets = ref.repetition.get_offsets()
+    offsets = np.zeros((1, 2)) if len(offsets) == 0 else np.asarray(offsets, dtype = float)
+    transforms = np.empty((len(offsets), 5))
+    transforms[:, :2] = np.asarray(ref.origin, dtype = float) + offsets
+    transforms[:, 2] = ref.rotation
+    transforms[:, 3] = ref.magnification
+    transforms[:, 4] = float(ref.x_reflection)
+    return transforms
+
+
+def transform_points(
+    points: np.array,
+    transform: np.array,
+    precision: float = 1e-3,
+    inverse: bool = False,
+) -> np.array:
+    """_summary_
+    Applies a reference transform to a set of points, in the gdstk order
+    (magnification, x reflection, rotation and translation), snapping the
+    result to the database grid so that abutting instances touch exactly
+    Args:
+        points      (np.array)          : (N, 2) points
+        transform   (np.array)          : [x, y, rotation, magnification, x reflection] transform
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+        inverse     (bool, optional)    : if True, applies the inverse transform. Defaults to False.
+    Returns:
+        np.array: (N, 2) transformed points
+    """
+    x, y, rotation, magnification, reflection = transform
+    c, s = np.cos(rotation), np.sin(rotation)
+    points = np.asarray(points, dtype = float).reshape(-1, 2)
+    if inverse:
+        p = (points - [x, y]) @ np.array([[c, -s], [s, c]]) / magnification
+        if reflection:
+            p[:, 1] = -p[:, 1]
+        return p
+    p = points * magnification
+    if reflection:
+        p[:, 1] = -p[:, 1]
+    p = p @ np.array([[c, s], [-s, c]]) + [x, y]
+    return np.round(p / precision) * precision
+
+
+def transform_box(
+    box: np.array,
+    transform: np.array,
+    precision: float = 1e-3,
+    inverse: bool = False,
+) -> np.array:
+    """_summary_
+    Gets the bounding box of a transformed box (see transform_points)
+    Args:
+        box         (np.array)          : [x0, y0, x1, y1] box
+        transform   (np.array)          : [x, y, rotation, magnification, x reflection] transform
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+        inverse     (bool, optional)    : if True, applies the inverse transform. Defaults to False.
+    Returns:
+        np.array: [x0, y0, x1, y1] bounding box of the transformed box
+    """
+    x0, y0, x1, y1 = box
+    corners = transform_points([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], transform, precision, inverse)
+    return np.concatenate([corners.min(axis = 0), corners.max(axis = 0)])
+
+
+def transform_fragment_table(
+    table: SpeedsterFragmentTable,
+    transform: np.array,
+    precision: float = 1e-3,
+) -> SpeedsterFragmentTable:
+    """_summary_
+    Instantiates the fragment table of a cell under a reference transform.
+    The rectangles stay rectangles under the manhattan (multiple of 90 degrees)
+    rotations, and the neighbour and via pairs and their resistor dimensions are kept
+    Args:
+        table       (SpeedsterFragmentTable)    : fragment table of the cell
+        transform   (np.array)                  : [x, y, rotation, magnification, x reflection] transform
+        precision   (float, optional)           : size of the database unit. Defaults to 1e-3.
+    Returns:
+        SpeedsterFragmentTable: the fragment table in the parent coordinates
+    """
+    quarters = transform[2] / (np.pi / 2)
+    if not np.isclose(quarters, np.round(quarters)):
+        raise ValueError("Only the manhattan rotations keep the fragments rectangular!")
+    corners = np.concatenate([
+        transform_points(table.boxes[:, :2], transform, precision),
+        transform_points(table.boxes[:, 2:], transform, precision),
+    ], axis = 1)
+    magnification = transform[3]
+    return SpeedsterFragmentTable(
+        np.column_stack([
+            np.minimum(corners[:, 0], corners[:, 2]), np.minimum(corners[:, 1], corners[:, 3]),
+            np.maximum(corners[:, 0], corners[:, 2]), np.maximum(corners[:, 1], corners[:, 3]),
+        ]),
+        table.layers,
+        table.parents,
+        table.neighbours,
+        table.contacts * magnification,
+        table.distances * magnification,
+        table.vias,
+        table.viaLayers,
+        table.viaShares,
+    )
+
+
+
+def _get_boundary_neighbours(
+    table: SpeedsterFragmentTable,
+    sources: np.array,
+    precision: float = 1e-3,
+) -> tuple:
+    """_summary_
+    Finds the pairs of touching fragments of the same layer placed by
+    different levels of the hierarchy (abutting across an edge, or
+    overlapping, where the distance is taken along the axis of the
+    largest offset between their centres)
+    Args:
+        table       (SpeedsterFragmentTable)    : fragment table
+        sources     (np.array)                  : (F,) level placing each fragment
+        precision   (float, optional)           : size of the database unit. Defaults to 1e-3.
+    Returns:
+        tuple: ((M, 2) pairs, (M,) shared edge lengths, (M,) distances between the centres)
+    """
+    ints = np.round(table.boxes / precision).astype(np.int64)
+    pairs = sweep_overlapping_boxes(ints, ints)
+    pairs = pairs[
+        (pairs[:, 0] < pairs[:, 1]) &
+        (table.layers[pairs[:, 0]] == table.layers[pairs[:, 1]]) &
+        (sources[pairs[:, 0]] != sources[pairs[:, 1]])
+    ]
+    a, b = ints[pairs[:, 0]], ints[pairs[:, 1]]
+    dx = np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0])
+    dy = np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1])
+    offsets = np.abs((a[:, :2] + a[:, 2:]) - (b[:, :2] + b[:, 2:])) / 2.0
+    # the fragments touching at a corner are not connected
+    keep = (dx > 0) | (dy > 0)
+    axis = np.where(dx == 0, 0, np.where(dy == 0, 1, np.argmax(offsets, axis = 1)))[keep]
+    contacts = np.where(axis == 0, dy[keep], dx[keep]) * precision
+    distances = np.maximum(offsets[keep][np.arange(len(axis)), axis], 1) * precision
+    return pairs[keep], contacts, distances
+
+
+def assemble_fragment_mesh(
+    abstracts: dict,
+    name: str,
+    precision: float = 1e-3,
+    meshes: dict = None,
+) -> SpeedsterFragmentTable:
+    """_summary_
+    Assembles the fragment mesh of a cell, in the cell coordinates: its
+    own fragments and the assembled meshes of its instances (placed by
+    transform_fragment_table) are concatenated, the fragments under the
+    boundary vias of the cell are cut by them, and the levels are joined
+    by the via pairs of the boundary vias and by the pairs of touching
+    fragments of the same layer
+    Args:
+        abstracts   (dict)              : dictionary of {cell name: SpeedsterCellAbstract}
+        name        (str)               : name of the cell
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+        meshes      (dict, optional)    : dictionary of {cell name: assembled mesh} of the cells
+                                          already assembled. Defaults to None.
+    Returns:
+        SpeedsterFragmentTable: the fragment mesh of the cell
+    """
+    meshes = {} if meshes is None else meshes
+    if name in meshes:
+        return meshes[name]
+    abstract = abstracts[name]
+    if abstract.fragments is None:
+        raise ValueError("The cell {} was abstracted without fragments!".format(name))
+    tables = [abstract.fragments] + [
+        transform_fragment_table(assemble_fragment_mesh(abstracts, child, precision, meshes), transform, precision)
+        for child, transform in zip(abstract.children, abstract.transforms)
+    ]
+    sources = np.repeat(np.arange(len(tables)), [len(table) for table in tables])
+    table = concatenate_fragment_tables(tables)
+    vias, viaLayers, viaSources = abstract.boundaryVias, abstract.boundaryViaLayers, abstract.boundaryViaSources
+    # the fragments partially under a boundary via are cut by it
+    hits = sweep_overlapping_boxes(vias, table.boxes, strict = True)
+    hits = hits[np.abs(table.layers[hits[:, 1]] - viaLayers[hits[:, 0]]) == 1]
+    v = np.round(vias[hits[:, 0]] / precision)
+    f = np.round(table.boxes[hits[:, 1]] / precision)
+    partial = ~((v[:, :2] <= f[:, :2]).all(axis = 1) & (v[:, 2:] >= f[:, 2:]).all(axis = 1))
+    table, origins = cut_fragments(table, hits[partial, 1], vias[hits[partial, 0]], precision)
+    sources = sources[origins]
+    # the pairs of a boundary via inside its own level are already in its table
+    pairs, via, area = _get_via_fragment_hits(table.boxes, table.layers, vias, viaLayers, precision)
+    shares = area / np.bincount(via, area, len(vias))[via]
+    new = (sources[pairs[:, 0]] != viaSources[via]) | (sources[pairs[:, 1]] != viaSources[via])
+    table.vias = np.concatenate([table.vias, pairs[new]])
+    table.viaLayers = np.concatenate([table.viaLayers, viaLayers[via[new]]])
+    table.viaShares = np.concatenate([table.viaShares, shares[new]])
+    neighbours, contacts, distances = _get_boundary_neighbours(table, sources, precision)
+    table.neighbours = np.concatenate([table.neighbours, neighbours])
+    table.contacts = np.concatenate([table.contacts, contacts])
+    table.distances = np.concatenate([table.distances, distances])
+    meshes[name] = table
+    return table
+
+
+def _get_instance_polygons(
+    abstracts: dict,
+    abstract: SpeedsterCellAbstract,
+    instance: int,
+    window: np.array,
+    precision: float = 1e-3,
+) -> tuple:
+    """_summary_
+    Flattens the geometry of an instance of a cell inside a window
+    Args:
+        abstracts   (dict)                  : dictionary of {cell name: SpeedsterCellAbstract}
+        abstract    (SpeedsterCellAbstract) : abstract of the cell
+        instance    (int)                   : index of the instance
+        window      (np.array)              : [x0, y0, x1, y1] window, in the cell coordinates
+        precision   (float, optional)       : size of the database unit. Defaults to 1e-3.
+    Returns:
+        tuple: (list of Polygon objects in the cell coordinates, (P,) layer indexes,
+               (P,) index of the net of each polygon among the instance nets of the cell)
+    """
+    transform = abstract.transforms[instance]
+    # widen the window by half a grid step, as the inverse transform is not snapped
+    childWindow = transform_box(window, transform, precision, inverse = True) + np.array([-0.5, -0.5, 0.5, 0.5]) * precision
+    polygons, layers, nets = get_window_polygons(abstracts, abstract.children[instance], childWindow, precision)
+    polygons = [
+        Polygon(transform_points(poly.points, transform, precision), poly.layer, poly.datatype)
+        for poly in polygons
+    ]
+    return polygons, layers, abstract.instanceOffsets[instance] + nets
+
+
+def get_window_polygons(
+    abstracts: dict,
+    name: str,
+    window: np.array,
+    precision: float = 1e-3,
+) -> tuple:
+    """_summary_
+    Flattens the geometry of a cell inside a window: the own polygons of the
+    cell overlapping the window and, recursively, the polygons of the
+    instances overlapping it, in the cell coordinates
+    Args:
+        abstracts   (dict)              : dictionary of {cell name: SpeedsterCellAbstract}
+        name        (str)               : name of the cell
+        window      (np.array)          : [x0, y0, x1, y1] window, in the cell coordinates
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+    Returns:
+        tuple: (list of Polygon objects, (P,) layer indexes, (P,) net labels in the cell)
+    """
+    abstract = abstracts[name]
+    own = abstract.ownIndex.query(window)
+    polygons = [abstract.graph.polygons[node] for node in own]
+    layers = [abstract.graph.layers[own]]
+    nets = [abstract.ownNets[own]]
+    for k in abstract.instanceIndex.query(window):
+        childPolygons, childLayers, childNets = _get_instance_polygons(abstracts, abstract, k, window, precision)
+        polygons += childPolygons
+        layers.append(childLayers)
+        nets.append(abstract.instanceNets[childNets])
+    return polygons, np.concatenate(layers).astype(np.int64), np.concatenate(nets).astype(np.int64)
+
+
+def get_boundary_contacts(
+    polygonsA: list,
+    layersA: np.array,
+    polygonsB: list,
+    layersB: np.array,
+    isVia: np.array,
+) -> np.array:
+    """_summary_
+    Finds the contacts between two sets of polygons: the polygons of the
+    same layer are connected when they overlap or share an edge (as they
+    would be merged), and the vias are connected to the polygons of the
+    adjacent layers when they overlap with a non-null area
+    Args:
+        polygonsA   (list)      : list of Polygon objects
+        layersA     (np.array)  : (N,) layer index of polygonsA
+        polygonsB   (list)      : list of Polygon objects
+        layersB     (np.array)  : (M,) layer index of polygonsB
+        isVia       (np.array)  : boolean mask of the via layers of the layer stack
+    Returns:
+        np.array: (K, 2) array of (index in polygonsA, index in polygonsB) contacts
+    """
+    if len(polygonsA) == 0 or len(polygonsB) == 0:
+        return np.empty((0, 2), dtype = np.int64)
+    boxesA = get_bounding_boxes(polygonsA)
+    boxesB = get_bounding_boxes(polygonsB)
+    pairs = sweep_overlapping_boxes(boxesA, boxesB)
+    la = np.asarray(layersA)[pairs[:, 0]]
+    lb = np.asarray(layersB)[pairs[:, 1]]
+    same = la == lb
+    adjacent = (np.abs(la - lb) == 1) & (isVia[la] != isVia[lb])
+    pairs, same = pairs[same | adjacent], same[same | adjacent]
+    a = boxesA[pairs[:, 0]]
+    b = boxesB[pairs[:, 1]]
+    dx = np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0])
+    dy = np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1])
+    # abutting polygons share an edge, polygons touching at a corner do not
+    keep = np.where(same, (dx > 0) | (dy > 0), (dx > 0) & (dy > 0))
+    bothRects = check_rectangles(polygonsA, boxesA)[pairs[:, 0]] & check_rectangles(polygonsB, boxesB)[pairs[:, 1]]
+    for k in np.flatnonzero(~bothRects & keep):
+        polyA, polyB = polygonsA[pairs[k, 0]], polygonsB[pairs[k, 1]]
+        if same[k]:
+            keep[k] = len(boolean(polyA, polyB, "or")) == 1
+        else:
+            keep[k] = bool_polygon_overlap_check(polyA, polyB)
+    return pairs[keep]
+
+
+def _get_own_boundaries(
+    abstracts: dict,
+    abstract: SpeedsterCellAbstract,
+    isVia: np.array,
+    precision: float,
+) -> tuple:
+    """_summary_
+    Finds the contacts between the own polygons of a cell and its instances,
+    flattening each instance only in the window covered by the own polygons
+    overlapping its bounding box
+    Args:
+        abstracts   (dict)                  : dictionary of {cell name: SpeedsterCellAbstract}
+        abstract    (SpeedsterCellAbstract) : abstract of the cell
+        isVia       (np.array)              : boolean mask of the via layers of the layer stack
+        precision   (float)                 : size of the database unit
+    Returns:
+        tuple: ((E, 2) pairs of (own node, instance net), (C,) own metal nodes and
+               (C, 4) boxes of the instance vias landing on them, (B, 4) boxes, (B,) layers
+               and (B,) sources of the own and instance vias landing on the other level)
+    """
+    graph = abstract.graph
+    edges, nodes, cuts = [np.empty((0, 2), dtype = np.int64)], [np.empty(0, dtype = np.int64)], [np.empty((0, 4))]
+    vias, viaLayers, viaSources = [np.empty((0, 4))], [np.empty(0, dtype = np.int64)], [np.empty(0, dtype = np.int64)]
+    pairs = sweep_overlapping_boxes(abstract.instanceBoxes, graph.boxes)
+    instances, starts = np.unique(pairs[:, 0], return_index = True)
+    for k, start, end in zip(instances, starts, np.append(starts[1:], len(pairs))):
+        own = pairs[start:end, 1]
+        window = np.concatenate([
+            np.maximum(graph.boxes[own, :2].min(axis = 0), abstract.instanceBoxes[k, :2]),
+            np.minimum(graph.boxes[own, 2:].max(axis = 0), abstract.instanceBoxes[k, 2:]),
+        ])
+        polygons, layers, nets = _get_instance_polygons(abstracts, abstract, k, window, precision)
+        contacts = get_boundary_contacts([graph.polygons[node] for node in own], graph.layers[own], polygons, layers, isVia)
+        edges.append(np.column_stack([own[contacts[:, 0]], nets[contacts[:, 1]]]))
+        landing = contacts[isVia[layers[contacts[:, 1]]] & ~isVia[graph.layers[own[contacts[:, 0]]]]]
+        nodes.append(own[landing[:, 0]])
+        cuts.append(get_bounding_boxes([polygons[i] for i in landing[:, 1]]).reshape(-1, 4))
+        vias.append(cuts[-1])
+        viaLayers.append(layers[landing[:, 1]])
+        viaSources.append(np.full(len(landing), k + 1, dtype = np.int64))
+        # the own vias landing on the instance metal
+        landed = own[contacts[isVia[graph.layers[own[contacts[:, 0]]]] & ~isVia[layers[contacts[:, 1]]], 0]]
+        vias.append(graph.boxes[landed].reshape(-1, 4))
+        viaLayers.append(graph.layers[landed])
+        viaSources.append(np.zeros(len(landed), dtype = np.int64))
+    return (
+        np.concatenate(edges), np.concatenate(nodes), np.concatenate(cuts),
+        np.concatenate(vias), np.concatenate(viaLayers), np.concatenate(viaSources),
+    )
+
+
+def _get_instance_boundaries(
+    abstracts: dict,
+    abstract: SpeedsterCellAbstract,
+    isVia: np.array,
+    precision: float,
+) -> np.array:
+    """_summary_
+    Finds the contacts between pairs of overlapping (or abutting) instances
+    of a cell, flattening both only in the intersection of their bounding
+    boxes. The contacts only depend on the relative placement of the two
+    instances, so the regular arrays resolve each placement once
+    Args:
+        abstracts   (dict)                  : dictionary of {cell name: SpeedsterCellAbstract}
+        abstract    (SpeedsterCellAbstract) : abstract of the cell
+        isVia       (np.array)              : boolean mask of the via layers of the layer stack
+        precision   (float)                 : size of the database unit
+    Returns:
+        tuple: ((E, 2) pairs of connected instance nets, (B, 4) boxes, (B,) layers
+               and (B,) sources of the instance vias landing on the metal of another instance)
+    """
+    boxes = abstract.instanceBoxes
+    pairs = sweep_overlapping_boxes(boxes, boxes)
+    pairs = pairs[pairs[:, 0] < pairs[:, 1]]
+    edges = [np.empty((0, 2), dtype = np.int64)]
+    vias, viaLayers, viaSources = [np.empty((0, 4))], [np.empty(0, dtype = np.int64)], [np.empty(0, dtype = np.int64)]
+    cache = {}
+    for ka, kb in pairs:
+        ta, tb = abstract.transforms[ka], abstract.transforms[kb]
+        # placement of the second instance in the frame of the first
+        origin = np.round(transform_points(tb[:2], ta, precision, inverse = True) / precision).astype(np.int64)
+        key = (abstract.children[ka], abstract.children[kb], *ta[2:], *tb[2:], *np.ravel(origin))
+        if key not in cache:
+            window = np.concatenate([np.maximum(boxes[ka, :2], boxes[kb, :2]), np.minimum(boxes[ka, 2:], boxes[kb, 2:])])
+            polygonsA, layersA, netsA = _get_instance_polygons(abstracts, abstract, ka, window, precision)
+            polygonsB, layersB, netsB = _get_instance_polygons(abstracts, abstract, kb, window, precision)
+            contacts = get_boundary_contacts(polygonsA, layersA, polygonsB, layersB, isVia)
+            # the vias of each instance landing on the metal of the other one,
+            # kept relative to the first instance, as the placement repeats
+            landingA = contacts[isVia[layersA[contacts[:, 0]]] & ~isVia[layersB[contacts[:, 1]]], 0]
+            landingB = contacts[isVia[layersB[contacts[:, 1]]] & ~isVia[layersA[contacts[:, 0]]], 1]
+            cache[key] = (
+                np.column_stack([
+                    netsA[contacts[:, 0]] - abstract.instanceOffsets[ka],
+                    netsB[contacts[:, 1]] - abstract.instanceOffsets[kb],
+                ]),
+                get_bounding_boxes([polygonsA[i] for i in landingA] + [polygonsB[i] for i in landingB]).reshape(-1, 4) - np.tile(ta[:2], 2),
+                np.concatenate([layersA[landingA], layersB[landingB]]),
+                np.repeat([0, 1], [len(landingA), len(landingB)]),
+            )
+        netPairs, viaBoxes, layers, sides = cache[key]
+        edges.append(netPairs + abstract.instanceOffsets[[ka, kb]])
+        vias.append(viaBoxes + np.tile(ta[:2], 2))
+        viaLayers.append(layers)
+        viaSources.append(np.array([ka, kb], dtype = np.int64)[sides] + 1)
+    return np.concatenate(edges), np.concatenate(vias), np.concatenate(viaLayers), np.concatenate(viaSources)
+
+
+def _get_own_fragments(
+    abstract: SpeedsterCellAbstract,
+    isVia: np.array,
+    boundaryNodes: np.array,
+    boundaryCuts: np.array,
+    precision: float,
+    workers: int,
+) -> tuple:
+    """_summary_
+    Fragments the own routing metal polygons of a cell, cut by the own
+    vias of the adjacent layers and by the instance vias landing on them,
+    and joins the own metal fragments below and above each own via
+    Args:
+        abstract        (SpeedsterCellAbstract) : abstract of the cell
+        isVia           (np.array)              : boolean mask of the via layers of the layer stack
+        boundaryNodes   (np.array)              : (C,) own metal nodes under an instance via
+        boundaryCuts    (np.array)              : (C, 4) boxes of the instance vias
+        precision       (float)                 : size of the database unit
+        workers         (int)                   : number of worker processes
+    Returns:
+        tuple: (SpeedsterFragmentTable of the own metal, (P,) graph node of each fragmented polygon)
+    """
+    graph = abstract.graph
+    metal = np.flatnonzero(~isVia[graph.layers])
+    vias = np.flatnonzero(isVia[graph.layers])
+    pairs = sweep_overlapping_boxes(graph.boxes[metal], graph.boxes[vias], strict = True)
+    pairs = pairs[np.abs(graph.layers[metal[pairs[:, 0]]] - graph.layers[vias[pairs[:, 1]]]) == 1]
+    position = np.full(len(graph), -1, dtype = np.int64)
+    position[metal] = np.arange(len(metal))
+    owners = np.concatenate([pairs[:, 0], position[boundaryNodes]])
+    cutBoxes = np.concatenate([graph.boxes[vias[pairs[:, 1]]].reshape(-1, 4), boundaryCuts])
+    order = np.argsort(owners, kind = "stable")
+    bounds = np.searchsorted(owners[order], np.arange(len(metal) + 1))
+    cuts = [cutBoxes[order[start:end]] for start, end in zip(bounds[:-1], bounds[1:])]
+    table = get_fragment_table(
+        [graph.polygons[node] for node in metal], graph.layers[metal], precision, cuts, workers
+    )
+    table.vias, table.viaLayers, table.viaShares = get_via_fragment_pairs(
+        table.boxes, table.layers, graph.boxes[vias], graph.layers[vias], precision
+    )
+    return table, metal
+
+
+def build_cell_abstract(
+    cell: Cell,
+    abstracts: dict,
+    layerMap: dict,
+    precision: float = 1e-3,
+    fragments: bool = True,
+    workers: int = 1,
+) -> SpeedsterCellAbstract:
+    """_summary_
+    Builds the abstract of a cell, whose child cells were already abstracted:
+    the own geometry is merged into its connection graph (and fragmented),
+    the references are expanded into instance transforms, and the nets are
+    the connected components of the own polygons and the instance nets,
+    joined by the own contacts and the contacts at the instance boundaries
+    Args:
+        cell        (Cell)              : Cell object
+        abstracts   (dict)              : dictionary of {cell name: SpeedsterCellAbstract} of the child cells
+        layerMap    (dict)              : dictionary of {"layer name": (layer, datatype)},
+                                          ordered as the metal/via stack
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+        fragments   (bool, optional)    : if True, the own metal is fragmented. Defaults to True.
+        workers     (int, optional)     : number of worker processes. Defaults to 1.
+    Returns:
+        SpeedsterCellAbstract: the abstract of the cell
+    """
+    isVia = np.array(["via" in name for name in layerMap.keys()] + [False], dtype = bool)
+    own = Cell(cell.name)
+    own.add(*cell.get_polygons(depth = 0))
+    graph = _build_layer_map_graph(own, layerMap, workers)
+    children, transforms, boxes = [], [], []
+    for ref in cell.references:
+        # the references to empty cells (or to cells without any metal) have no nets
+        if not isinstance(ref.cell, Cell) or abstracts[ref.cell.name].bbox is None:
+            continue
+        child = abstracts[ref.cell.name]
+        for transform in get_reference_transforms(ref):
+            children.append(child.name)
+            transforms.append(transform)
+            boxes.append(transform_box(child.bbox, transform, precision))
+    abstract = SpeedsterCellAbstract(cell.name, graph, children, transforms, boxes)
+    childNets = np.array([abstracts[name].nNets for name in children], dtype = np.int64)
+    abstract.instanceOffsets = np.concatenate([[0], np.cumsum(childNets)[:-1]]).astype(np.int64)[:len(children)]
+    ownEdges, boundaryNodes, boundaryCuts, *ownVias = _get_own_boundaries(abstracts, abstract, isVia, precision)
+    instanceEdges, *instanceVias = _get_instance_boundaries(abstracts, abstract, isVia, precision)
+    # a via landing on several instances is kept once
+    vias = np.column_stack([
+        np.concatenate([ownVias[0], instanceVias[0]]),
+        np.concatenate([ownVias[1], instanceVias[1]]),
+        np.concatenate([ownVias[2], instanceVias[2]]),
+    ])
+    vias = np.unique(vias, axis = 0)
+    abstract.boundaryVias = vias[:, :4]
+    abstract.boundaryViaLayers = vias[:, 4].astype(np.int64)
+    abstract.boundaryViaSources = vias[:, 5].astype(np.int64)
+    # the instance nets are numbered after the own polygons
+    nOwn = len(graph)
+    edges = np.concatenate([graph.contacts, ownEdges + [0, nOwn], instanceEdges + nOwn])
+    labels = SpeedsterConnectionGraph(edges, np.zeros(nOwn + childNets.sum(), dtype = np.int64)).connected_components()
+    abstract.ownNets = labels[:nOwn]
+    abstract.instanceNets = labels[nOwn:]
+    abstract.nNets = int(labels.max(initial = -1)) + 1
+    if fragments:
+        abstract.fragments, abstract.fragmentNodes = _get_own_fragments(
+            abstract, isVia, boundaryNodes, boundaryCuts, precision, workers
+        )
+    return abstract
+
+
+@timer
+def hierarchical_extract(
+    top: Cell,
+    gdsTable: GdsTable,
+    precision: float = 1e-3,
+    fragments: bool = True,
+    workers: int = 1,
+) -> dict:
+    """_summary_
+    Extracts the nets of a hierarchical layout without flattening it:
+    each unique cell definition is abstracted once, bottom-up, so the
+    runtime and memory scale with the unique content of the layout and
+    not with the number of placed instances (see build_cell_abstract).
+    The nets of an instance are mapped onto the nets of its parent
+    through the instanceNets of the parent abstract
+    Args:
+        top         (Cell)              : top cell of the layout
+        gdsTable    (GdsTable)          : GdsTable object containing the gds information
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+        fragments   (bool, optional)    : if True, the own metal of each cell is fragmented
+                                          (requires rectilinear polygons). Defaults to True.
+        workers     (int, optional)     : number of worker processes. Defaults to 1.
+    Returns:
+        dict: dictionary of {cell name: SpeedsterCellAbstract}, ordered bottom-up
+    """
+    logger.info("Extracting metal nets through the cell hierarchy...")
+    layerMap = gdsTable.getDrawingMetalLayersMap()
+    abstracts = {}
+    for cell in get_cell_order(top):
+        abstracts[cell.name] = build_cell_abstract(cell, abstracts, layerMap, precision, fragments, workers)
+    logger.info("Hierarchical extraction is complete. Unique cells: {}, top level nets: {}".format(
+        len(abstracts), abstracts[top.name].nNets
+    ))
+    return abstracts
+
+
+class SpeedsterLazyLayout(object):
+    """_summary_
+    Lazily flattened view of a hierarchical layout: the references are
+    kept as pending instances (a cell, the chain of transforms placing
+    it in the top cell and its transformed bounding box), and an instance
+    is only materialized, adding its own polygons and pending instances
+    of its references, when a query box intersects its bounding box.
+    The instance boxes are kept in a growing spatial index, and the
+    pending flags in an array whose capacity doubles when full
+    """
+    __slots__ = [
+        "specs",
+        "precision",
+        "polygons",
+        "cells",
+        "chains",
+        "index",
+        "flags",
+    ]
+
+    def __init__(
+        self,
+        top: Cell,
+        specs: list,
+        precision: float = 1e-3,
+    ):
+        """_summary_
+        Args:
+            top         (Cell)              : top cell of the layout (materialized at once)
+            specs       (list)              : (layer, datatype) tuples of the materialized layers
+            precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+        """
+        self.specs = set(tuple(spec) for spec in specs)
+        self.precision = precision
+        self.polygons = []
+        self.cells = [top]
+        self.chains = [[]]
+        box = top.bounding_box()
+        self.index = SpeedsterGrowingRTree(np.array(box if box is not None else [(0.0, 0.0), (0.0, 0.0)]).reshape(1, 4))
+        self.flags = np.ones(16, dtype = bool)
+        self._expand(0)
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def __str__(self) -> str:
+        return "Lazy Layout: {} of {} instances materialized, {} polygons".format(
+            len(self) - np.count_nonzero(self.pending), len(self), len(self.polygons)
+        )
+
+    @property
+    def boxes(self) -> np.array:
+        """_summary_
+        Returns:
+            np.array: (N, 4) transformed bounding boxes of the instances
+        """
+        return self.index.boxes
+
+    @property
+    def pending(self) -> np.array:
+        """_summary_
+        Returns:
+            np.array: (N,) boolean mask, True for the instances still to be materialized
+        """
+        return self.flags[:len(self)]
+
+    def _expand(
+        self,
+        instance: int,
+    ):
+        """_summary_
+        Materializes an instance: its own polygons are transformed into the
+        top cell, and its references are added as pending instances
+        Args:
+            instance (int): index of the instance
+        """
+        cell, chain = self.cells[instance], self.chains[instance]
+        self.flags[instance] = False
+        for poly in cell.get_polygons(depth = 0):
+            if (poly.layer, poly.datatype) not in self.specs:
+                continue
+            points = poly.points
+            for transform in chain:
+                points = transform_points(points, transform, self.precision)
+            self.polygons.append(Polygon(points, poly.layer, poly.datatype))
+        boxes = []
+        for ref in cell.references:
+            if not isinstance(ref.cell, Cell) or ref.cell.bounding_box() is None:
+                continue
+            (x0, y0), (x1, y1) = ref.cell.bounding_box()
+            for transform in get_reference_transforms(ref):
+                box = np.array([x0, y0, x1, y1])
+                for t in [transform] + chain:
+                    box = transform_box(box, t, self.precision)
+                self.cells.append(ref.cell)
+                self.chains.append([transform] + chain)
+                boxes.append(box)
+        if len(boxes) > 0:
+            self.index.append(np.array(boxes))
+            if len(self) > len(self.flags):
+                flags = np.zeros(max(2 * len(self.flags), len(self)), dtype = bool)
+                flags[:len(self.flags)] = self.flags
+                self.flags = flags
+            self.flags[len(self) - len(boxes):len(self)] = True
+
+    def expand_overlapping(
+        self,
+        boxes: np.array,
+    ) -> int:
+        """_summary_
+        Materializes the pending instances intersecting the query boxes,
+        down the hierarchy, until no pending instance intersects them
+        Args:
+            boxes (np.array): (N, 4) array of [x0, y0, x1, y1] query boxes
+        Returns:
+            int: number of materialized polygons
+        """
+        count = len(self.polygons)
+        boxes = np.asarray(boxes, dtype = float).reshape(-1, 4)
+        while True:
+            hits = np.unique(np.concatenate([np.empty(0, dtype = np.int64)] + [self.index.query(box) for box in boxes]))
+            hits = hits[self.pending[hits]]
+            if len(hits) == 0:
+                return len(self.polygons) - count
+            for instance in hits:
+                self._expand(instance)
+
+
+@timer
+def lazy_net_extract(
+    entryPolygon: Polygon,
+    layout: Cell,
+    gdsTable: GdsTable,
+    netName: str = "net",
+    precision: float = 1e-3,
+) -> Cell:
+    """_summary_
+    Extracts the net of an entry polygon from a hierarchical layout,
+    materializing only the references reached by the net: the net is
+    traced from the geometry materialized around the entry polygon, and
+    the references intersecting the bounding box of each polygon of the
+    search frontier are materialized before its neighbours are searched.
+    Only the newly materialized polygons are joined (see _trace_net),
+    and the polygons of the net are joined once it is traced
+    Args:
+        entryPolygon    (Polygon)                   : polygon from which the extraction is started
+        layout          (Cell | SpeedsterLazyLayout): top cell of the layout, or its lazy view
+        gdsTable        (GdsTable)                  : GdsTable object containing the gds information
+        netName         (str, optional)             : name of the extracted net. Defaults to "net".
+        precision       (float, optional)           : size of the database unit. Defaults to 1e-3.
+    Returns:
+        Cell: gdstk.Cell object containing the extracted net
+    """
+    layerMap = gdsTable.getDrawingMetalLayersMap()
+    specs = list(layerMap.values())
+    entryKey = (entryPolygon.layer, entryPolygon.datatype)
+    if "via" in gdsTable[entryKey]["name"]:
+        raise ValueError("Entry Polygon must be a routing metal polygon! It cannot be a via!")
+    if not isinstance(layout, SpeedsterLazyLayout):
+        layout = SpeedsterLazyLayout(layout, specs, precision)
+    layout.expand_overlapping(get_bounding_box(entryPolygon).reshape(1, 4))
+    polyDict = {key: [] for key in specs}
+    indexDict = {key: SpeedsterGrowingRTree() for key in specs}
+    layerKeys = list(polyDict.keys())
+    materialized = [0]
+
+    def add_batch():
+        # join the polygons materialized since the last batch
+        batch = Cell(netName)
+        batch.add(*layout.polygons[materialized[0]:])
+        materialized[0] = len(layout.polygons)
+        for key, polys in get_polygon_dict(join_overlapping_polygons_cell(batch, layerMap), specs = specs).items():
+            polyDict[key] += polys
+            indexDict[key].append(get_bounding_boxes(polys))
+
+    def expand(layerIndex, polyIndex):
+        box = indexDict[layerKeys[layerIndex]].boxes[polyIndex]
+        if layout.expand_overlapping(box.reshape(1, 4)) == 0:
+            return False
+        add_batch()
+        return True
+
+    add_batch()
+    entryIndex = _find_layer_polygon(
+        polyDict, indexDict, entryKey,
+        lambda poly: check_polygon_contains_polygon(poly, entryPolygon) or check_polygon_contains_polygon(entryPolygon, poly),
+        get_bounding_box(entryPolygon),
+    )
+    if entryIndex is None:
+        raise ValueError("Entry Polygon is not part of the layout!")
+    traced = Cell(netName)
+    traced.add(*[
+        polyDict[layerKeys[layerIndex]][polyIndex]
+        for layerIndex, polyIndex in _trace_net(
+            polyDict, list(layerMap.keys()), (layerKeys.index(entryKey), entryIndex), indexDict, expand = expand
+        )
+    ])
+    net = Cell(netName)
+    for poly in join_overlapping_polygons_cell(traced, layerMap).polygons:
+        poly.set_property('net', netName)
+        net.add(poly)
+    logger.info("{}".format(layout))
+    return net
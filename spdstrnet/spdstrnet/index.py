@@ -0,0 +1,452 @@
+"""_summary_
+index.py contains the spatial indexing structures
+used to avoid testing every polygon of a layer
+when searching for overlapping geometry
+
+[author]    Diogo André Silvares Dias
+[date]      2026-10-16
+[contact]   das.dias@campus.fct.unl.pt
+"""
+import numpy as np
+
+
+def get_bounding_box(
+    polygon,
+) -> np.array:
+    """_summary_
+    Gets the bounding box of a polygon, or of
+    a list of polygons
+    Args:
+        polygon (Polygon | list): Polygon object or list of Polygon objects
+    Returns:
+        np.array: [x0, y0, x1, y1] bounding box, or None for an empty list
+    """
+    if isinstance(polygon, (list, tuple)):
+        boxes = get_bounding_boxes(polygon)
+        if len(boxes) == 0:
+            return None
+        return np.array([
+            boxes[:, 0].min(),
+            boxes[:, 1].min(),
+            boxes[:, 2].max(),
+            boxes[:, 3].max(),
+        ])
+    box = polygon.bounding_box()
+    if box is None:
+        return None
+    (x0, y0), (x1, y1) = box
+    return np.array([x0, y0, x1, y1], dtype = float)
+
+
+def get_bounding_boxes(
+    polygons: list,
+) -> np.array:
+    """_summary_
+    Gets the bounding boxes of a list of polygons
+    Args:
+        polygons (list): list of Polygon objects
+    Returns:
+        np.array: (N, 4) array of [x0, y0, x1, y1] bounding boxes
+    """
+    boxes = np.empty((len(polygons), 4), dtype = float)
+    for i, poly in enumerate(polygons):
+        (x0, y0), (x1, y1) = poly.bounding_box()
+        boxes[i] = (x0, y0, x1, y1)
+    return boxes
+
+
+def _expand_ranges(
+    starts: np.array,
+    ends: np.array,
+) -> np.array:
+    """_summary_
+    Concatenates the integer ranges [start, end)
+    without a python level loop
+    Args:
+        starts  (np.array): starting index of each range
+        ends    (np.array): ending index (exclusive) of each range
+    Returns:
+        np.array: concatenation of all the ranges
+    """
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype = np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(total)
+
+
+def sweep_overlapping_boxes(
+    boxesA: np.array,
+    boxesB: np.array,
+    strict: bool = False,
+) -> np.array:
+    """_summary_
+    Finds all the overlapping pairs between two sets of bounding boxes.
+    The wide and the tall boxes of both sets are packed into R-trees
+    (see SpeedsterRTree), which are traversed together level by level
+    (see join_rtrees): only the pairs of nodes overlapping along both axes
+    are descended, so a wide box (e.g. a power rail) only visits the nodes
+    it overlaps, and the cost follows the number of overlapping pairs
+    instead of the number of pairs overlapping along x
+    Args:
+        boxesA  (np.array)          : (N, 4) array of [x0, y0, x1, y1] bounding boxes
+        boxesB  (np.array)          : (M, 4) array of [x0, y0, x1, y1] bounding boxes
+        strict  (bool, optional)    : if True, touching boxes do not overlap. Defaults to False.
+    Returns:
+        np.array: (K, 2) array of (index in A, index in B) overlapping pairs, sorted
+    """
+    boxesA = np.asarray(boxesA, dtype = float).reshape(-1, 4)
+    boxesB = np.asarray(boxesB, dtype = float).reshape(-1, 4)
+    # wide and tall boxes are packed apart, so that
+    # the nodes of the trees keep the aspect of their items
+    groupsA = _split_by_aspect(boxesA)
+    groupsB = _split_by_aspect(boxesB)
+    found = [np.empty((0, 2), dtype = np.int64)]
+    for idsA in groupsA:
+        treeA = SpeedsterRTree(boxesA[idsA])
+        for idsB in groupsB:
+            pairs = join_rtrees(treeA, SpeedsterRTree(boxesB[idsB]), strict)
+            found.append(np.column_stack([idsA[pairs[:, 0]], idsB[pairs[:, 1]]]))
+    pairs = np.concatenate(found)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def _split_by_aspect(
+    boxes: np.array,
+) -> list:
+    """_summary_
+    Splits a set of bounding boxes into the wide and the tall ones
+    Args:
+        boxes (np.array): (N, 4) array of [x0, y0, x1, y1] bounding boxes
+    Returns:
+        list: the (non-empty) index arrays of the wide and of the tall boxes
+    """
+    wide = (boxes[:, 2] - boxes[:, 0]) >= (boxes[:, 3] - boxes[:, 1])
+    return [ids for ids in (np.flatnonzero(wide), np.flatnonzero(~wide)) if len(ids) > 0]
+
+
+class SpeedsterRTree(object):
+    """_summary_
+    Static R-tree of bounding boxes, packed
+    using the Sort-Tile-Recursive (STR) algorithm.
+    Each level of the tree is kept as numpy arrays,
+    allowing the queries to be resolved level by level
+    with vectorized overlap checks
+    """
+    __slots__ = [
+        "boxes",
+        "nodeCapacity",
+        "levels",
+    ]
+
+    def __init__(
+        self,
+        boxes: np.array,
+        nodeCapacity: int = 16,
+    ):
+        """_summary_
+        Builds the R-tree over the given bounding boxes
+        Args:
+            boxes        (np.array)      : (N, 4) array of [x0, y0, x1, y1] bounding boxes
+            nodeCapacity (int, optional) : maximum number of children per node. Defaults to 16.
+        """
+        if nodeCapacity < 2:
+            raise ValueError("The node capacity must be at least 2!")
+        self.boxes = np.asarray(boxes, dtype = float).reshape(-1, 4)
+        self.nodeCapacity = nodeCapacity
+        # levels are stored from the leaves to the root as
+        # (node boxes, children order, first child, last child (exclusive)) tuples
+        self.levels = []
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def _str_order(
+        self,
+        boxes: np.array,
+    ) -> np.array:
+        """_summary_
+        Sort-Tile-Recursive ordering of a set of boxes:
+        sort by x center, cut into vertical slabs and
+        sort each slab by y center. The number of slabs
+        follows the spread of the boxes along each axis,
+        measured in median box sizes, so that elongated
+        boxes (e.g. wires) are packed into nodes of
+        the same aspect instead of square tiles
+        Args:
+            boxes (np.array): (N, 4) array of bounding boxes
+        Returns:
+            np.array: the ordering of the boxes
+        """
+        n = len(boxes)
+        nodes = int(np.ceil(n / self.nodeCapacity))
+        cx = boxes[:, 0] + boxes[:, 2]
+        cy = boxes[:, 1] + boxes[:, 3]
+        sizes = np.median(boxes[:, 2:] - boxes[:, :2], axis = 0)
+        spans = np.array([np.ptp(cx), np.ptp(cy)]) / 2 + sizes
+        if spans.max() > 0:
+            sizes = np.maximum(sizes, 1e-9 * spans.max())
+            spans = np.maximum(spans, 1e-9 * spans.max())
+            ratio = (spans[0] / sizes[0]) / (spans[1] / sizes[1])
+        else:
+            ratio = 1.0
+        slabs = int(np.clip(np.round(np.sqrt(nodes * ratio)), 1, nodes))
+        slabSize = int(np.ceil(nodes / slabs)) * self.nodeCapacity
+        order = np.argsort(cx, kind = "stable")
+        slabIds = np.arange(n) // slabSize
+        # sort by slab first, and by y center inside each slab
+        return order[np.lexsort((cy[order], slabIds))]
+
+    def _pack(
+        self,
+        boxes: np.array,
+    ) -> tuple:
+        """_summary_
+        Groups consecutive boxes into nodes
+        Args:
+            boxes (np.array): (N, 4) array of ordered bounding boxes
+        Returns:
+            tuple: (node boxes, first child, last child (exclusive))
+        """
+        n = len(boxes)
+        starts = np.arange(0, n, self.nodeCapacity)
+        ends = np.minimum(starts + self.nodeCapacity, n)
+        nodeBoxes = np.column_stack([
+            np.minimum.reduceat(boxes[:, 0], starts),
+            np.minimum.reduceat(boxes[:, 1], starts),
+            np.maximum.reduceat(boxes[:, 2], starts),
+            np.maximum.reduceat(boxes[:, 3], starts),
+        ])
+        return nodeBoxes, starts, ends
+
+    def _build(self):
+        """_summary_
+        Builds the levels of the tree, from the leaves to the root
+        """
+        if len(self.boxes) == 0:
+            return
+        # the leaf level points to the (reordered) items
+        items = self._str_order(self.boxes)
+        nodeBoxes, starts, ends = self._pack(self.boxes[items])
+        self.levels.append((nodeBoxes, items, starts, ends))
+        while len(nodeBoxes) > 1:
+            order = self._str_order(nodeBoxes)
+            nodeBoxes, starts, ends = self._pack(nodeBoxes[order])
+            self.levels.append((nodeBoxes, order, starts, ends))
+
+    def query(
+        self,
+        box,
+    ) -> np.array:
+        """_summary_
+        Finds the items whose bounding box overlaps the given box
+        (touching boxes are considered to overlap)
+        Args:
+            box (list | np.array): [x0, y0, x1, y1] query box
+        Returns:
+            np.array: sorted indices of the overlapping items
+        """
+        if len(self.levels) == 0 or box is None:
+            return np.empty(0, dtype = np.int64)
+        x0, y0, x1, y1 = box
+        candidates = np.arange(len(self.levels[-1][0]))
+        for nodeBoxes, order, starts, ends in reversed(self.levels):
+            b = nodeBoxes[candidates]
+            hits = candidates[
+                (b[:, 0] <= x1) & (b[:, 2] >= x0) & (b[:, 1] <= y1) & (b[:, 3] >= y0)
+            ]
+            if len(hits) == 0:
+                return np.empty(0, dtype = np.int64)
+            candidates = order[_expand_ranges(starts[hits], ends[hits])]
+        b = self.boxes[candidates]
+        hits = candidates[
+            (b[:, 0] <= x1) & (b[:, 2] >= x0) & (b[:, 1] <= y1) & (b[:, 3] >= y0)
+        ]
+        return np.sort(hits)
+
+
+def _overlapping(
+    boxesA: np.array,
+    boxesB: np.array,
+    strict: bool = False,
+) -> np.array:
+    """_summary_
+    Checks the overlap of the boxes of A and B, pairwise
+    Args:
+        boxesA  (np.array)          : (K, 4) array of [x0, y0, x1, y1] bounding boxes
+        boxesB  (np.array)          : (K, 4) array of [x0, y0, x1, y1] bounding boxes
+        strict  (bool, optional)    : if True, touching boxes do not overlap. Defaults to False.
+    Returns:
+        np.array: (K,) boolean mask, True where the boxes overlap
+    """
+    a, b = boxesA, boxesB
+    if strict:
+        return (b[:, 0] < a[:, 2]) & (b[:, 2] > a[:, 0]) & (b[:, 1] < a[:, 3]) & (b[:, 3] > a[:, 1])
+    return (b[:, 0] <= a[:, 2]) & (b[:, 2] >= a[:, 0]) & (b[:, 1] <= a[:, 3]) & (b[:, 3] >= a[:, 1])
+
+
+def join_rtrees(
+    treeA: SpeedsterRTree,
+    treeB: SpeedsterRTree,
+    strict: bool = False,
+    chunk: int = 1 << 20,
+) -> np.array:
+    """_summary_
+    Finds all the overlapping pairs between the items of two R-trees
+    through a synchronized traversal: starting from the pairs of roots,
+    the deepest of the two nodes of each pair is replaced by its children,
+    and only the pairs of overlapping boxes are kept, level by level
+    Args:
+        treeA   (SpeedsterRTree)    : R-tree of the boxes of A
+        treeB   (SpeedsterRTree)    : R-tree of the boxes of B
+        strict  (bool, optional)    : if True, touching boxes do not overlap. Defaults to False.
+        chunk   (int, optional)     : maximum number of node pairs checked at once. Defaults to 1 << 20.
+    Returns:
+        np.array: (K, 2) array of (index in A, index in B) overlapping pairs, sorted
+    """
+    if len(treeA.levels) == 0 or len(treeB.levels) == 0:
+        return np.empty((0, 2), dtype = np.int64)
+    rootsA = np.arange(len(treeA.levels[-1][0]))
+    rootsB = np.arange(len(treeB.levels[-1][0]))
+    # pending (A ids, B ids, A level, B level) pairs, level -1 being the items;
+    # descending depth first in chunks bounds the memory held at once
+    stack = [(
+        np.repeat(rootsA, len(rootsB)),
+        np.tile(rootsB, len(rootsA)),
+        len(treeA.levels) - 1,
+        len(treeB.levels) - 1,
+    )]
+    found = []
+    while len(stack) > 0:
+        ia, ib, levelA, levelB = stack.pop()
+        if len(ia) > chunk:
+            stack.append((ia[chunk:], ib[chunk:], levelA, levelB))
+            ia, ib = ia[:chunk], ib[:chunk]
+        boxesA = treeA.levels[levelA][0] if levelA >= 0 else treeA.boxes
+        boxesB = treeB.levels[levelB][0] if levelB >= 0 else treeB.boxes
+        items = levelA < 0 and levelB < 0
+        keep = _overlapping(boxesA[ia], boxesB[ib], strict and items)
+        ia, ib = ia[keep], ib[keep]
+        if items:
+            found.append(np.column_stack([ia, ib]))
+        elif levelA >= levelB:
+            _, order, starts, ends = treeA.levels[levelA]
+            ib = np.repeat(ib, ends[ia] - starts[ia])
+            ia = order[_expand_ranges(starts[ia], ends[ia])]
+            stack.append((ia, ib, levelA - 1, levelB))
+        else:
+            _, order, starts, ends = treeB.levels[levelB]
+            ia = np.repeat(ia, ends[ib] - starts[ib])
+            ib = order[_expand_ranges(starts[ib], ends[ib])]
+            stack.append((ia, ib, levelA, levelB - 1))
+    if len(found) == 0:
+        return np.empty((0, 2), dtype = np.int64)
+    pairs = np.concatenate(found).astype(np.int64)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+class SpeedsterGrowingRTree(object):
+    """_summary_
+    R-tree of a growing set of bounding boxes: the boxes are kept
+    in an array whose capacity doubles when full, the static R-tree
+    (see SpeedsterRTree) is only rebuilt when the number of boxes
+    doubles, and the boxes appended since the last build are
+    checked directly, so appending is amortized constant time
+    """
+    __slots__ = [
+        "data",
+        "size",
+        "tree",
+        "nodeCapacity",
+    ]
+
+    def __init__(
+        self,
+        boxes: np.array = None,
+        nodeCapacity: int = 16,
+    ):
+        """_summary_
+        Args:
+            boxes        (np.array, optional)   : (N, 4) array of [x0, y0, x1, y1] initial bounding boxes
+            nodeCapacity (int, optional)        : maximum number of children per node. Defaults to 16.
+        """
+        boxes = np.empty((0, 4)) if boxes is None else np.asarray(boxes, dtype = float).reshape(-1, 4)
+        self.data = np.empty((max(len(boxes), 16), 4))
+        self.data[:len(boxes)] = boxes
+        self.size = len(boxes)
+        self.nodeCapacity = nodeCapacity
+        self.tree = SpeedsterRTree(boxes, nodeCapacity = nodeCapacity)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def boxes(self) -> np.array:
+        """_summary_
+        Returns:
+            np.array: (N, 4) view of the bounding boxes
+        """
+        return self.data[:self.size]
+
+    def append(
+        self,
+        boxes: np.array,
+    ) -> np.array:
+        """_summary_
+        Appends bounding boxes to the index
+        Args:
+            boxes (np.array): (M, 4) array of [x0, y0, x1, y1] bounding boxes
+        Returns:
+            np.array: indices of the appended boxes
+        """
+        boxes = np.asarray(boxes, dtype = float).reshape(-1, 4)
+        start = self.size
+        if start + len(boxes) > len(self.data):
+            data = np.empty((max(2 * len(self.data), start + len(boxes)), 4))
+            data[:start] = self.data[:start]
+            self.data = data
+        self.data[start:start + len(boxes)] = boxes
+        self.size += len(boxes)
+        if self.size > 2 * len(self.tree):
+            self.tree = SpeedsterRTree(self.boxes.copy(), nodeCapacity = self.nodeCapacity)
+        return np.arange(start, self.size)
+
+    def query(
+        self,
+        box,
+    ) -> np.array:
+        """_summary_
+        Finds the items whose bounding box overlaps the given box
+        (touching boxes are considered to overlap)
+        Args:
+            box (list | np.array): [x0, y0, x1, y1] query box
+        Returns:
+            np.array: sorted indices of the overlapping items
+        """
+        if box is None:
+            return np.empty(0, dtype = np.int64)
+        x0, y0, x1, y1 = box
+        built = len(self.tree)
+        b = self.data[built:self.size]
+        tail = np.flatnonzero((b[:, 0] <= x1) & (b[:, 2] >= x0) & (b[:, 1] <= y1) & (b[:, 3] >= y0)) + built
+        return np.concatenate([self.tree.query(box), tail])
+
+
+def build_polygon_index(
+    polyDict: dict,
+    nodeCapacity: int = 16,
+) -> dict:
+    """_summary_
+    Builds a spatial index for each (layer, datatype) of a polygon dictionary
+    Args:
+        polyDict     (dict)          : dictionary of {(layer, datatype): [polygons]}
+        nodeCapacity (int, optional) : maximum number of children per node. Defaults to 16.
+    Returns:
+        dict: dictionary of {(layer, datatype): SpeedsterRTree}
+    """
+    return {
+        key: SpeedsterRTree(get_bounding_boxes(polys), nodeCapacity = nodeCapacity)
+        for key, polys in polyDict.items()
+    }
@@ -0,0 +1,240 @@
+"""_summary_
+manhattan.py contains the rectilinear (Manhattan)
+geometry engine: axis-aligned rectangles are stored as
+int64 [x0, y0, x1, y1] arrays in database units, and the
+geometry operations are resolved through interval arithmetic
+
+[author]    Diogo André Silvares Dias
+[date]      2026-10-16
+[contact]   das.dias@campus.fct.unl.pt
+"""
+import numpy as np
+from bisect import(
+    bisect_left,
+    insort,
+)
+from .index import(
+    sweep_overlapping_boxes,
+)
+
+# the engine is opt-in: when enabled, the geometry.py
+# functions dispatch the rectangle operands to this engine
+__manhattan_engine__ = {"enabled": False}
+
+
+def set_manhattan_engine(
+    enable: bool = True,
+) -> None:
+    """_summary_
+    Enables or disables the dispatch of the geometry
+    operations between rectangles to the Manhattan engine
+    Args:
+        enable (bool, optional): engine state. Defaults to True.
+    """
+    __manhattan_engine__["enabled"] = bool(enable)
+
+
+def manhattan_engine_enabled() -> bool:
+    """_summary_
+    Returns:
+        bool: True if the Manhattan engine is enabled
+    """
+    return __manhattan_engine__["enabled"]
+
+
+def get_rectangle(
+    polygon,
+    precision: float = 1e-3,
+) -> np.array:
+    """_summary_
+    Converts an axis-aligned rectangle polygon into
+    its integer [x0, y0, x1, y1] representation
+    Args:
+        polygon     (Polygon)   : Polygon object
+        precision   (float)     : size of the database unit
+    Returns:
+        np.array: int64 [x0, y0, x1, y1] rectangle, or None if the polygon is not a rectangle
+    """
+    points = np.round(np.asarray(polygon.points) / precision).astype(np.int64)
+    if len(points) != 4:
+        return None
+    xs = np.unique(points[:, 0])
+    ys = np.unique(points[:, 1])
+    if len(xs) != 2 or len(ys) != 2:
+        return None
+    # the four corners must be present (excluding non-rectangular quadrilaterals)
+    corners = set(map(tuple, points.tolist()))
+    if corners != {(xs[0], ys[0]), (xs[1], ys[0]), (xs[1], ys[1]), (xs[0], ys[1])}:
+        return None
+    return np.array([xs[0], ys[0], xs[1], ys[1]], dtype = np.int64)
+
+
+def get_rectangles(
+    polygons: list,
+    precision: float = 1e-3,
+) -> np.array:
+    """_summary_
+    Converts a list of rectangle polygons into an int64 array
+    Args:
+        polygons    (list)  : list of Polygon objects
+        precision   (float) : size of the database unit
+    Returns:
+        np.array: (N, 4) int64 array of rectangles, or None if any of the polygons is not a rectangle
+    """
+    rects = np.empty((len(polygons), 4), dtype = np.int64)
+    for k, poly in enumerate(polygons):
+        rect = get_rectangle(poly, precision)
+        if rect is None:
+            return None
+        rects[k] = rect
+    return rects
+
+
+def rect_overlap(
+    rectsA: np.array,
+    rectsB: np.array,
+) -> np.array:
+    """_summary_
+    Checks the overlap (with non-null area) of the rectangles
+    of A and B, pairwise or broadcasted
+    Args:
+        rectsA (np.array): (..., 4) array of rectangles
+        rectsB (np.array): (..., 4) array of rectangles
+    Returns:
+        np.array: boolean array, True where the rectangles overlap
+    """
+    a = np.asarray(rectsA)
+    b = np.asarray(rectsB)
+    return (
+        (a[..., 0] < b[..., 2]) & (b[..., 0] < a[..., 2]) &
+        (a[..., 1] < b[..., 3]) & (b[..., 1] < a[..., 3])
+    )
+
+
+def rect_contains(
+    rectsA: np.array,
+    rectsB: np.array,
+) -> np.array:
+    """_summary_
+    Checks if the rectangles of A contain the rectangles of B
+    Args:
+        rectsA (np.array): (..., 4) array of rectangles
+        rectsB (np.array): (..., 4) array of rectangles
+    Returns:
+        np.array: boolean array, True where the rectangle of A contains the rectangle of B
+    """
+    a = np.asarray(rectsA)
+    b = np.asarray(rectsB)
+    return (
+        (a[..., 0] <= b[..., 0]) & (a[..., 1] <= b[..., 1]) &
+        (a[..., 2] >= b[..., 2]) & (a[..., 3] >= b[..., 3])
+    )
+
+
+def rect_intersection(
+    rectsA: np.array,
+    rectsB: np.array,
+) -> np.array:
+    """_summary_
+    Computes the intersection of every pair of overlapping
+    rectangles of A and B: the candidate pairs are found by
+    the bounding box sweep before being intersected
+    Args:
+        rectsA (np.array): (N, 4) array of rectangles
+        rectsB (np.array): (M, 4) array of rectangles
+    Returns:
+        np.array: (K, 4) array with the non-empty intersections
+    """
+    a = np.asarray(rectsA).reshape(-1, 4)
+    b = np.asarray(rectsB).reshape(-1, 4)
+    pairs = sweep_overlapping_boxes(a, b, strict = True)
+    a, b = a[pairs[:, 0]], b[pairs[:, 1]]
+    inter = np.concatenate([
+        np.maximum(a[:, :2], b[:, :2]),
+        np.minimum(a[:, 2:], b[:, 2:]),
+    ], axis = -1)
+    keep = (inter[:, 0] < inter[:, 2]) & (inter[:, 1] < inter[:, 3])
+    return inter[keep]
+
+
+def rect_union(
+    rects: np.array,
+) -> np.array:
+    """_summary_
+    Computes the union of a set of rectangles as a set of
+    disjoint rectangles: the plane is swept upwards through the
+    y coordinates of the rectangles, keeping the x intervals of the
+    rectangles crossing the current slab in a sorted active set
+    (inserted at their bottom, removed at their top). The active
+    intervals are merged in each slab, and equal intervals of
+    consecutive slabs are joined together
+    Args:
+        rects (np.array): (N, 4) array of rectangles
+    Returns:
+        np.array: (K, 4) array of disjoint rectangles covering the same region
+    """
+    rects = np.asarray(rects, dtype = np.int64).reshape(-1, 4)
+    rects = rects[(rects[:, 0] < rects[:, 2]) & (rects[:, 1] < rects[:, 3])]
+    if len(rects) == 0:
+        return rects
+    ys = np.unique(rects[:, [1, 3]]).tolist()
+    bottoms = rects[np.argsort(rects[:, 1], kind = "stable")].tolist()
+    tops = rects[np.argsort(rects[:, 3], kind = "stable")].tolist()
+    n = len(rects)
+    ib = it = 0
+    # sorted (x0, x1) intervals of the rectangles crossing the slab
+    active = []
+    # {(x0, x1): y0} of the intervals still open in the previous slab
+    open_ = {}
+    ret = []
+    for y0, y1 in zip(ys[:-1], ys[1:]):
+        while it < n and tops[it][3] <= y0:
+            del active[bisect_left(active, (tops[it][0], tops[it][2]))]
+            it += 1
+        while ib < n and bottoms[ib][1] <= y0:
+            insort(active, (bottoms[ib][0], bottoms[ib][2]))
+            ib += 1
+        intervals = []
+        for x0, x1 in active:
+            if len(intervals) > 0 and x0 <= intervals[-1][1]:
+                intervals[-1][1] = max(intervals[-1][1], x1)
+            else:
+                intervals.append([x0, x1])
+        current = {}
+        for x0, x1 in intervals:
+            current[(x0, x1)] = open_.pop((x0, x1), y0)
+        # the intervals that didn't continue are closed at the bottom of the slab
+        ret += [(x0, start, x1, y0) for (x0, x1), start in open_.items()]
+        open_ = current
+    ret += [(x0, start, x1, ys[-1]) for (x0, x1), start in open_.items()]
+    ret = np.array(ret, dtype = np.int64).reshape(-1, 4)
+    return ret[np.lexsort((ret[:, 0], ret[:, 1]))]
+
+
+def rect_common_edges(
+    rectA: np.array,
+    rectB: np.array,
+) -> np.array:
+    """_summary_
+    Computes the common edge segments of two rectangles
+    through interval arithmetic
+    Args:
+        rectA (np.array): [x0, y0, x1, y1] rectangle
+        rectB (np.array): [x0, y0, x1, y1] rectangle
+    Returns:
+        np.array: (K, 2, 2) array of [[x0, y0], [x1, y1]] segments, sorted
+    """
+    ax0, ay0, ax1, ay1 = [int(v) for v in rectA]
+    bx0, by0, bx1, by1 = [int(v) for v in rectB]
+    edges = []
+    # horizontal edges
+    lo, hi = max(ax0, bx0), min(ax1, bx1)
+    if lo < hi:
+        for y in sorted({ay0, ay1} & {by0, by1}):
+            edges.append([[lo, y], [hi, y]])
+    # vertical edges
+    lo, hi = max(ay0, by0), min(ay1, by1)
+    if lo < hi:
+        for x in sorted({ax0, ax1} & {bx0, bx1}):
+            edges.append([[x, lo], [x, hi]])
+    return np.array(edges, dtype = np.int64).reshape(-1, 2, 2)
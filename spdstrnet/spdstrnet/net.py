@@ -1,4 +1,5 @@
 import itertools
+from collections import deque
 from loguru import logger
 from enum import Enum
 import numpy as np
@@ -15,10 +16,22 @@ from .geometry import(
     join_overlapping_polygons_cell,
     get_polygon_dict,
     check_polygon_contains_polygon,
-    fuse_overlapping_cells,
+    check_bounding_box_overlap,
+    get_layer_pair_contacts,
+    get_layer_joins,
 )
 from .data import(
     SpeedsterPort,
+    SpeedsterConnectionGraph,
+)
+from .store import(
+    SpeedsterPolygonStore,
+)
+from .index import(
+    SpeedsterRTree,
+    get_bounding_box,
+    get_bounding_boxes,
+    build_polygon_index,
 )
 from spdstrutil import (
     GdsTable,
@@ -26,276 +39,502 @@ from spdstrutil import (
     timer,
 )
 
-def _recursive_net_search(
-    previousViasPolygon,
-    polyDict,
-    layerIndex,
-    net,
+def _get_layer_index(
+    indexDict: dict,
+    key: tuple,
 ):
     """_summary_
-    (Descending order of metal layers)
-    Recursively searches for the polygons of the metal alyer above
-    that intercept the vias polygons parsed as input
+    Gets the spatial index of a (layer, datatype)
     Args:
-        previousViasPolygon (Polygon): vias polygons of the layer below
-        polyDict            (dict)      : dictionary of {(layer, datatype): [polygons]} tuples
-        layerIndex          (int)       : polyDict keys list index of the current vias polygons (layer, datatype) tuple        
-        net                 (gdspy.Cell): gdspy.Cell object containing the net that is being extracted 
+        indexDict   (dict)  : dictionary of {(layer, datatype): SpeedsterRTree}
+        key         (tuple) : (layer, datatype) tuple
+    Returns:
+        SpeedsterRTree: the spatial index, or None if no index is available
+    """
+    return indexDict.get(key) if indexDict is not None else None
 
+def _trace_net(
+    polyDict: dict,
+    layerNames: list,
+    entry: tuple,
+    indexDict: dict = None,
+    targets: list = None,
+    expand = None,
+) -> list:
+    """_summary_
+    Traces the net of an entry polygon through a breadth first
+    search over the polygon ids of the metal/via stack. Each polygon
+    is expanded once (a visited bitmap is kept per layer), towards
+    the vias/metals of the adjacent layers it overlaps, so the cost
+    is bounded by the size of the net itself.
+    The geometry may grow from the frontier of the search: the expansion
+    callback is called with each polygon before its neighbours are searched,
+    and may append polygons to the layers of the polygon dictionary (and their
+    boxes to the SpeedsterGrowingRTree indexes of the layers). As the layers are
+    then only joined by batches, the polygons of the same layer joined to the
+    expanded polygon (see get_layer_joins) are also part of the net
+    Args:
+        polyDict    (dict)      : dictionary of {(layer, datatype): [polygons]}, ordered as the metal/via stack
+        layerNames  (list)      : names of the layers of the polygon dictionary, in the same order
+        entry       (tuple)     : (layer index, polygon index) of the entry polygon
+        indexDict   (dict)      : dictionary of {(layer, datatype): SpeedsterRTree} spatial indexes (optional)
+        targets     (list)      : (layer index, polygon index) polygons to be reached. If provided, the
+                                  search stops as soon as all of them are reached (optional)
+        expand      (function)  : expansion callback, called as expand(layer index, polygon index)
+                                  and returning True if it appended any polygon (optional)
     Returns:
-    
+        list: (layer index, polygon index) of the polygons of the net, in the order they were reached
     """
-    layerDatatypeList = list(polyDict.keys())
-    if layerIndex >= len(layerDatatypeList):
-        return # reached the highest layer, the search is over
-    layer,datatype = layerDatatypeList[layerIndex]
-    # for each polygon of the m2 layer
-    #poly_id = 0
-    for polyset in list(polyDict[(layer, datatype)]):
-        #print(f'Poly Layer : {lindex} Poly id : {poly_id}')
-        # if the m2m1 vias polys that intersept the M1 layer intersept the m2 layer as well, add the poly to the netlist
-        if bool_polygon_overlap_check(polyset, previousViasPolygon):
-            if not check_polygon_in_cell(polyset, net):
-                net.add(polyset)
-            # check then the m3_m2 vias that intersect the same m2 layer, and add them to the netlist
-            auxLayerIndex = layerIndex + 1
-            if auxLayerIndex < len(layerDatatypeList):
-                viaLayer, viaDatatype = layerDatatypeList[auxLayerIndex]
-                # get intercepting vias above the current layer
-                if bool_polygon_overlap_check(polyset, polyDict[(viaLayer,viaDatatype)]): # if there are intersepting vias
-                    nextViasPolygons = check_polygon_overlap(polyset, polyDict[(viaLayer,viaDatatype)], viaLayer, viaDatatype)
-                    if not check_polygon_in_cell(polyset, net):
-                        net.add(nextViasPolygons) # add the vias polygons to the netlist
-                    _recursive_net_search(nextViasPolygons, polyDict, auxLayerIndex+1, net)
+    layerKeys = list(polyDict.keys())
+    isVia = ["via" in name for name in layerNames]
+    if expand is not None and (indexDict is None or any(key not in indexDict for key in layerKeys)):
+        raise ValueError("The expansion of the net requires the spatial index of every layer!")
+    boxes = []
+    for key in layerKeys:
+        index = _get_layer_index(indexDict, key)
+        boxes.append(index.boxes if index is not None else get_bounding_boxes(polyDict[key]))
+    visited = [np.zeros(len(polyDict[key]), dtype = bool) for key in layerKeys]
+    remaining = set(targets) if targets is not None else None
+    visited[entry[0]][entry[1]] = True
+    queue = deque([entry])
+    net = [entry]
+    if remaining is not None:
+        remaining.discard(entry)
+        if len(remaining) == 0:
+            return net
+    while len(queue) > 0:
+        layerIndex, polyIndex = queue.popleft()
+        if expand is not None and expand(layerIndex, polyIndex):
+            for k, key in enumerate(layerKeys):
+                boxes[k] = indexDict[key].boxes
+                if len(polyDict[key]) > len(visited[k]):
+                    # the visited bitmaps grow by doubling
+                    grown = np.zeros(max(2 * len(visited[k]), len(polyDict[key])), dtype = bool)
+                    grown[:len(visited[k])] = visited[k]
+                    visited[k] = grown
+        box = boxes[layerIndex][polyIndex]
+        # vias connect to the metals of the adjacent layers, and vice-versa
+        nextLayers = [
+            nextLayer for nextLayer in (layerIndex - 1, layerIndex + 1)
+            if nextLayer >= 0 and nextLayer < len(layerKeys) and isVia[nextLayer] != isVia[layerIndex]
+        ]
+        if expand is not None:
+            nextLayers.append(layerIndex)
+        for nextLayer in nextLayers:
+            index = _get_layer_index(indexDict, layerKeys[nextLayer])
+            if index is not None:
+                candidates = index.query(box)
+            else:
+                candidates = np.arange(len(polyDict[layerKeys[nextLayer]]))
+            candidates = candidates[~visited[nextLayer][candidates]]
+            if len(candidates) == 0:
+                continue
+            nextPolys = polyDict[layerKeys[nextLayer]]
+            getContacts = get_layer_joins if nextLayer == layerIndex else get_layer_pair_contacts
+            contacts = getContacts(
+                [polyDict[layerKeys[layerIndex]][polyIndex]],
+                [nextPolys[c] for c in candidates],
+                boxesA = box.reshape(1, 4),
+                boxesB = boxes[nextLayer][candidates],
+            )
+            for c in candidates[contacts[:, 1]].tolist():
+                visited[nextLayer][c] = True
+                queue.append((nextLayer, c))
+                net.append((nextLayer, c))
+                if remaining is not None:
+                    remaining.discard((nextLayer, c))
+                    if len(remaining) == 0:
+                        # early exit: all the requested polygons were reached
+                        return net
+    return net
 
-def _reverse_recursive_net_search(
-    previousViasPolygon,
-    polyDict,
-    layerIndex,
-    net,
-) :
+def get_via_contacts_table(
+    polyDict: dict,
+    layerNames: list,
+    indexDict: dict = None,
+) -> dict:
     """_summary_
-    (Descending order of metal layers)
-    Recursively searches for the polygons of the metal layer below
-    that intercept the vias polygons parsed as input 
+    Computes the incidence table between each via layer and the
+    routing metal layers directly below and above it, in a single
+    sweep per pair of adjacent layers
     Args:
-        previousViasPolygon (Polygon): vias polygons of the layer above
-        polyDict            (dict)      : dictionary of {(layer, datatype): [polygons]} tuples
-        layerIndex          (int)       : polyDict keys list index of the current vias polygons (layer, datatype) tuple        
-        net                 (gdspy.Cell): gdspy.Cell object containing the net that is being extracted 
+        polyDict    (dict)  : dictionary of {(layer, datatype): [polygons]}, ordered as the metal/via stack
+        layerNames  (list)  : names of the layers of the polygon dictionary, in the same order
+        indexDict   (dict)  : dictionary of {(layer, datatype): SpeedsterRTree} spatial indexes,
+                              whose bounding boxes are reused (optional)
+    Returns:
+        dict: dictionary of {(metal (layer, datatype), via (layer, datatype)): (K, 2) array of
+              (metal polygon index, via polygon index) contacts}
+    """
+    layerKeys = list(polyDict.keys())
+    def _boxes(key):
+        index = _get_layer_index(indexDict, key)
+        return index.boxes if index is not None else None
+    table = {}
+    for viaIndex, viaKey in enumerate(layerKeys):
+        if "via" not in layerNames[viaIndex]:
+            continue
+        # a via connects the routing metal layers directly below and above it
+        for metalIndex in (viaIndex - 1, viaIndex + 1):
+            if metalIndex < 0 or metalIndex >= len(layerKeys) or "via" in layerNames[metalIndex]:
+                continue
+            metalKey = layerKeys[metalIndex]
+            table[(metalKey, viaKey)] = get_layer_pair_contacts(
+                polyDict[metalKey],
+                polyDict[viaKey],
+                boxesA = _boxes(metalKey),
+                boxesB = _boxes(viaKey),
+            )
+    return table
 
+def _get_via_contacts(
+    polyDict: dict,
+    contactsTable: dict,
+) -> np.array:
+    """_summary_
+    Converts the via contacts table into contacts between polygon identifiers,
+    given by the position of each polygon in the polygon dictionary (in order of the keys)
+    Args:
+        polyDict        (dict)  : dictionary of {(layer, datatype): [polygons]}
+        contactsTable   (dict)  : via contacts table, see get_via_contacts_table
     Returns:
-    
+        np.array: (E, 2) array of (metal polygon id, via polygon id) contacts
     """
-    layerDatatypeList = list(polyDict.keys())
-    if layerIndex < 0:
-        return # reached the lowest layer i nthe previous iteration, the search is over
-    layer,datatype = layerDatatypeList[layerIndex]
-    # for each polygon of the m2 layer
-    #poly_id = 0
-    for polyset in list(polyDict[(layer, datatype)]):
-        #print(f'Poly Layer : {lindex} Poly id : {poly_id}')
-        # if the m2m1 vias polys that intersept the M1 layer intersept the m2 layer as well, add the poly to the netlist
-        if bool_polygon_overlap_check(polyset, previousViasPolygon):
-            if not check_polygon_in_cell(polyset, net):
-                net.add(polyset)
-            # check then the m3_m2 vias that intersect the same m2 layer, and add them to the netlist
-            auxLayerIndex = layerIndex - 1
-            if auxLayerIndex >= 0:
-                viaLayer, viaDatatype = layerDatatypeList[auxLayerIndex]
-                # get intercepting vias above the current layer
-                if bool_polygon_overlap_check(polyset, polyDict[(viaLayer,viaDatatype)]): # if there are intersepting vias
-                    nextViasPolygons = check_polygon_overlap(polyset, polyDict[(viaLayer,viaDatatype)], viaLayer, viaDatatype)
-                    if not check_polygon_in_cell(polyset, nextViasPolygons):
-                        net.add(nextViasPolygons) # add the vias polygons to the netlist
-                    _recursive_net_search(nextViasPolygons, polyDict, auxLayerIndex-1, net)
+    layerKeys = list(polyDict.keys())
+    offsets = np.cumsum([0] + [len(polyDict[key]) for key in layerKeys])
+    contacts = [np.empty((0, 2), dtype = np.int64)]
+    for (metalKey, viaKey), pairs in contactsTable.items():
+        contacts.append(pairs + [offsets[layerKeys.index(metalKey)], offsets[layerKeys.index(viaKey)]])
+    return np.concatenate(contacts)
 
+@timer
+def build_connection_graph(
+    layout: Cell,
+    gdsTable: GdsTable,
+    workers: int = 1,
+) -> SpeedsterConnectionGraph:
+    """_summary_
+    Builds the connection graph of the metal and via
+    layers of a layout. The graph is built once, and the
+    nets are then obtained without any further geometry processing
+    Args:
+        layout      (Cell | SpeedsterPolygonStore)  : Cell object containing the layout, or its columnar store
+        gdsTable    (GdsTable)                      : GdsTable object containing the gds information
+        workers     (int, optional)                 : number of processes merging the layers in parallel. Defaults to 1.
+    Returns:
+        SpeedsterConnectionGraph: the connection graph of the layout
+    """
+    # layerMap starts in met1 layer, followed by a via, met, via ....
+    return _build_layer_map_graph(layout, gdsTable.getDrawingMetalLayersMap(), workers)
 
-def _net_connection_search(
-    polygonLayerIndex: int, # layer where the current polygon is situated in
-    viaIndex: int,          # vias through which the connection happens
-    metalLayerIndex: int,   # layer where the search for connections is performed
-    currentPolygon,         # current polygon from which the connection is beggining in
-    polyDict: dict,
-    net: Cell,
-):
+def _build_layer_map_graph(
+    layout: Cell,
+    layerMap: dict,
+    workers: int = 1,
+) -> SpeedsterConnectionGraph:
+    """_summary_
+    Builds the connection graph of a layout for the
+    given metal/via stack (see build_connection_graph)
+    Args:
+        layout      (Cell | SpeedsterPolygonStore)  : Cell object containing the layout, or its columnar store
+        layerMap    (dict)                          : dictionary of {"layer name": (layer, datatype)},
+                                                      ordered as the metal/via stack
+        workers     (int, optional)                 : number of processes merging the layers in parallel. Defaults to 1.
+    Returns:
+        SpeedsterConnectionGraph: the connection graph of the layout
+    """
+    layerNames = list(layerMap.keys())
+    # obtain a layout of adjoint polygons
+    unitedCell = join_overlapping_polygons_cell(layout, layerMap, workers)
+    polyDict = get_polygon_dict(unitedCell,specs=list(layerMap.values()))
+    indexDict = build_polygon_index(polyDict)
+    contacts = _get_via_contacts(polyDict, get_via_contacts_table(polyDict, layerNames, indexDict))
+    layers = np.repeat(
+        np.arange(len(polyDict)), 
+        [len(polys) for polys in polyDict.values()]
+    )
+    boxes = np.concatenate(
+        [index.boxes for index in indexDict.values()] + [np.empty((0, 4))]
+    )
+    return SpeedsterConnectionGraph(
+        contacts,
+        layers,
+        layerKeys = list(polyDict.keys()),
+        boxes = boxes,
+        polygons = list(itertools.chain(*polyDict.values())),
+    )
+
+def _find_graph_node(
+    graph: SpeedsterConnectionGraph,
+    entryPolygon,
+) -> int:
+    """_summary_
+    Finds the node of the connection graph whose polygon
+    contains (or is contained by) the entry polygon
+    Args:
+        graph        (SpeedsterConnectionGraph) : connection graph of the layout
+        entryPolygon (Polygon)                  : polygon to be found
+    Returns:
+        int: node identifier, or None if the polygon is not in the graph
+    """
+    key = (entryPolygon.layer, entryPolygon.datatype)
+    if key not in graph.layerKeys:
+        return None
+    candidates = np.flatnonzero(
+        (graph.layers == graph.layerKeys.index(key)) & 
+        check_bounding_box_overlap(entryPolygon, None, boxesB = graph.boxes)
+    )
+    for node in candidates:
+        poly = graph.polygons[node]
+        if check_polygon_contains_polygon(poly, entryPolygon) or check_polygon_contains_polygon(entryPolygon, poly):
+            return int(node)
+    return None
+
+def _graph_net_extract(
+    entryPolygon,
+    graph: SpeedsterConnectionGraph,
+    netName: str = "net",
+) -> Cell:
     """_summary_
-    Recursively searches for the polygons of different metal layers that
-    are connected between each other through at least a single via
+    Extracts the net to which the entry polygon belongs
+    through a connected components query on the connection graph
     Args:
-        polygonLayerIndex (int)         : index of the layer where the current polygon is situated
-        viaIndex          (int)         : index of the vias layer through which the connection happens
-        metalLayerIndex   (int)         : index of the metal layer where the search for connections is performed
-        currentPolygon    (Polygon)  : current polygon from which the connection is beggining in
-        polyDict          (dict)        : dictionary of {(layer, datatype): [polygons]} tuples
-        net               (Cell)        : gdspy.Cell object containing the net that is being extracted
+        entryPolygon (Polygon)                  : polygon from which the extraction is started
+        graph        (SpeedsterConnectionGraph) : connection graph of the layout
+        netName      (str)                      : name of the extracted net
+    Returns:
+        Cell : gdstk.Cell object containing the extracted net
     """
-    metalLayers = list(polyDict.keys())
-    # end of search conditions
-    if viaIndex < 0 or viaIndex > len(metalLayers):
-        return
-    if metalLayerIndex < 0 or metalLayerIndex > len(metalLayers):
-        return
-    if polygonLayerIndex < 0 or polygonLayerIndex > len(metalLayers):
-        return
-    # otherwise, continue the search
-    viaLayer, viaDatatype = metalLayers[viaIndex][0], metalLayers[viaIndex][1]
-    vias = check_polygon_overlap(currentPolygon, polyDict[metalLayers[viaIndex]], viaLayer, viaDatatype)
-    if not check_polygon_in_cell(vias, net):
-        vias.properties['net'] = net.name
-        net.add(vias)
-    for poly in polyDict[metalLayers[metalLayerIndex]]:
-        if bool_polygon_overlap_check(poly, vias):
-            if not check_polygon_in_cell(poly, net):
-                poly.properties['net'] = net.name
-                net.add(poly)
-            _net_connection_search(metalLayerIndex, viaIndex+2, metalLayerIndex+2, poly, polyDict, net)
-            _net_connection_search(metalLayerIndex, viaIndex-2, metalLayerIndex-2, poly, polyDict, net)
+    node = _find_graph_node(graph, entryPolygon)
+    if node is None:
+        raise ValueError("Entry Polygon is not part of the connection graph!")
+    net = Cell(netName)
+    for polyId in graph.get_net(node):
+        graph.polygons[polyId].set_property('net', netName)
+        net.add(graph.polygons[polyId])
+    return net
+
+def _get_graph_net_ids(
+    graph: SpeedsterConnectionGraph,
+    gdsTable: GdsTable,
+) -> np.array:
+    """_summary_
+    Numbers the nets of a connection graph in the order of
+    its connected components, skipping the components made
+    only of vias (which are not nets)
+    Args:
+        graph       (SpeedsterConnectionGraph)  : connection graph of the layout
+        gdsTable    (GdsTable)                  : GdsTable object containing the gds information
+    Returns:
+        np.array: net id of each node of the graph (-1 for the via only components)
+    """
+    labels = graph.connected_components()
+    isVia = np.array(
+        ["via" in gdsTable.getLayerName(*key) for key in graph.layerKeys] + [False], dtype = bool
+    )
+    hasMetal = np.bincount(
+        labels, weights = ~isVia[graph.layers], minlength = labels.max(initial = -1) + 1
+    ) > 0
+    labelNets = np.where(hasMetal, np.cumsum(hasMetal) - 1, -1)
+    return labelNets[labels]
 
 @timer
 def _total_unlabeled_net_extract(
     layout: Cell,
     gdsTable: GdsTable,
+    graph: SpeedsterConnectionGraph = None,
 ) -> Library:
     """_summary_
-    Extracts all the metal nets from a layout Cell object by performing
-    multiple polygon boolean operations,
+    Extracts all the metal nets from a layout Cell object as the
+    connected components of its connection graph,
     returning a Library with the extracted nets
     Args:
-        layout      (Cell)          : Cell object containing the layout
-        nets        (Library)    : Library object to which the extracted nets will be added
-        gdsTable    (GdsTable)      : GdsTable object containing the gds information
+        layout      (Cell | SpeedsterPolygonStore)  : Cell object containing the layout, or its columnar store
+        gdsTable    (GdsTable)                      : GdsTable object containing the gds information
+        graph       (SpeedsterConnectionGraph)      : previously built connection graph of the layout (optional)
     Returns:
         Library : Library object containing the extracted nets
     """
     logger.info("Extracting metal nets through geometry processing...")
-    netId = 0
-    nets = [] # temporary list to save the generated Cell nets
-    # layerMap starts in met1 layer, followed by a via, met, via ....
-    layerMap = gdsTable.getDrawingMetalLayersMap()
-    # the number of metal layers selected for extraction 
-    # is either 1, 3, 5, 7 or 9
-    startingLayerIndex = startingLayerIndex = round(len(polyDict.keys())/2.0)-1 if len(polyDict.keys()) > 3 else 0
-    # obtain a layout of adjoint polygons
-    unitedCell = join_overlapping_polygons_cell(layout, layerMap)
-    polyDict = get_polygon_dict(unitedCell,specs=layerMap.values())
-    #each of the polygons of the central routing metal layer will be a starting polygon
-    # for the search
-    for poly in polyDict[ list(polyDict.keys())[startingLayerIndex] ]:
-        # create a new net
-        newNet = Cell(f'net_{netId}', exclude_from_current=True)
-        # add the starting polygon to the net
-        poly.properties['net'] = newNet.name
-        newNet.add(poly)
-        # search for the rest of the polygons that are connected to the starting polygon
-        _net_connection_search(
-            startingLayerIndex, 
-            startingLayerIndex+1, 
-            startingLayerIndex+2, 
-            poly, 
-            polyDict,
-            newNet
-        )
-        _net_connection_search(
-            startingLayerIndex, 
-            startingLayerIndex-1, 
-            startingLayerIndex-2, 
-            poly, 
-            polyDict,
-            newNet
-        )
-        # add the net to the list of nets
-        nets.append(newNet)
+    if graph is None:
+        graph = build_connection_graph(layout, gdsTable)
+    nodeNets = _get_graph_net_ids(graph, gdsTable)
     # create a Library object to store the extracted nets
     netsLib = Library("nets")
-    # Join the nets that have at least one polygon in common, creating a new net
-    # !TROUBLE IN THIS SNIPPET ************
-    def mapFunc(netA, netB):
-        if netA.name != netB.name:
-            fusion = fuse_overlapping_cells(netA, netB)
-            if fusion is not None:
-                return fusion
-    # run the fusion process until the number of fused nets together doesn't change anymore
-    fusedNets = nets
-    length = len(fusedNets)
-    prevLength = 0
-    while length != prevLength:
-        fusedNets   = list(map(mapFunc, nets, fusedNets))
-        prevLength  = length
-        length      = len(fusedNets)
-    # ! TROUBLE IN THIS SNIPPET ***********  
-    # normalize the fused nets
-    def _normalize_nets(
-        net: Cell  
-    ) -> Cell:
-        """_summary_
-        """
-        for poly in net.polygons:
-            poly.properties['net'] = net.name
-        return net
-    fusedNets = [_normalize_nets(net) for net in fusedNets]
-    # finally, add the fused nets to the nets gds library
-    [netsLib.add(net) for net in fusedNets]
-    labels = [cellName for cellName in netsLib.cells.keys()]
-    logger.info("Net extraction is complete. Nets found :{}".format(len(labels)))
+    for group in graph.get_nets():
+        # a set of vias without any routing metal polygon is not a net
+        if nodeNets[group[0]] < 0:
+            continue
+        newNet = Cell(f'net_{nodeNets[group[0]]}')
+        for polyId in group:
+            graph.polygons[polyId].set_property('net', newNet.name)
+            newNet.add(graph.polygons[polyId])
+        netsLib.add(newNet)
+    logger.info("Net extraction is complete. Nets found :{}".format(len(netsLib.cells)))
     logger.warning("Net renaming is advised!")
     return netsLib
 
 
+@timer
+def assign_store_net_ids(
+    store: SpeedsterPolygonStore,
+    gdsTable: GdsTable,
+    graph: SpeedsterConnectionGraph = None,
+) -> np.array:
+    """_summary_
+    Extracts all the metal nets of a columnar polygon store and
+    fills its net id column: each polygon of the store takes the
+    net id of the joined polygon of the connection graph containing it
+    (the ids match the net_{id} cells of _total_unlabeled_net_extract)
+    Args:
+        store       (SpeedsterPolygonStore)     : columnar store of the layout
+        gdsTable    (GdsTable)                  : GdsTable object containing the gds information
+        graph       (SpeedsterConnectionGraph)  : previously built connection graph of the store (optional)
+    Returns:
+        np.array: net id of each polygon of the store (-1 if the polygon belongs to no net)
+    """
+    if graph is None:
+        graph = build_connection_graph(store, gdsTable)
+    nodeNets = _get_graph_net_ids(graph, gdsTable)
+    nodes = _map_store_to_graph(store, graph)
+    netIds = np.where(nodes >= 0, nodeNets[nodes], -1)
+    store.set_net_ids(netIds)
+    return netIds
+
+def _map_store_to_graph(
+    store: SpeedsterPolygonStore,
+    graph: SpeedsterConnectionGraph,
+) -> np.array:
+    """_summary_
+    Maps each polygon of a store to the joined polygon (node)
+    of the connection graph that contains it
+    Args:
+        store   (SpeedsterPolygonStore)     : columnar store of the layout
+        graph   (SpeedsterConnectionGraph)  : connection graph built from the store
+    Returns:
+        np.array: graph node of each polygon of the store (-1 if the polygon is not in the graph)
+    """
+    ret = np.full(len(store), -1, dtype = np.int64)
+    tol = 1e-9
+    for layerIndex, (layer, datatype) in enumerate(graph.layerKeys):
+        nodes = np.flatnonzero(graph.layers == layerIndex)
+        if len(nodes) == 0:
+            continue
+        index = SpeedsterRTree(graph.boxes[nodes])
+        for polyId in store.get_indices_by_spec(layer, datatype):
+            box = store.boxes[polyId]
+            candidates = nodes[index.query(box)]
+            b = graph.boxes[candidates]
+            # the joined polygon must contain the bounding box of the polygon
+            candidates = candidates[
+                (b[:, 0] <= box[0] + tol) & (b[:, 1] <= box[1] + tol) &
+                (b[:, 2] >= box[2] - tol) & (b[:, 3] >= box[3] - tol)
+            ]
+            if len(candidates) > 1:
+                polygon = store.get_polygon(polyId)
+                candidates = [
+                    node for node in candidates 
+                    if check_polygon_contains_polygon(graph.polygons[node], polygon)
+                ]
+            if len(candidates) > 0:
+                ret[polyId] = candidates[0]
+    return ret
+
+def _find_layer_polygon(
+    polyDict: dict,
+    indexDict: dict,
+    key: tuple,
+    match,
+    box: np.array,
+) -> int:
+    """_summary_
+    Finds the first polygon of a layer, among the ones
+    overlapping a bounding box, satisfying a condition
+    Args:
+        polyDict    (dict)      : dictionary of {(layer, datatype): [polygons]}
+        indexDict   (dict)      : dictionary of {(layer, datatype): SpeedsterRTree} spatial indexes
+        key         (tuple)     : (layer, datatype) of the layer
+        match       (function)  : condition to be satisfied by the polygon
+        box         (np.array)  : [x0, y0, x1, y1] search box
+    Returns:
+        int: index of the polygon in the layer, or None if there is no such polygon
+    """
+    polys = polyDict[key]
+    index = _get_layer_index(indexDict, key)
+    candidates = index.query(box) if index is not None else range(len(polys))
+    for c in candidates:
+        if match(polys[c]):
+            return int(c)
+    return None
+
 @timer
 def _unlabeled_net_extraction(
     entryPolygon,
     layout: Cell,
     gdsTable: GdsTable,
     netName = "net",
+    ports: list = None,
 ) -> Cell :
     """_summary_
     Performs the automatic extraction of the net
     to which the entry polygon belongs to from the layout
     without recurring to the labelling of each polygon.
     Args:
-        entryPolygon (Polygon) : polygon from which the extraction is started
-        layout       (Cell)       : Cell object containing the layout
-        gdsTable     (GdsTable)   : GdsTable object containing the gds information
+        entryPolygon (Polygon)                      : polygon from which the extraction is started
+        layout       (Cell | SpeedsterPolygonStore) : Cell object containing the layout, or its columnar store
+        gdsTable     (GdsTable)                     : GdsTable object containing the gds information
+        netName      (str)                          : name of the extracted net
+        ports        (list)                         : list of SpeedsterPort objects. If provided, the extraction
+                                                      stops once the polygons of all the ports are reached,
+                                                      returning only the part of the net traced until then (optional)
     Returns:
-        Cell : gdspy.Cell object containing the extracted net
+        Cell : gdstk.Cell object containing the extracted net
     """
-    net = Cell(netName, exclude_from_current=True)
-    entryLayer = entryPolygon.layers[0]
-    entryDataType = entryPolygon.datatypes[0]
+    entryLayer = entryPolygon.layer
+    entryDataType = entryPolygon.datatype
     # layerMap starts in met1 layer, followed by a via, met, via ....
     layerMap = gdsTable.getDrawingMetalLayersMap()
-    if "via" in gdsTable[(entryLayer, entryDataType)]:
+    if "via" in gdsTable[(entryLayer, entryDataType)]["name"]:
         raise ValueError("Entry Polygon must be a routing metal polygon! It cannot be a via!")
     
     # obtain a layout of adjoint polygons
     unitedCell = join_overlapping_polygons_cell(layout, layerMap)
-    polyDict = get_polygon_dict(unitedCell,specs=layerMap.values())
-    unitedCellEntryPolygon = None
-    for poly in itertools.chain(unitedCell.get_polygonsets(), unitedCell.get_polygons()):
-        if check_polygon_contains_polygon(poly, entryPolygon) or check_polygon_contains_polygon(entryPolygon, poly):
-            unitedCellEntryPolygon = poly
-            poly.properties['net'] = netName
-            net.add(poly)
-            break
-    # starting from the entry polygon, perform a recursive search for the net
-    polygonLayerIndex = list(polyDict.keys()).index((entryLayer, entryDataType))    
-    _net_connection_search(
-        polygonLayerIndex, 
-        polygonLayerIndex+1, 
-        polygonLayerIndex+2, 
-        unitedCellEntryPolygon, 
-        polyDict,
-        net
-    )
-    _net_connection_search(
-        polygonLayerIndex, 
-        polygonLayerIndex-1, 
-        polygonLayerIndex-2, 
-        unitedCellEntryPolygon, 
-        polyDict, 
-        net
+    polyDict = get_polygon_dict(unitedCell,specs=list(layerMap.values()))
+    indexDict = build_polygon_index(polyDict)
+    layerKeys = list(polyDict.keys())
+    entryLayerIndex = layerKeys.index((entryLayer, entryDataType))
+    entryIndex = _find_layer_polygon(
+        polyDict, indexDict, (entryLayer, entryDataType),
+        lambda poly: check_polygon_contains_polygon(poly, entryPolygon) or check_polygon_contains_polygon(entryPolygon, poly),
+        get_bounding_box(entryPolygon),
     )
+    if entryIndex is None:
+        raise ValueError("Entry Polygon is not part of the layout!")
+    # the polygons containing the ports are the targets of the search
+    targets = None
+    if ports is not None:
+        targets = []
+        for port in ports:
+            key = layerMap[port.layer] if port.layer in layerMap else port.layer
+            x, y = port.location
+            portIndex = None
+            if key in polyDict:
+                portIndex = _find_layer_polygon(
+                    polyDict, indexDict, key, lambda poly: poly.contain((x, y)), np.array([x, y, x, y])
+                )
+            if portIndex is None:
+                logger.warning("Port {} is not placed over the layout geometry!".format(port.name))
+                targets = None
+                break
+            targets.append((layerKeys.index(key), portIndex))
+    # starting from the entry polygon, perform a breadth first search for the net
+    net = Cell(netName)
+    for layerIndex, polyIndex in _trace_net(
+        polyDict, list(layerMap.keys()), (entryLayerIndex, entryIndex), indexDict, targets
+    ):
+        poly = polyDict[layerKeys[layerIndex]][polyIndex]
+        poly.set_property('net', netName)
+        net.add(poly)
     return net
 
 def _labeled_net_extract(
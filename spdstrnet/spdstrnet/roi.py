@@ -0,0 +1,138 @@
+"""_summary_
+roi.py contains the region of interest (ROI) net extraction:
+instead of merging the whole layout, the layout is clipped to
+a window around the requested ports through its spatial index,
+and the window is grown until the traced net is closed inside it
+
+[author]    Diogo André Silvares Dias
+[date]      2026-10-16
+[contact]   das.dias@campus.fct.unl.pt
+"""
+import numpy as np
+from loguru import logger
+from gdstk import(
+    Cell,
+    rectangle,
+)
+from .store import(
+    SpeedsterPolygonStore,
+)
+from .index import(
+    SpeedsterRTree,
+    get_bounding_boxes,
+)
+from .net import(
+    _unlabeled_net_extraction,
+)
+from spdstrutil import(
+    GdsTable,
+    timer,
+)
+
+
+def get_port_window(
+    ports: list,
+    margin: float = None,
+) -> np.array:
+    """_summary_
+    Gets the initial window of a set of ports: the bounding box of
+    their locations, grown by the margin on every side
+    Args:
+        ports   (list)              : list of SpeedsterPort objects
+        margin  (float, optional)   : margin around the ports. Defaults to half
+                                      of the largest side of the ports bounding box
+    Returns:
+        np.array: [x0, y0, x1, y1] window
+    """
+    if len(ports) == 0:
+        raise ValueError("At least one port is required to place the window!")
+    locations = np.array([port.location for port in ports], dtype = float).reshape(-1, 2)
+    box = np.concatenate([locations.min(axis = 0), locations.max(axis = 0)])
+    if margin is None:
+        margin = 0.5 * max(box[2] - box[0], box[3] - box[1])
+    return box + np.array([-margin, -margin, margin, margin])
+
+
+def clip_layout(
+    store: SpeedsterPolygonStore,
+    window: np.array,
+    index: SpeedsterRTree = None,
+) -> SpeedsterPolygonStore:
+    """_summary_
+    Clips a layout to a window: the polygons whose bounding box
+    overlaps the window are kept whole
+    Args:
+        store   (SpeedsterPolygonStore) : columnar store of the layout
+        window  (np.array)              : [x0, y0, x1, y1] window
+        index   (SpeedsterRTree)        : spatial index of the store polygons (optional)
+    Returns:
+        SpeedsterPolygonStore: the store of the polygons overlapping the window
+    """
+    if index is None:
+        index = SpeedsterRTree(store.boxes)
+    return store.select(index.query(window))
+
+
+@timer
+def roi_net_extract(
+    layout,
+    gdsTable: GdsTable,
+    ports: list,
+    margin: float = None,
+    growth: float = 2.0,
+    netName: str = "net",
+) -> Cell:
+    """_summary_
+    Extracts the net of the first port inside a region of interest: the
+    layout is clipped to the window of the ports (see get_port_window) and
+    the net is traced in the clipped layout. While a polygon of the net
+    reaches the window boundary, the net may continue outside of it, so the
+    window is grown (to the net bounding box plus a margin multiplied by the
+    growth factor at each iteration) and the net is traced again
+    Args:
+        layout      (Cell | SpeedsterPolygonStore)  : Cell object containing the layout, or its columnar store
+        gdsTable    (GdsTable)                      : GdsTable object containing the gds information
+        ports       (list)                          : list of SpeedsterPort objects of the net, starting by the entry port
+        margin      (float, optional)               : initial margin around the ports (see get_port_window)
+        growth      (float, optional)               : growth factor of the margin at each iteration. Defaults to 2.0.
+        netName     (str, optional)                 : name of the extracted net. Defaults to "net".
+    Returns:
+        Cell: gdstk.Cell object containing the extracted net
+    """
+    if growth <= 1.0:
+        raise ValueError("The window growth factor must be larger than 1!")
+    store = layout if isinstance(layout, SpeedsterPolygonStore) else SpeedsterPolygonStore.from_cell(layout)
+    index = SpeedsterRTree(store.boxes)
+    layoutBox = np.concatenate([store.boxes[:, :2].min(axis = 0), store.boxes[:, 2:].max(axis = 0)])
+    layerMap = gdsTable.getDrawingMetalLayersMap()
+    entry = ports[0]
+    if entry.layer not in layerMap:
+        raise ValueError("Port {} must be placed in a routing metal layer!".format(entry.name))
+    layer, datatype = layerMap[entry.layer]
+    x, y = entry.location
+    half = store.precision / 2
+    entryPolygon = rectangle((x - half, y - half), (x + half, y + half), layer = layer, datatype = datatype)
+    window = get_port_window(ports, margin)
+    step = max(window[2] - window[0], window[3] - window[1], store.precision) / 2
+    iteration = 0
+    while True:
+        iteration += 1
+        clipped = clip_layout(store, window, index)
+        net = _unlabeled_net_extraction(entryPolygon, clipped, gdsTable, netName)
+        boxes = get_bounding_boxes(net.polygons)
+        inside = (
+            (boxes[:, 0] > window[0]) & (boxes[:, 1] > window[1]) &
+            (boxes[:, 2] < window[2]) & (boxes[:, 3] < window[3])
+        )
+        covered = (window[:2] <= layoutBox[:2]).all() and (window[2:] >= layoutBox[2:]).all()
+        logger.info("ROI iteration {}: window {}, {} of {} polygons, {} net polygons".format(
+            iteration, window.tolist(), len(clipped), len(store), len(net.polygons)
+        ))
+        if inside.all() or covered:
+            return net
+        # the net reaches the window boundary: grow the window around it
+        step *= growth
+        window = np.concatenate([
+            np.minimum(window[:2], boxes[:, :2].min(axis = 0)) - step,
+            np.maximum(window[2:], boxes[:, 2:].max(axis = 0)) + step,
+        ])
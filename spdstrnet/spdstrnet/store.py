@@ -0,0 +1,439 @@
+"""_summary_
+store.py contains the polygon storage structures
+used to access the geometry of a layout by (layer, datatype)
+without rescanning the whole cell on each query
+
+[author]    Diogo André Silvares Dias
+[date]      2026-10-16
+[contact]   das.dias@campus.fct.unl.pt
+"""
+import os
+import numpy as np
+from gdstk import(
+    Cell,
+    Polygon,
+    FlexPath,
+    RobustPath,
+)
+
+
+class LayerIndexedCell(object):
+    """_summary_
+    Wrapper of a gdstk Cell that buckets its polygons
+    (and the polygons of its paths) by (layer, datatype).
+    The buckets are built once and kept up to date as
+    new geometry is added through the wrapper, turning
+    the per spec lookups into O(1) + size of the result
+    """
+    __slots__ = [
+        "cell",
+        "buckets",
+    ]
+
+    def __init__(
+        self,
+        cell: Cell,
+    ):
+        """_summary_
+        Buckets the polygons of the given cell
+        Args:
+            cell (Cell | str): gdstk Cell object to wrap, or the name of a new empty cell
+        """
+        if isinstance(cell, LayerIndexedCell):
+            cell = cell.cell
+        if isinstance(cell, str):
+            cell = Cell(cell)
+        if not isinstance(cell, Cell):
+            raise TypeError("cell must be a gdstk Cell object or a cell name!")
+        self.cell = cell
+        self.buckets = {}
+        for poly in cell.polygons:
+            self._bucket(poly)
+        for path in cell.paths:
+            for poly in path.to_polygons():
+                self._bucket(poly)
+
+    def __len__(self) -> int:
+        return sum(len(polys) for polys in self.buckets.values())
+
+    def __str__(self) -> str:
+        specs = ", ".join(f"{key}: {len(polys)}" for key, polys in self.buckets.items())
+        return f"LayerIndexedCell({self.cell.name}; {specs})"
+
+    @property
+    def name(self) -> str:
+        return self.cell.name
+
+    def _bucket(
+        self,
+        polygon: Polygon,
+    ) -> None:
+        """_summary_
+        Appends a polygon to the bucket of its (layer, datatype)
+        Args:
+            polygon (Polygon): Polygon object
+        """
+        self.buckets.setdefault((polygon.layer, polygon.datatype), []).append(polygon)
+
+    def add(
+        self,
+        *elements,
+    ):
+        """_summary_
+        Adds elements to the wrapped cell, updating the
+        buckets with the added polygons and paths
+        Args:
+            *elements (Polygon | FlexPath | RobustPath | Label | Reference): elements to add
+        Returns:
+            LayerIndexedCell: this object
+        """
+        self.cell.add(*elements)
+        for element in elements:
+            if isinstance(element, Polygon):
+                self._bucket(element)
+            elif isinstance(element, (FlexPath, RobustPath)):
+                for poly in element.to_polygons():
+                    self._bucket(poly)
+        return self
+
+    def get_specs(self) -> list:
+        """_summary_
+        Returns:
+            list: the (layer, datatype) tuples present in the cell
+        """
+        return [key for key, polys in self.buckets.items() if len(polys) > 0]
+
+    def get_polygons_by_spec(
+        self,
+        layer: int,
+        datatype: int,
+    ) -> list:
+        """_summary_
+        Gets the polygons of a (layer, datatype)
+        Args:
+            layer       (int): gds layer
+            datatype    (int): gds datatype
+        Returns:
+            list: list of Polygon objects
+        """
+        return list(self.buckets.get((layer, datatype), []))
+
+
+class SpeedsterPolygonStore(object):
+    """_summary_
+    Columnar representation of the (flattened) polygons of a layout:
+    a single integer vertex buffer in database units, the offsets of
+    each polygon in the buffer and the per polygon layer, datatype,
+    bounding box and net id arrays. The store is saved as a directory
+    of .npy files, which are memory mapped on reload so that the
+    workspace is shared between processes instead of being rebuilt
+    as gdstk Polygon objects
+    """
+    __slots__ = [
+        "name",
+        "precision",
+        "vertices",
+        "offsets",
+        "layers",
+        "datatypes",
+        "boxes",
+        "netIds",
+    ]
+    # columns saved to / loaded from disk
+    columns = ["vertices", "offsets", "layers", "datatypes", "boxes", "netIds"]
+
+    def __init__(
+        self,
+        name: str,
+        vertices: np.array,
+        offsets: np.array,
+        layers: np.array,
+        datatypes: np.array,
+        boxes: np.array = None,
+        netIds: np.array = None,
+        precision: float = 1e-3,
+    ):
+        """_summary_
+        Args:
+            name        (str)       : name of the store (used as the name of the generated cells)
+            vertices    (np.array)  : (V, 2) integer vertex buffer, in database units
+            offsets     (np.array)  : (N+1,) offsets of the polygons in the vertex buffer
+            layers      (np.array)  : (N,) gds layer of each polygon
+            datatypes   (np.array)  : (N,) gds datatype of each polygon
+            boxes       (np.array)  : (N, 4) [x0, y0, x1, y1] bounding boxes, in user units.
+                                      Computed from the vertices if not provided
+            netIds      (np.array)  : (N,) net id of each polygon (-1 if unassigned)
+            precision   (float)     : size of the database unit
+        """
+        if len(offsets) != len(layers) + 1 or len(layers) != len(datatypes):
+            raise ValueError("The offsets, layers and datatypes arrays are inconsistent!")
+        self.name = name
+        self.precision = float(precision)
+        self.vertices = vertices
+        self.offsets = offsets
+        self.layers = layers
+        self.datatypes = datatypes
+        if boxes is None:
+            boxes = self._compute_boxes()
+        self.boxes = boxes
+        if netIds is None:
+            netIds = np.full(len(layers), -1, dtype = np.int64)
+        self.netIds = netIds
+
+    def __len__(self) -> int:
+        return len(self.layers)
+
+    def __str__(self) -> str:
+        return "SpeedsterPolygonStore({}): {} polygons, {} vertices".format(
+            self.name, len(self), len(self.vertices)
+        )
+
+    @classmethod
+    def from_cell(
+        cls,
+        cell: Cell,
+        precision: float = 1e-3,
+        dtype = np.int64,
+    ):
+        """_summary_
+        Builds the store from the flattened polygons of a cell
+        (polygons, paths and references)
+        Args:
+            cell        (Cell)              : gdstk Cell object
+            precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+            dtype       (type, optional)    : integer type of the vertex buffer. Defaults to np.int64.
+        Returns:
+            SpeedsterPolygonStore: the columnar store of the cell
+        """
+        polygons = cell.get_polygons()
+        counts = np.array([len(poly.points) for poly in polygons], dtype = np.int64)
+        offsets = np.zeros(len(polygons) + 1, dtype = np.int64)
+        np.cumsum(counts, out = offsets[1:])
+        if len(polygons) > 0:
+            points = np.concatenate([poly.points for poly in polygons])
+        else:
+            points = np.empty((0, 2))
+        scaled = np.round(points / precision)
+        info = np.iinfo(dtype)
+        if len(scaled) > 0 and (scaled.min() < info.min or scaled.max() > info.max):
+            raise ValueError("The layout coordinates overflow the vertex buffer type!")
+        return cls(
+            cell.name,
+            scaled.astype(dtype),
+            offsets,
+            np.array([poly.layer for poly in polygons], dtype = np.int32),
+            np.array([poly.datatype for poly in polygons], dtype = np.int32),
+            precision = precision,
+        )
+
+    def _compute_boxes(self) -> np.array:
+        """_summary_
+        Computes the bounding boxes of the polygons from the vertex buffer
+        Returns:
+            np.array: (N, 4) array of [x0, y0, x1, y1] bounding boxes
+        """
+        boxes = np.zeros((len(self), 4), dtype = float)
+        starts = np.asarray(self.offsets[:-1])
+        filled = np.flatnonzero(np.diff(self.offsets) > 0)
+        if len(filled) == 0:
+            return boxes
+        vertices = np.asarray(self.vertices)
+        boxes[filled, :2] = np.minimum.reduceat(vertices, starts[filled], axis = 0)
+        boxes[filled, 2:] = np.maximum.reduceat(vertices, starts[filled], axis = 0)
+        return boxes * self.precision
+
+    def save(
+        self,
+        path: str,
+    ) -> None:
+        """_summary_
+        Saves the store as a directory of .npy files
+        Args:
+            path (str): path of the directory
+        """
+        os.makedirs(path, exist_ok = True)
+        for column in self.columns:
+            np.save(os.path.join(path, column + ".npy"), np.asarray(getattr(self, column)))
+        np.save(
+            os.path.join(path, "meta.npy"), 
+            np.array([self.name, repr(self.precision)])
+        )
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        mmap: bool = True,
+    ):
+        """_summary_
+        Loads a store saved with save(). By default the columns are
+        memory mapped (read-only), so the load is instantaneous and the
+        pages are shared among the processes reading the same store
+        Args:
+            path (str)              : path of the directory
+            mmap (bool, optional)   : memory map the columns. Defaults to True.
+        Returns:
+            SpeedsterPolygonStore: the loaded store
+        """
+        mode = 'r' if mmap else None
+        columns = {
+            column: np.load(os.path.join(path, column + ".npy"), mmap_mode = mode)
+            for column in cls.columns
+        }
+        name, precision = np.load(os.path.join(path, "meta.npy")).tolist()
+        return cls(name, precision = float(precision), **columns)
+
+    def get_points(
+        self,
+        index: int,
+    ) -> np.array:
+        """_summary_
+        Args:
+            index (int): polygon index
+        Returns:
+            np.array: (K, 2) vertices of the polygon, in user units
+        """
+        return self.vertices[self.offsets[index]:self.offsets[index + 1]] * self.precision
+
+    def get_polygon(
+        self,
+        index: int,
+    ) -> Polygon:
+        """_summary_
+        Materializes a polygon of the store as a gdstk Polygon
+        Args:
+            index (int): polygon index
+        Returns:
+            Polygon: Polygon object
+        """
+        return Polygon(
+            self.get_points(index), 
+            layer = int(self.layers[index]), 
+            datatype = int(self.datatypes[index])
+        )
+
+    def get_rectangles(
+        self,
+        indices: np.array = None,
+    ) -> np.array:
+        """_summary_
+        Gets the integer rectangles of polygons straight from the vertex buffer
+        Args:
+            indices (np.array, optional): polygon indices. Defaults to all the polygons.
+        Returns:
+            np.array: (N, 4) int64 [x0, y0, x1, y1] rectangles in database units,
+                      or None if any of the polygons is not an axis-aligned rectangle
+        """
+        offsets = np.asarray(self.offsets)
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices, dtype = np.int64)
+        starts = offsets[:-1][indices]
+        if np.any(offsets[1:][indices] - starts != 4):
+            return None
+        points = np.asarray(self.vertices)[starts[:, None] + np.arange(4)].astype(np.int64)
+        lo, hi = points.min(axis = 1), points.max(axis = 1)
+        # the vertices are corners, and the edges alternate between the two axes
+        moves = np.roll(points, -1, axis = 1) != points
+        corners = ((points == lo[:, None]) | (points == hi[:, None])).all(axis = (1, 2))
+        alternate = (moves.sum(axis = 2) == 1).all(axis = 1) & (moves[..., 0] != np.roll(moves[..., 0], -1, axis = 1)).all(axis = 1)
+        if not np.all(corners & alternate & (lo < hi).all(axis = 1)):
+            return None
+        return np.concatenate([lo, hi], axis = 1)
+
+    def get_indices_by_spec(
+        self,
+        layer: int,
+        datatype: int,
+    ) -> np.array:
+        """_summary_
+        Args:
+            layer       (int): gds layer
+            datatype    (int): gds datatype
+        Returns:
+            np.array: indices of the polygons of the (layer, datatype)
+        """
+        return np.flatnonzero((self.layers == layer) & (self.datatypes == datatype))
+
+    def get_specs(self) -> list:
+        """_summary_
+        Returns:
+            list: the (layer, datatype) tuples present in the store
+        """
+        if len(self) == 0:
+            return []
+        specs = np.unique(np.column_stack([self.layers, self.datatypes]), axis = 0)
+        return [tuple(spec) for spec in specs.tolist()]
+
+    def get_polygons_by_spec(
+        self,
+        layer: int,
+        datatype: int,
+    ) -> list:
+        """_summary_
+        Materializes the polygons of a (layer, datatype)
+        Args:
+            layer       (int): gds layer
+            datatype    (int): gds datatype
+        Returns:
+            list: list of Polygon objects
+        """
+        return [self.get_polygon(i) for i in self.get_indices_by_spec(layer, datatype)]
+
+    def select(
+        self,
+        indices: np.array,
+        name: str = None,
+    ):
+        """_summary_
+        Gathers a subset of the polygons into a new (in memory) store
+        Args:
+            indices (np.array)      : indices of the selected polygons
+            name    (str, optional) : name of the new store. Defaults to the store name.
+        Returns:
+            SpeedsterPolygonStore: the store of the selected polygons
+        """
+        indices = np.asarray(indices, dtype = np.int64)
+        starts = np.asarray(self.offsets[:-1])[indices]
+        counts = np.asarray(self.offsets[1:])[indices] - starts
+        offsets = np.zeros(len(indices) + 1, dtype = np.int64)
+        np.cumsum(counts, out = offsets[1:])
+        gather = np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1])
+        return SpeedsterPolygonStore(
+            name if name is not None else self.name,
+            np.asarray(self.vertices)[gather],
+            offsets,
+            np.asarray(self.layers)[indices],
+            np.asarray(self.datatypes)[indices],
+            boxes = np.asarray(self.boxes)[indices],
+            netIds = np.asarray(self.netIds)[indices],
+            precision = self.precision,
+        )
+
+    def set_net_ids(
+        self,
+        netIds: np.array,
+    ) -> None:
+        """_summary_
+        Sets the net ids of the polygons. A memory mapped 
+        (read-only) column is copied into memory before being replaced
+        Args:
+            netIds (np.array): (N,) net id of each polygon (-1 if unassigned)
+        """
+        netIds = np.asarray(netIds, dtype = np.int64)
+        if netIds.shape != (len(self),):
+            raise ValueError("There must be a net id for each polygon!")
+        self.netIds = netIds.copy()
+
+    def to_cell(
+        self,
+        name: str = None,
+    ) -> Cell:
+        """_summary_
+        Materializes the whole store as a gdstk Cell
+        Args:
+            name (str, optional): name of the cell. Defaults to the store name.
+        Returns:
+            Cell: Cell object with all the polygons
+        """
+        cell = Cell(name if name is not None else self.name)
+        cell.add(*[self.get_polygon(i) for i in range(len(self))])
+        return cell
@@ -0,0 +1,253 @@
+"""_summary_
+stream.py contains the selective GDSII reader: only the elements
+of the requested (layer, datatype) pairs are read from the file
+(through the filter of the gdstk reader), the polygons of each
+structure are converted once into integer vertex arrays, and the
+hierarchy is flattened array-wise into a columnar polygon store
+
+[author]    Diogo André Silvares Dias
+[date]      2026-10-16
+[contact]   das.dias@campus.fct.unl.pt
+"""
+import numpy as np
+from loguru import logger
+from gdstk import(
+    read_gds,
+)
+from .store import(
+    SpeedsterPolygonStore,
+)
+from spdstrutil import(
+    timer,
+)
+
+
+class _GdsStructure(object):
+    """_summary_
+    Elements of a GDSII structure kept by the reader: the integer
+    vertices of its selected polygons, alongside their vertex counts,
+    layers and datatypes, and its references
+    """
+    __slots__ = [
+        "name",
+        "vertices",
+        "counts",
+        "layers",
+        "datatypes",
+        "references",
+    ]
+
+    def __init__(
+        self,
+        name: str,
+        vertices: np.array,
+        counts: np.array,
+        layers: np.array,
+        datatypes: np.array,
+        references: list,
+    ):
+        self.name = name
+        self.vertices = vertices
+        self.counts = counts
+        self.layers = layers
+        self.datatypes = datatypes
+        self.references = references
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def get_arrays(self) -> tuple:
+        """_summary_
+        Returns:
+            tuple: ((V, 2) vertices, (N,) vertex counts, (N,) layers, (N,) datatypes)
+        """
+        return self.vertices, self.counts, self.layers, self.datatypes
+
+    def release(self):
+        """_summary_
+        Frees the arrays, once the structure is flattened
+        """
+        self.vertices = np.empty((0, 2), dtype = np.int64)
+        self.counts = np.empty(0, dtype = np.int64)
+        self.layers = np.empty(0, dtype = np.int32)
+        self.datatypes = np.empty(0, dtype = np.int32)
+
+
+def _read_structures(
+    path: str,
+    specs: set,
+) -> tuple:
+    """_summary_
+    Reads the structures of a GDSII file, keeping only the polygons and
+    the paths of the requested (layer, datatype) pairs: the gdstk reader
+    skips the other elements while parsing. The polygons of each structure
+    (the paths converted to polygons) are gathered into integer vertex
+    arrays in database units, and its references into the origins of
+    their instances
+    Args:
+        path    (str)   : path of the GDSII file
+        specs   (set)   : requested (layer, datatype) tuples
+    Returns:
+        tuple: (database unit in user units, dictionary of {name: _GdsStructure} in file order)
+    """
+    library = read_gds(path, filter = specs)
+    precision = library.precision / library.unit
+    structures = {}
+    for cell in library.cells:
+        polygons = [poly for poly in cell.polygons if (poly.layer, poly.datatype) in specs]
+        polygons += [poly for path in cell.paths for poly in path.to_polygons() if (poly.layer, poly.datatype) in specs]
+        counts = np.array([len(poly.points) for poly in polygons], dtype = np.int64)
+        vertices = np.empty((0, 2), dtype = np.int64)
+        if len(polygons) > 0:
+            vertices = np.rint(np.concatenate([poly.points for poly in polygons]) / precision).astype(np.int64)
+        references = []
+        for reference in cell.references:
+            origins = np.array([reference.origin], dtype = float)
+            if reference.repetition.size > 0:
+                origins = origins + reference.repetition.get_offsets()
+            references.append((
+                reference.cell if isinstance(reference.cell, str) else reference.cell.name,
+                origins / precision,
+                reference.rotation,
+                reference.magnification,
+                reference.x_reflection,
+            ))
+        structures[cell.name] = _GdsStructure(
+            cell.name,
+            vertices,
+            counts,
+            np.array([poly.layer for poly in polygons], dtype = np.int32),
+            np.array([poly.datatype for poly in polygons], dtype = np.int32),
+            references,
+        )
+    return precision, structures
+
+
+def _get_parent_counts(
+    name: str,
+    structures: dict,
+) -> dict:
+    """_summary_
+    Counts the parents of each structure reached from a top structure,
+    over the edges of the structure DAG (each parent counted once)
+    Args:
+        name        (str)   : name of the top structure
+        structures  (dict)  : dictionary of {name: _GdsStructure}
+    Returns:
+        dict: dictionary of {name: number of parents}
+    """
+    parents = {name: 0}
+    stack = [name]
+    while len(stack) > 0:
+        for child in {ref[0] for ref in structures[stack.pop()].references if ref[0] in structures}:
+            if child not in parents:
+                parents[child] = 0
+                stack.append(child)
+            parents[child] += 1
+    return parents
+
+
+def _flatten_structure(
+    name: str,
+    structures: dict,
+    flattened: dict,
+    parents: dict,
+) -> tuple:
+    """_summary_
+    Flattens a structure into vertex arrays: its own polygons, followed
+    by the flattened polygons of its references, transformed at once for
+    all the instances of each reference. The arrays are allocated once,
+    and each reference is written straight into its slice. The flattened
+    arrays of a structure are only cached until its last parent is flattened
+    (see _get_parent_counts), and the arrays of a structure are freed once
+    it is flattened
+    Args:
+        name        (str)   : name of the structure
+        structures  (dict)  : dictionary of {name: _GdsStructure}
+        flattened   (dict)  : dictionary of {name: flattened arrays} of the cached structures
+        parents     (dict)  : dictionary of {name: number of parents still to be flattened}
+    Returns:
+        tuple: ((V, 2) vertices, (N,) vertex counts, (N,) layers, (N,) datatypes)
+    """
+    if name in flattened:
+        return flattened[name]
+    structure = structures[name]
+    ownVertices, ownCounts, ownLayers, ownDatatypes = structure.get_arrays()
+    children = []
+    for reference in structure.references:
+        if reference[0] not in structures:
+            logger.warning("Structure {} referenced by {} is not defined!".format(reference[0], name))
+            continue
+        child = _flatten_structure(reference[0], structures, flattened, parents)
+        if len(child[1]) > 0:
+            children.append((reference, child))
+    vertexCount = len(ownVertices) + sum(len(ref[1]) * len(child[0]) for ref, child in children)
+    polygonCount = len(ownCounts) + sum(len(ref[1]) * len(child[1]) for ref, child in children)
+    vertices = np.empty((vertexCount, 2), dtype = np.int64)
+    counts = np.empty(polygonCount, dtype = np.int64)
+    layers = np.empty(polygonCount, dtype = np.int32)
+    datatypes = np.empty(polygonCount, dtype = np.int32)
+    v, p = len(ownVertices), len(ownCounts)
+    vertices[:v] = ownVertices
+    counts[:p] = ownCounts
+    layers[:p] = ownLayers
+    datatypes[:p] = ownDatatypes
+    for (_, origins, rotation, magnification, reflection), (childVertices, childCounts, childLayers, childDatatypes) in children:
+        c, s = np.cos(rotation), np.sin(rotation)
+        points = childVertices * magnification
+        if reflection:
+            points = points * [1.0, -1.0]
+        points = points @ np.array([[c, s], [-s, c]])
+        k, m, n = len(origins), len(childVertices), len(childCounts)
+        vertices[v:v + k * m] = np.rint(points[None, :, :] + origins[:, None, :]).reshape(-1, 2)
+        counts[p:p + k * n].reshape(k, n)[:] = childCounts
+        layers[p:p + k * n].reshape(k, n)[:] = childLayers
+        datatypes[p:p + k * n].reshape(k, n)[:] = childDatatypes
+        v, p = v + k * m, p + k * n
+    structure.release()
+    # the children are freed once their last parent is flattened
+    for child in {ref[0] for ref in structure.references if ref[0] in structures}:
+        parents[child] -= 1
+        if parents[child] == 0:
+            flattened.pop(child, None)
+    if parents.get(name, 0) > 0:
+        flattened[name] = (vertices, counts, layers, datatypes)
+    return vertices, counts, layers, datatypes
+
+
+@timer
+def read_gds_store(
+    path: str,
+    specs: list,
+    cell: str = None,
+) -> SpeedsterPolygonStore:
+    """_summary_
+    Reads the selected layers of a GDSII file into a columnar polygon store.
+    Only the polygons and paths of the requested (layer, datatype) pairs
+    are read, so the memory and time follow the size of those layers.
+    The selected geometry of the cell is flattened through its references
+    Args:
+        path    (str)           : path of the GDSII file
+        specs   (list)          : requested (layer, datatype) tuples (e.g. the
+                                  values of GdsTable.getDrawingMetalLayersMap())
+        cell    (str, optional) : name of the cell to be read. Defaults to the
+                                  first structure not referenced by any other
+    Returns:
+        SpeedsterPolygonStore: the columnar store of the flattened selected polygons
+    """
+    specs = set(tuple(spec) for spec in specs)
+    precision, structures = _read_structures(path, specs)
+    if cell is None:
+        referenced = {ref[0] for structure in structures.values() for ref in structure.references}
+        tops = [name for name in structures if name not in referenced]
+        if len(tops) == 0:
+            raise ValueError("The GDSII file has no top level structure!")
+        cell = tops[0]
+    if cell not in structures:
+        raise KeyError("Structure {} is not defined in {}".format(cell, path))
+    vertices, counts, layers, datatypes = _flatten_structure(cell, structures, {}, _get_parent_counts(cell, structures))
+    offsets = np.zeros(len(counts) + 1, dtype = np.int64)
+    np.cumsum(counts, out = offsets[1:])
+    store = SpeedsterPolygonStore(cell, vertices, offsets, layers, datatypes, precision = precision)
+    logger.info("Streamed {} from {}".format(store, path))
+    return store
@@ -0,0 +1,204 @@
+"""_summary_
+tiling.py contains the tiled processing of large layouts:
+the die is partitioned into a grid of tiles, the geometry
+merging, contact detection and net labelling are performed
+independently per tile in a process pool, and the nets
+are stitched together at the tile borders
+
+[author]    Diogo André Silvares Dias
+[date]      2026-10-16
+[contact]   das.dias@campus.fct.unl.pt
+"""
+import os
+import numpy as np
+from loguru import logger
+from concurrent.futures import ProcessPoolExecutor
+from gdstk import(
+    Cell,
+)
+from .data import(
+    SpeedsterConnectionGraph,
+)
+from .store import(
+    SpeedsterPolygonStore,
+)
+from .index import(
+    sweep_overlapping_boxes,
+)
+from .net import(
+    _build_layer_map_graph,
+    _map_store_to_graph,
+)
+from spdstrutil import (
+    GdsTable,
+    timer,
+)
+
+
+def get_tile_boxes(
+    box: np.array,
+    tiles: tuple = (2, 2),
+) -> np.array:
+    """_summary_
+    Partitions a bounding box into a grid of tiles
+    Args:
+        box     (np.array)          : [x0, y0, x1, y1] bounding box of the die
+        tiles   (tuple, optional)   : (columns, rows) of the grid. Defaults to (2, 2).
+    Returns:
+        np.array: (columns*rows, 4) array of [x0, y0, x1, y1] tiles, row by row
+    """
+    nx, ny = tiles
+    if nx < 1 or ny < 1:
+        raise ValueError("The tile grid must have at least one column and one row!")
+    xs = np.linspace(box[0], box[2], nx + 1)
+    ys = np.linspace(box[1], box[3], ny + 1)
+    x0, y0 = np.meshgrid(xs[:-1], ys[:-1])
+    x1, y1 = np.meshgrid(xs[1:], ys[1:])
+    return np.column_stack([x0.ravel(), y0.ravel(), x1.ravel(), y1.ravel()])
+
+
+def get_tile_polygons(
+    boxes: np.array,
+    tileBoxes: np.array,
+    halo: float = 0.0,
+) -> list:
+    """_summary_
+    Gets the polygons to be processed in each tile: the polygons
+    whose bounding box overlaps the tile expanded by the halo margin.
+    The polygons are taken whole, so a polygon crossing a tile border
+    is processed by all the tiles it crosses
+    Args:
+        boxes       (np.array)          : (N, 4) bounding boxes of the polygons
+        tileBoxes   (np.array)          : (T, 4) bounding boxes of the tiles
+        halo        (float, optional)   : margin added around each tile. Defaults to 0.0.
+    Returns:
+        list: list with the (sorted) polygon indices of each tile
+    """
+    window = np.asarray(tileBoxes, dtype = float) + np.array([-halo, -halo, halo, halo])
+    pairs = sweep_overlapping_boxes(window, boxes)
+    splits = np.searchsorted(pairs[:, 0], np.arange(1, len(window)))
+    return np.split(pairs[:, 1], splits)
+
+
+def _process_tile(
+    tileStore: SpeedsterPolygonStore,
+    layerMap: dict,
+) -> tuple:
+    """_summary_
+    Merges the geometry, detects the via contacts and labels
+    the nets of a single tile. Runs in the worker processes
+    Args:
+        tileStore   (SpeedsterPolygonStore) : store with the polygons of the tile
+        layerMap    (dict)                  : dictionary of {"layer name": (layer, datatype)},
+                                              ordered as the metal/via stack
+    Returns:
+        tuple: (local polygon indices, local net label of each polygon)
+    """
+    graph = _build_layer_map_graph(tileStore, layerMap)
+    nodes = _map_store_to_graph(tileStore, graph)
+    labels = graph.connected_components()
+    mapped = np.flatnonzero(nodes >= 0)
+    return mapped, labels[nodes[mapped]]
+
+
+def _iterate_tiles(
+    tasks,
+    workers: int,
+):
+    """_summary_
+    Runs the tile tasks, in order, keeping at most
+    one tile per worker in flight to bound the memory
+    Args:
+        tasks   (generator) : generator of (tile index, tile store, layer map)
+        workers (int)       : number of worker processes (1 runs in the calling process)
+    Yields:
+        tuple: (tile index, tile result)
+    """
+    if workers == 1:
+        for tile, tileStore, layerMap in tasks:
+            yield tile, _process_tile(tileStore, layerMap)
+        return
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        pending = []
+        for tile, tileStore, layerMap in tasks:
+            pending.append((tile, executor.submit(_process_tile, tileStore, layerMap)))
+            if len(pending) >= workers:
+                tile, future = pending.pop(0)
+                yield tile, future.result()
+        for tile, future in pending:
+            yield tile, future.result()
+
+
+@timer
+def tiled_net_extract(
+    layout,
+    gdsTable: GdsTable,
+    tiles: tuple = (2, 2),
+    halo: float = 1e-3,
+    workers: int = None,
+) -> np.array:
+    """_summary_
+    Extracts all the metal nets of a layout tile by tile. Each tile
+    merges, connects and labels its own polygons in a process pool,
+    and the local nets are stitched in a global connection graph
+    through the polygons shared by neighbouring tiles.
+    Any connection between two polygons happens at a point that lies
+    in some tile together with both polygons, so the stitched nets are
+    the same as the nets of the whole layout
+    Args:
+        layout      (Cell | SpeedsterPolygonStore)  : Cell object containing the layout, or its columnar store
+        gdsTable    (GdsTable)                      : GdsTable object containing the gds information
+        tiles       (tuple, optional)               : (columns, rows) of the tile grid. Defaults to (2, 2).
+        halo        (float, optional)               : margin around each tile, guarding the
+                                                      contacts lying on the tile borders. Defaults to 1e-3.
+        workers     (int, optional)                 : number of worker processes. Defaults to the number of cores.
+    Returns:
+        np.array: net id of each polygon of the store (-1 if the polygon belongs to no net).
+                  The nets are numbered by their smallest polygon index, and the
+                  ids are also stored in the net id column of the store
+    """
+    if isinstance(layout, Cell):
+        layout = SpeedsterPolygonStore.from_cell(layout)
+    store = layout
+    if workers is None:
+        workers = os.cpu_count() or 1
+    layerMap = gdsTable.getDrawingMetalLayersMap()
+    isStack = np.zeros(len(store), dtype = bool)
+    isMetal = np.zeros(len(store), dtype = bool)
+    for name, (layer, datatype) in layerMap.items():
+        spec = (store.layers == layer) & (store.datatypes == datatype)
+        isStack |= spec
+        if "via" not in name:
+            isMetal |= spec
+    stack = np.flatnonzero(isStack)
+    netIds = np.full(len(store), -1, dtype = np.int64)
+    if len(stack) == 0:
+        store.set_net_ids(netIds)
+        return netIds
+    boxes = np.asarray(store.boxes)[stack]
+    dieBox = np.concatenate([boxes[:, :2].min(axis = 0), boxes[:, 2:].max(axis = 0)])
+    tilePolygons = get_tile_polygons(boxes, get_tile_boxes(dieBox, tiles), halo)
+    logger.info("Processing {} tiles with {} workers...".format(len(tilePolygons), workers))
+    tasks = (
+        (tile, store.select(stack[polys], name = f"{store.name}_tile_{tile}"), layerMap)
+        for tile, polys in enumerate(tilePolygons) if len(polys) > 0
+    )
+    # stitch the polygons of each local net together
+    edges = [np.empty((0, 2), dtype = np.int64)]
+    mapped = np.zeros(len(store), dtype = bool)
+    for tile, (local, labels) in _iterate_tiles(tasks, workers):
+        polys = stack[tilePolygons[tile][local]]
+        mapped[polys] = True
+        order = np.argsort(labels, kind = "stable")
+        polys = polys[order]
+        sameNet = labels[order][1:] == labels[order][:-1]
+        edges.append(np.column_stack([polys[:-1][sameNet], polys[1:][sameNet]]))
+    graph = SpeedsterConnectionGraph(np.concatenate(edges), np.zeros(len(store), dtype = np.int64))
+    labels = graph.connected_components()
+    # a set of vias without any routing metal polygon is not a net
+    hasMetal = np.bincount(labels, weights = isMetal & mapped, minlength = labels.max() + 1) > 0
+    labelNets = np.where(hasMetal, np.cumsum(hasMetal) - 1, -1)
+    netIds = np.where(mapped, labelNets[labels], -1)
+    store.set_net_ids(netIds)
+    logger.info("Tiled net extraction is complete. Nets found :{}".format(int(hasMetal.sum())))
+    return netIds
@@ -1,5 +1,7 @@
 import unittest
 import sys
+import os
+import tempfile
 import gdstk
 import numpy as np
 from loguru import logger
@@ -12,8 +14,100 @@ from spdstrnet import (
     check_neighbour_polygons,
     check_same_polygon,
     check_polygon_contains_polygon,
-    
+    check_bounding_box_overlap,
+    check_via_connection,
+    get_layer_pair_contacts,
+    sweep_overlapping_boxes,
+    get_bounding_boxes,
+    get_canonical_polygon,
+    get_polygon_hashes,
+    get_common_edges_batch,
+    get_neighbour_polygons,
+    check_polygon_in_cell,
+    get_polygon_dict,
+    fuse_overlapping_cells,
+    join_overlapping_polygons_cell,
+    LayerIndexedCell,
+    SpeedsterPolygonStore,
+    set_manhattan_engine,
+    get_rectangle,
+    rect_union,
+    rect_intersection,
+    rect_common_edges,
+    SpeedsterRTree,
+    SpeedsterGrowingRTree,
+    build_polygon_index,
+    fragment_polygon,
+    fragment_net,
+    decompose_rectilinear,
+    get_fragment_table,
+    get_net_fragment_table,
+    get_via_fragment_pairs,
+    read_gds_store,
+)
+from spdstrnet.data import (
+    SpeedsterPort,
+    SpeedsterConnectionGraph,
+)
+from spdstrnet.stream import (
+    _read_structures,
+    _get_parent_counts,
+    _flatten_structure,
+)
+from spdstrnet.net import (
+    _total_unlabeled_net_extract,
+    _graph_net_extract,
+    _unlabeled_net_extraction,
+    build_connection_graph,
+    get_via_contacts_table,
+    assign_store_net_ids,
+)
+from spdstrnet.tiling import (
+    get_tile_boxes,
+    tiled_net_extract,
 )
+from spdstrnet.hierarchy import (
+    hierarchical_extract,
+    get_window_polygons,
+    transform_fragment_table,
+    assemble_fragment_mesh,
+    SpeedsterLazyLayout,
+    lazy_net_extract,
+)
+from spdstrnet.roi import (
+    get_port_window,
+    clip_layout,
+    roi_net_extract,
+)
+from spdstrutil import (
+    GdsTable,
+)
+
+dataPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "resources", "data")
+
+def _get_test_gds_table() -> GdsTable:
+    table = GdsTable()
+    table.add(68, 20, "met1", ["DRAWING"], "Metal 1")
+    table.add(68, 44, "via", ["DRAWING"], "Via 1-2")
+    table.add(69, 20, "met2", ["DRAWING"], "Metal 2")
+    table.add(69, 44, "via2", ["DRAWING"], "Via 2-3")
+    table.add(70, 20, "met3", ["DRAWING"], "Metal 3")
+    return table
+
+def _get_test_layout() -> gdstk.Cell:
+    """two nets: met1 - via - met2 - via2 - met3 and an isolated met1 - via - met2 pair"""
+    cell = gdstk.Cell("layout")
+    cell.add(
+        gdstk.rectangle( (0.0, 0.0), (10.0, 1.0), layer = 68, datatype = 20 ),
+        gdstk.rectangle( (0.2, 0.2), (0.8, 0.8), layer = 68, datatype = 44 ),
+        gdstk.rectangle( (0.0, 0.0), (1.0, 10.0), layer = 69, datatype = 20 ),
+        gdstk.rectangle( (0.2, 9.2), (0.8, 9.8), layer = 69, datatype = 44 ),
+        gdstk.rectangle( (0.0, 9.0), (10.0, 10.0), layer = 70, datatype = 20 ),
+        gdstk.rectangle( (5.0, 3.0), (9.0, 4.0), layer = 68, datatype = 20 ),
+        gdstk.rectangle( (8.2, 3.2), (8.8, 3.8), layer = 68, datatype = 44 ),
+        gdstk.rectangle( (8.0, 3.0), (9.0, 7.0), layer = 69, datatype = 20 ),
+    )
+    return cell
 
 
 
@@ -82,6 +176,30 @@ class TestGeometry(unittest.TestCase):
         self.assertIsNotNone( get_common_edges(poly, poly5) )
         
     
+    def test_get_common_edges_batch(self):
+        poly    = gdstk.rectangle( (0.0,0.0),(3.0,1.0), **self.ld["met1"])
+        polys   = [
+            gdstk.rectangle( (0.0,0.0),(1.0,3.0), **self.ld["met1"]),
+            gdstk.rectangle( (2.0,0.0),(4.0,4.0), **self.ld["met1"]),
+            gdstk.rectangle( (5.0,0.0),(6.0,1.0), **self.ld["met1"]),
+            gdstk.rectangle( (-1.0,1.0),(4.0,2.0), **self.ld["met1"]),
+        ]
+        batch = get_common_edges_batch(poly, polys)
+        self.assertEqual( batch, [get_common_edges(poly, p) for p in polys] )
+        self.assertIsNone( batch[2] )
+        # poly lies inside the bottom edge of the last rectangle
+        self.assertEqual( batch[3], [[(0.0, 1.0), (3.0, 1.0)]] )
+    
+    def test_get_neighbour_polygons(self):
+        poly    = gdstk.rectangle( (1.0,0.0),(2.0,1.0), **self.ld["met2"])
+        polys   = [
+            gdstk.rectangle( (0.0,0.0),(1.0,1.0), **self.ld["met2"]),
+            gdstk.rectangle( (2.0,0.0),(4.0,4.0), **self.ld["met1"]),
+            gdstk.rectangle( (1.5,0.0),(3.0,1.0), **self.ld["met2"]),
+            gdstk.Polygon( [(2, 0), (3, 0), (3, 2), (1, 2), (1, 1), (2, 1)], **self.ld["met2"]),
+        ]
+        self.assertEqual( list(get_neighbour_polygons(poly, polys)), [True, False, False, True] )
+    
     def test_check_neighbour_polygon(self):
         poly    = gdstk.rectangle( (0.0,0.0),(3.0,1.0), **self.ld["met1"])
         poly2   = gdstk.rectangle( (0.0,0.0),(1.0,3.0), **self.ld["met1"])
@@ -179,25 +297,140 @@ class TestGeometry(unittest.TestCase):
         pass
     
     def test_fragment_polygon(self):
-        pass
-    
+        # L shape: a 3 x 1 bar with a 1 x 2 column on its left end
+        lShape = gdstk.Polygon([(0, 0), (3, 0), (3, 1), (1, 1), (1, 3), (0, 3)], layer = 68, datatype = 20)
+        rects = decompose_rectilinear(lShape.points)
+        self.assertEqual( rects.tolist(), [[0.0, 0.0, 3.0, 1.0], [0.0, 1.0, 1.0, 3.0]] )
+        fragments = fragment_polygon(lShape)
+        self.assertEqual( sum(frag.area() for frag in fragments), lShape.area() )
+        self.assertTrue( all(frag.layer == 68 and frag.datatype == 20 for frag in fragments) )
+        # a via over the bar cuts it
+        rects = decompose_rectilinear(lShape.points, cuts = [[1.5, 0.2, 2.0, 0.8]])
+        # (the cut lines cross the whole polygon: 3 x 3 bar fragments and the column)
+        self.assertEqual( len(rects), 10 )
+        self.assertIn( [1.5, 0.2, 2.0, 0.8], np.round(rects, 6).tolist() )
+        self.assertAlmostEqual( float(np.prod(rects[:, 2:] - rects[:, :2], axis = 1).sum()), 5.0 )
+        with self.assertRaises(ValueError):
+            decompose_rectilinear([(0, 0), (1, 1), (0, 1)])
+        # a comb of 1000 teeth of distinct heights: the base bar and one fragment per tooth
+        teeth = [[(2 * i + 1, 1), (2 * i + 1, 2 + i), (2 * i, 2 + i), (2 * i, 1)] for i in range(999, -1, -1)]
+        comb = np.concatenate([[(0, 0), (2000, 0), (2000, 1)]] + teeth)
+        rects = decompose_rectilinear(comb)
+        self.assertEqual( len(rects), 1001 )
+        self.assertAlmostEqual( float(np.prod(rects[:, 2:] - rects[:, :2], axis = 1).sum()), 2000 + 1000 * 1001 / 2 )
+
     def test_fragment_net(self):
-        pass
-    
+        lib = gdstk.read_gds(os.path.join(dataPath, "slotted_metal.gds"))
+        cell = lib.top_level()[0]
+        merged = join_overlapping_polygons_cell(cell, {"met2": (69, 20)})
+        # the merged slotted metal has holes (encoded as keyhole slits)
+        self.assertEqual( len(merged.polygons), 1 )
+        net = fragment_net("slotted_fragments", merged)
+        fragments = [get_rectangle(poly) for poly in net.polygons]
+        self.assertTrue( all(frag is not None for frag in fragments) )
+        self.assertAlmostEqual( sum(poly.area() for poly in net.polygons), merged.polygons[0].area(), places = 6 )
+        # the fragments do not overlap and do not cover the slots
+        self.assertEqual( len(sweep_overlapping_boxes(fragments, fragments, strict = True)), len(fragments) )
+        for x, y in [(0.75, 0.3), (1.75, 0.7), (2.75, 1.1)]:
+            self.assertFalse( any(poly.contain((x, y)) for poly in net.polygons) )
+        table = get_fragment_table(merged.polygons, [2], workers = 2)
+        self.assertEqual( len(table), len(net.polygons) )
+        self.assertTrue( np.all(table.parents == 0) )
+        # the fragments of a polygon are connected through the neighbour pairs
+        graph = SpeedsterConnectionGraph(table.neighbours, np.zeros(len(table), dtype = np.int64))
+        self.assertEqual( len(np.unique(graph.connected_components())), 1 )
+        self.assertTrue( np.all(table.contacts > 0) and np.all(table.distances > 0) )
+        pairs, lengths, widths, rs = table.get_resistor_arrays([0.1, 0.0, 0.2])
+        self.assertTrue( np.all(rs == 0.2) )
+
+    def test_get_net_fragment_table(self):
+        table = get_net_fragment_table(_get_test_layout(), _get_test_gds_table())
+        # met1 bars are cut by the vias landing on them
+        self.assertEqual( sorted(set(table.layers.tolist())), [0, 2, 4] )
+        self.assertEqual( len(table.parents), len(table) )
+        met1 = table.boxes[(table.layers == 0) & (table.parents == 0)]
+        self.assertIn( [0.2, 0.2, 0.8, 0.8], np.round(met1, 6).tolist() )
+        # each via joins the fragments landing on it, below and above
+        self.assertEqual( len(table.vias), 3 )
+        self.assertEqual( sorted(table.viaLayers.tolist()), [1, 1, 3] )
+        self.assertTrue( np.all(table.layers[table.vias[:, 0]] + 2 == table.layers[table.vias[:, 1]]) )
+        self.assertTrue( np.allclose(table.boxes[table.vias[:, 0]], table.boxes[table.vias[:, 1]]) )
+        pairs, g = table.get_via_arrays([0.0, 4.0, 0.0, 2.0, 0.0])
+        self.assertTrue( np.allclose(g, np.where(table.viaLayers == 1, 0.25, 0.5)) )
+        # the neighbour and via pairs connect the fragments of the two nets
+        graph = SpeedsterConnectionGraph(np.concatenate([table.neighbours, table.vias]), table.layers)
+        self.assertEqual( len(np.unique(graph.connected_components())), 2 )
+        # a via over two fragments of the metal above splits its conductance by area
+        pairs, layers, shares = get_via_fragment_pairs(
+            [[0.0, 0.0, 1.0, 1.0], [0.0, 0.0, 0.25, 1.0], [0.25, 0.0, 1.0, 1.0]], [0, 2, 2], [[0.0, 0.0, 1.0, 1.0]], [1]
+        )
+        self.assertEqual( pairs.tolist(), [[0, 1], [0, 2]] )
+        self.assertTrue( np.allclose(shares, [0.25, 0.75]) )
+
     def test_get_polygons_by_spec(self):
         pass
     
     def test_get_polygons_dict(self):
         pass
     
+    def test_get_canonical_polygon(self):
+        rect = gdstk.rectangle( (0.0, 0.0), (1.0, 1.0), **self.ld["met1"] )
+        same = gdstk.Polygon( [(1, 1), (1, 0), (0.5, 0), (0, 0), (0, 1.0001)], **self.ld["met1"] )
+        other = gdstk.Polygon( [(1, 1), (1, 0), (0, 0), (0, 1.1)], **self.ld["met1"] )
+        self.assertEqual( get_canonical_polygon(rect), get_canonical_polygon(same) )
+        self.assertNotEqual( get_canonical_polygon(rect), get_canonical_polygon(other) )
+        self.assertEqual( get_canonical_polygon(rect), (1, 0, (0, 0, 1000, 0, 1000, 1000, 0, 1000)) )
+        self.assertIsNone( get_canonical_polygon(gdstk.Polygon( [(0, 0), (1, 0), (2, 0)] )) )
+    
     def test_check_polygon_in_cell(self):
-        pass
+        cell = gdstk.Cell("net")
+        cell.add(
+            gdstk.rectangle( (0.0, 0.0), (1.0, 1.0), **self.ld["met1"] ),
+            gdstk.rectangle( (0.0, 0.0), (3.0, 1.0), **self.ld["met2"] ),
+        )
+        hashes = get_polygon_hashes(cell.polygons)
+        poly = gdstk.Polygon( [(0, 1), (0, 0), (1, 0), (1, 1)], **self.ld["met1"] )
+        poly2 = gdstk.rectangle( (0.0, 0.0), (1.0, 1.0), **self.ld["met2"] )
+        for h in [None, hashes]:
+            self.assertTrue( check_polygon_in_cell(poly, cell, h) )
+            self.assertFalse( check_polygon_in_cell(poly2, cell, h) )
+        # a 0.1 nm offset is only seen on a finer grid, as long as the hashes share it
+        shifted = gdstk.rectangle( (0.0, 0.0), (1.0, 1.0001), **self.ld["met1"] )
+        self.assertTrue( check_polygon_in_cell(shifted, cell, hashes) )
+        fineHashes = get_polygon_hashes(cell.polygons, 1e-4)
+        for h in [None, fineHashes]:
+            self.assertFalse( check_polygon_in_cell(shifted, cell, h, 1e-4) )
+    
+    def test_check_bounding_box_overlap(self):
+        poly    = gdstk.rectangle( (0.0,0.0),(3.0,1.0), **self.ld["met1"])
+        layer   = [gdstk.rectangle( (x,0.0),(x+1.0,1.0), **self.ld["met2"]) for x in [-5.0, 1.0, 3.0, 10.0]]
+        mask = check_bounding_box_overlap(poly, layer)
+        self.assertEqual( list(mask), [False, True, True, False] )
+        self.assertIsNone( check_polygon_overlap(poly, [layer[0], layer[3]]) )
+        self.assertIsNotNone( check_polygon_overlap(poly, layer) )
     
     def test_check_via_connection(self):
-        pass
+        polyA   = gdstk.rectangle( (0.0,0.0),(3.0,1.0), **self.ld["met1"])
+        via     = gdstk.rectangle( (2.0,0.0),(3.0,1.0), layer = 3, datatype = 0)
+        polyB   = gdstk.rectangle( (2.0,0.0),(3.0,3.0), **self.ld["met2"])
+        polyC   = gdstk.rectangle( (5.0,0.0),(6.0,3.0), **self.ld["met2"])
+        self.assertTrue( check_via_connection(polyA, via, polyB) )
+        self.assertFalse( check_via_connection(polyA, via, polyC) )
+        self.assertFalse( check_via_connection(polyA, via, polyA) )
     
     def test_join_overlapping_polygons_cell(self):
-        pass
+        layout = _get_test_layout()
+        layout.add(gdstk.rectangle( (0.5, 0.0), (1.5, 1.0), layer = 68, datatype = 20 ))
+        layerMap = _get_test_gds_table().getDrawingMetalLayersMap()
+        serial = join_overlapping_polygons_cell(layout, layerMap)
+        parallel = join_overlapping_polygons_cell(layout, layerMap, workers = 2)
+        self.assertEqual( serial.name, "layout_joined" )
+        self.assertEqual( len(serial.polygons), len(layout.polygons) - 1 )
+        # the same polygons, in the same (layer map) order
+        self.assertEqual( len(parallel.polygons), len(serial.polygons) )
+        for polyA, polyB in zip(serial.polygons, parallel.polygons):
+            self.assertEqual( (polyA.layer, polyA.datatype), (polyB.layer, polyB.datatype) )
+            self.assertTrue( np.array_equal(polyA.points, polyB.points) )
     
     def test_fuse_overlapping_cells(self):
         pass
@@ -208,5 +441,489 @@ class TestGeometry(unittest.TestCase):
     def test_add_port(self):
         pass
     
+class TestIndex(unittest.TestCase):
+    def test_rtree_query(self):
+        rng = np.random.default_rng(0)
+        xy = rng.random((500, 2)) * 100.0
+        boxes = np.hstack([xy, xy + rng.random((500, 2)) * 3.0])
+        tree = SpeedsterRTree(boxes, nodeCapacity = 4)
+        for _ in range(20):
+            q = rng.random(2) * 100.0
+            q = np.concatenate([q, q + 10.0])
+            expected = np.flatnonzero(
+                (boxes[:,0] <= q[2]) & (boxes[:,2] >= q[0]) & (boxes[:,1] <= q[3]) & (boxes[:,3] >= q[1])
+            )
+            self.assertTrue( np.array_equal(tree.query(q), expected) )
+        self.assertEqual( len(SpeedsterRTree(np.empty((0,4))).query([0,0,1,1])), 0 )
+        # appending in chunks gives the same queries as the static tree
+        growing = SpeedsterGrowingRTree()
+        for chunk in np.array_split(boxes, 37):
+            self.assertEqual( growing.append(chunk).tolist(), list(range(len(growing) - len(chunk), len(growing))) )
+        self.assertTrue( np.array_equal(growing.boxes, boxes) )
+        for _ in range(20):
+            q = rng.random(2) * 100.0
+            q = np.concatenate([q, q + 10.0])
+            self.assertTrue( np.array_equal(growing.query(q), tree.query(q)) )
+    
+    def test_build_polygon_index(self):
+        polys = [gdstk.rectangle( (x, 0.0), (x+1.0, 1.0), layer = 1) for x in np.arange(0.0, 20.0, 2.0)]
+        indexDict = build_polygon_index({(1,0): polys})
+        via = gdstk.rectangle( (4.5, 0.2), (6.5, 0.4), layer = 2)
+        self.assertEqual( sorted(indexDict[(1,0)].query(np.ravel(via.bounding_box())).tolist()), [2, 3] )
+
+    def test_sweep_overlapping_boxes(self):
+        rng = np.random.default_rng(2)
+        xyA = rng.random((300, 2)) * 50.0
+        boxesA = np.hstack([xyA, xyA + rng.random((300, 2)) * 4.0])
+        xyB = rng.random((200, 2)) * 50.0
+        boxesB = np.hstack([xyB, xyB + rng.random((200, 2)) * 1.0])
+        expected = [
+            (i, j) for i in range(300) for j in range(200)
+            if boxesB[j,0] <= boxesA[i,2] and boxesB[j,2] >= boxesA[i,0] and boxesB[j,1] <= boxesA[i,3] and boxesB[j,3] >= boxesA[i,1]
+        ]
+        self.assertEqual( [tuple(pair) for pair in sweep_overlapping_boxes(boxesA, boxesB)], expected )
+        # a die-wide rail and long wires next to small boxes
+        wires = np.array([[0.0, 10.0, 50.0, 10.5], [3.0, 0.0, 3.2, 50.0], [0.0, 0.0, 50.0, 0.0]])
+        boxesB = np.vstack([boxesB, wires])
+        expected = [
+            (i, j) for i in range(300) for j in range(203)
+            if boxesB[j,0] < boxesA[i,2] and boxesB[j,2] > boxesA[i,0] and boxesB[j,1] < boxesA[i,3] and boxesB[j,3] > boxesA[i,1]
+        ]
+        self.assertEqual( [tuple(pair) for pair in sweep_overlapping_boxes(boxesA, boxesB, strict = True)], expected )
+
+    def test_get_layer_pair_contacts(self):
+        metals = [
+            gdstk.rectangle( (0.0, 0.0), (10.0, 1.0), layer = 68, datatype = 20 ),
+            gdstk.Polygon( [(0, 3), (4, 3), (4, 4), (1, 4), (1, 8), (0, 8)], layer = 68, datatype = 20 ),
+        ]
+        vias = [
+            gdstk.rectangle( (0.2, 0.2), (0.8, 0.8), layer = 68, datatype = 44 ),
+            gdstk.rectangle( (10.0, 0.0), (11.0, 1.0), layer = 68, datatype = 44 ), # touching only
+            gdstk.rectangle( (2.0, 5.0), (3.0, 6.0), layer = 68, datatype = 44 ), # inside the L bounding box only
+            gdstk.rectangle( (0.2, 6.0), (0.8, 6.5), layer = 68, datatype = 44 ),
+        ]
+        pairs = get_layer_pair_contacts(metals, vias)
+        self.assertEqual( [tuple(pair) for pair in pairs], [(0, 0), (1, 3)] )
+
+class TestStore(unittest.TestCase):
+    def test_layer_indexed_cell(self):
+        cell = gdstk.Cell("cell")
+        cell.add(
+            gdstk.rectangle( (0.0, 0.0), (1.0, 1.0), layer = 1 ),
+            gdstk.rectangle( (2.0, 0.0), (3.0, 1.0), layer = 1 ),
+            gdstk.FlexPath( [(0.0, 0.5), (3.0, 0.5)], 0.2, layer = 2 ),
+        )
+        indexed = LayerIndexedCell(cell)
+        self.assertEqual( len(indexed), 3 )
+        self.assertEqual( sorted(indexed.get_specs()), [(1, 0), (2, 0)] )
+        self.assertEqual( len(indexed.get_polygons_by_spec(1, 0)), 2 )
+        self.assertEqual( indexed.get_polygons_by_spec(3, 0), [] )
+        # the buckets follow the added geometry
+        poly = gdstk.rectangle( (5.0, 0.0), (6.0, 1.0), layer = 3 )
+        self.assertFalse( check_polygon_in_cell(poly, indexed) )
+        indexed.add(poly, gdstk.Label("A", (0, 0)))
+        self.assertTrue( check_polygon_in_cell(poly, indexed) )
+        self.assertEqual( len(cell.polygons), 3 )
+        polyDict = get_polygon_dict(indexed, [(1, 0), (2, 0), (3, 0)])
+        self.assertEqual( [len(polys) for polys in polyDict.values()], [2, 1, 1] )
+    
+    def test_fuse_overlapping_cells(self):
+        cellA = gdstk.Cell("A")
+        cellA.add(gdstk.rectangle( (0.0, 0.0), (1.0, 1.0), layer = 1 ))
+        cellB = gdstk.Cell("B")
+        cellB.add(
+            gdstk.rectangle( (0.0, 0.0), (1.0, 1.0), layer = 1 ),
+            gdstk.rectangle( (0.0, 0.0), (1.0, 4.0), layer = 2 ),
+        )
+        cellC = gdstk.Cell("C")
+        cellC.add(gdstk.rectangle( (5.0, 0.0), (6.0, 1.0), layer = 1 ))
+        fused = fuse_overlapping_cells(cellA, LayerIndexedCell(cellB))
+        self.assertEqual( fused.name, "A" )
+        self.assertEqual( len(fused.polygons), 3 )
+        self.assertIsNone( fuse_overlapping_cells(cellA, cellC) )
+
+    def test_read_gds_store(self):
+        met1 = dict(layer = 68, datatype = 20)
+        via = dict(layer = 68, datatype = 44)
+        met2 = dict(layer = 69, datatype = 20)
+        lib = gdstk.Library()
+        leaf = lib.new_cell("leaf")
+        leaf.add(
+            gdstk.rectangle( (0.0, 0.0), (2.0, 1.0), **met1 ),
+            gdstk.rectangle( (0.5, 0.25), (0.75, 0.75), **via ),
+            gdstk.Polygon( [(0.0, 0.0), (1.0, 0.0), (1.0, 3.0), (0.5, 3.5), (0.0, 3.0)], **met2 ),
+            gdstk.FlexPath( [(0.0, 5.0), (3.0, 5.0), (3.0, 8.0)], 0.5, simple_path = True, ends = "extended", **met1 ),
+            gdstk.FlexPath( [(0.0, 9.0), (4.0, 9.0)], 0.2, simple_path = True, **met2 ),
+            # the other layers and the labels are skipped
+            gdstk.rectangle( (0.0, 0.0), (5.0, 5.0), layer = 81, datatype = 4 ),
+            gdstk.Label( "a", (0.0, 0.0), layer = 68, texttype = 20 ),
+        )
+        row = lib.new_cell("row")
+        row.add(
+            gdstk.Reference(leaf, (1.0, 2.0), rotation = np.pi / 2, x_reflection = True, magnification = 2),
+            gdstk.Reference(leaf, (10.0, 0.0), columns = 3, rows = 2, spacing = (6.0, 10.0)),
+        )
+        top = lib.new_cell("top")
+        top.add(
+            gdstk.Reference(row, (0.0, 0.0)),
+            gdstk.Reference(row, (100.0, 0.0), rotation = np.pi, columns = 2, rows = 1, spacing = (40.0, 0.0)),
+            gdstk.rectangle( (0.0, 0.0), (1.0, 1.0), **met1 ),
+        )
+        specs = list(_get_test_gds_table().getDrawingMetalLayersMap().values())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "layout.gds")
+            lib.write_gds(path)
+            store = read_gds_store(path, specs)
+            self.assertEqual( store.name, "top" )
+            self.assertEqual( read_gds_store(path, specs, cell = "leaf").get_specs(), [(68, 20), (68, 44), (69, 20)] )
+            reference = SpeedsterPolygonStore.from_cell(gdstk.read_gds(path).top_level()[0])
+            _, structures = _read_structures(path, set(specs))
+        # the flattened children are freed once their last parent is flattened
+        parents = _get_parent_counts("top", structures)
+        self.assertEqual( parents, {"top": 0, "row": 1, "leaf": 1} )
+        flattened = {}
+        vertices, counts, _, _ = _flatten_structure("top", structures, flattened, parents)
+        self.assertEqual( flattened, {} )
+        self.assertEqual( (len(vertices), len(counts)), (len(store.vertices), len(store)) )
+        self.assertEqual( sorted(store.get_specs()), [(68, 20), (68, 44), (69, 20)] )
+        # the paths are converted into polygons, covering the same area
+        for spec in specs:
+            polygons = store.get_polygons_by_spec(*spec)
+            expected = reference.get_polygons_by_spec(*spec)
+            difference = gdstk.boolean(gdstk.boolean(polygons, [], "or"), expected, "xor")
+            self.assertAlmostEqual( sum(poly.area() for poly in difference), 0.0 )
+        # same nets as the gdstk reader
+        lib = os.path.join(dataPath, "crossed_metal.gds")
+        store = read_gds_store(lib, specs)
+        self.assertEqual( len(store), 457 )
+        netIds = assign_store_net_ids(store, _get_test_gds_table())
+        self.assertEqual( sorted(np.bincount(netIds).tolist()), [220, 237] )
+
+    def test_polygon_store(self):
+        layout = _get_test_layout()
+        layout.add(gdstk.FlexPath( [(0.0, 0.5), (3.0, 0.5)], 0.2, layer = 68, datatype = 20 ))
+        store = SpeedsterPolygonStore.from_cell(layout)
+        self.assertEqual( len(store), len(layout.get_polygons()) )
+        with tempfile.TemporaryDirectory() as path:
+            store.save(path)
+            loaded = SpeedsterPolygonStore.load(path)
+            self.assertIsInstance( loaded.vertices, np.memmap )
+            self.assertEqual( loaded.name, layout.name )
+            for column in SpeedsterPolygonStore.columns:
+                self.assertTrue( np.array_equal(getattr(loaded, column), getattr(store, column)) )
+            for k, poly in enumerate(layout.get_polygons()):
+                self.assertTrue( check_same_polygon(loaded.get_polygon(k), poly) )
+                self.assertTrue( np.allclose(loaded.boxes[k], np.ravel(poly.bounding_box())) )
+            polyDict = get_polygon_dict(loaded, [(68, 20), (69, 20)])
+            self.assertEqual( len(polyDict[(68, 20)]), len(layout.get_polygons(layer = 68, datatype = 20)) )
+            nets = _total_unlabeled_net_extract(loaded, _get_test_gds_table())
+            self.assertEqual( sorted(len(net.polygons) for net in nets.cells), [3, 5] )
+            netIds = assign_store_net_ids(loaded, _get_test_gds_table())
+            self.assertTrue( (netIds >= 0).all() )
+            self.assertEqual( sorted(np.bincount(netIds).tolist()), [3, 6] )
+
+class TestManhattan(unittest.TestCase):
+    def tearDown(self):
+        set_manhattan_engine(False)
+    
+    def test_get_rectangle(self):
+        rect = gdstk.rectangle( (0.0, 0.0), (3.0, 1.0) )
+        self.assertEqual( list(get_rectangle(rect)), [0, 0, 3000, 1000] )
+        self.assertIsNone( get_rectangle(gdstk.Polygon( [(0, 0), (2, 0), (2, 1), (1, 1), (1, 2), (0, 2)] )) )
+        self.assertIsNone( get_rectangle(gdstk.Polygon( [(0, 0), (2, 0), (3, 1), (1, 1)] )) )
+    
+    def test_rect_operations(self):
+        rects = np.array([[0, 0, 4, 2], [2, 0, 6, 2], [0, 2, 2, 5], [8, 8, 9, 9]])
+        union = rect_union(rects)
+        self.assertEqual( union.tolist(), [[0, 0, 6, 2], [0, 2, 2, 5], [8, 8, 9, 9]] )
+        self.assertEqual( rect_intersection(rects[:1], rects[1:]).tolist(), [[2, 0, 4, 2]] )
+        self.assertEqual( rect_common_edges(rects[0], rects[2]).tolist(), [[[0, 2], [2, 2]]] )
+    
+    def test_engine_dispatch(self):
+        poly    = gdstk.rectangle( (0.0,0.0),(3.0,1.0), layer = 1)
+        poly2   = gdstk.rectangle( (2.0,0.0),(5.0,3.0), layer = 1)
+        poly3   = gdstk.rectangle( (1.0,0.2),(2.0,0.8), layer = 1)
+        for enable in [False, True]:
+            set_manhattan_engine(enable)
+            overlap = check_polygon_overlap(poly, [poly2, poly3])
+            self.assertEqual( sum(p.area() for p in overlap), 1.6 )
+            self.assertTrue( check_polygon_contains_polygon(poly, poly3) )
+            self.assertFalse( check_polygon_contains_polygon(poly, poly2) )
+            self.assertTrue( check_neighbour_polygons(poly3, gdstk.rectangle( (2.0,0.0),(3.0,1.0), layer = 1)) )
+    
+    def test_engine_matches_gdstk(self):
+        rng = np.random.default_rng(3)
+        cell = gdstk.Cell("rects")
+        for x, y, w, h in rng.integers(0, 20, size = (60, 4)).tolist():
+            cell.add( gdstk.rectangle( (x * 0.5, y * 0.5), ((x + w % 4 + 1) * 0.5, (y + h % 4 + 1) * 0.5), layer = 68, datatype = 20 ) )
+        # a polygon with a clockwise orientation
+        cell.add( gdstk.Polygon( [(30.0, 0.0), (30.0, 1.0), (31.0, 1.0), (31.0, 0.0)], layer = 68, datatype = 20 ) )
+        layerMap = {"met1": (68, 20)}
+        results = []
+        for enable in [False, True]:
+            set_manhattan_engine(enable)
+            merged = join_overlapping_polygons_cell(cell, layerMap)
+            results.append(merged.polygons)
+            # a store is joined from its buffers into the same polygons
+            stored = join_overlapping_polygons_cell(SpeedsterPolygonStore.from_cell(cell), layerMap)
+            self.assertEqual( get_polygon_hashes(stored.polygons), get_polygon_hashes(merged.polygons) )
+            # counter-clockwise, as the gdstk boolean operation outputs them
+            for poly in merged.polygons:
+                x, y = poly.points[:, 0], poly.points[:, 1]
+                self.assertGreater( np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y), 0.0 )
+            # sorted by the bounding box
+            boxes = np.round(get_bounding_boxes(merged.polygons) / 1e-3).astype(np.int64)
+            self.assertTrue( (np.lexsort(boxes[:, ::-1].T) == np.arange(len(boxes))).all() )
+        # the same region, and the same isolated rectangles in the same order
+        self.assertEqual( gdstk.boolean(results[0], results[1], "xor"), [] )
+        rects = [
+            [get_canonical_polygon(poly) for poly in polygons if len(poly.points) == 4]
+            for polygons in results
+        ]
+        self.assertEqual( rects[0], rects[1] )
+        store = SpeedsterPolygonStore.from_cell(cell)
+        self.assertEqual( store.get_rectangles(np.arange(60)).tolist(), [get_rectangle(poly).tolist() for poly in cell.polygons[:60]] )
+        cell.add( gdstk.Polygon( [(0, 0), (2, 0), (2, 1), (1, 1), (1, 2), (0, 2)], layer = 68, datatype = 20 ) )
+        self.assertIsNone( SpeedsterPolygonStore.from_cell(cell).get_rectangles() )
+        pairs = [
+            (gdstk.rectangle( (0.0, 0.0), (2.0, 1.0) ), gdstk.rectangle( (1.0, 1.0), (3.0, 2.0) )),
+            (gdstk.rectangle( (0.0, 0.0), (2.0, 1.0) ), gdstk.Polygon( [(2.0, 0.5), (2.0, 3.0), (4.0, 3.0), (4.0, 0.5)] )),
+            (gdstk.rectangle( (0.0, 0.0), (2.0, 1.0) ), gdstk.rectangle( (0.0, 0.0), (2.0, 1.0) )),
+            (gdstk.rectangle( (0.0, 0.0), (2.0, 1.0) ), gdstk.rectangle( (2.0, 1.0), (3.0, 2.0) )),
+        ]
+        for polyA, polyB in pairs:
+            expected = get_common_edges(polyA, polyB)
+            set_manhattan_engine(True)
+            edges = get_common_edges(polyA, polyB)
+            set_manhattan_engine(False)
+            if expected is None:
+                self.assertIsNone( edges )
+                continue
+            self.assertTrue( np.allclose(edges, expected) )
+
+class TestNet(unittest.TestCase):
+    def test_total_unlabeled_net_extract(self):
+        nets = _total_unlabeled_net_extract(_get_test_layout(), _get_test_gds_table())
+        self.assertEqual( sorted(len(net.polygons) for net in nets.cells), [3, 5] )
+        lib = gdstk.read_gds(os.path.join(dataPath, "crossed_metal.gds"))
+        nets = _total_unlabeled_net_extract(lib.top_level()[0], _get_test_gds_table())
+        self.assertEqual( sorted(len(net.polygons) for net in nets.cells), [220, 237] )
+        for net in nets.cells:
+            for poly in net.polygons:
+                self.assertEqual( poly.get_property("net"), [net.name.encode()] )
+
+    def test_tiled_net_extract(self):
+        tiles = get_tile_boxes([0.0, 0.0, 4.0, 2.0], (2, 1))
+        self.assertEqual( tiles.tolist(), [[0.0, 0.0, 2.0, 2.0], [2.0, 0.0, 4.0, 2.0]] )
+        lib = gdstk.read_gds(os.path.join(dataPath, "crossed_metal.gds"))
+        store = SpeedsterPolygonStore.from_cell(lib.top_level()[0])
+        reference = assign_store_net_ids(store, _get_test_gds_table())
+        for grid, workers in [((1, 1), 1), ((3, 3), 1), ((4, 2), 2)]:
+            netIds = tiled_net_extract(store, _get_test_gds_table(), tiles = grid, workers = workers)
+            self.assertEqual( sorted(np.bincount(netIds).tolist()), [220, 237] )
+            # the same partition as the whole layout extraction
+            self.assertEqual( len(set(zip(netIds.tolist(), reference.tolist()))), 2 )
+        netIds = tiled_net_extract(_get_test_layout(), _get_test_gds_table(), tiles = (3, 1), workers = 1)
+        self.assertEqual( sorted(np.bincount(netIds).tolist()), [3, 5] )
+
+    def test_hierarchical_extract(self):
+        met1 = dict(layer = 68, datatype = 20)
+        via = dict(layer = 68, datatype = 44)
+        met2 = dict(layer = 69, datatype = 20)
+        leaf = gdstk.Cell("leaf")
+        leaf.add(
+            gdstk.rectangle( (0.0, 0.0), (2.0, 1.0), **met1 ),
+            gdstk.rectangle( (0.5, 0.25), (0.75, 0.75), **via ),
+            gdstk.rectangle( (0.25, 0.0), (1.0, 3.0), **met2 ),
+            gdstk.rectangle( (0.0, 2.0), (1.5, 2.5), **met1 ),
+        )
+        # the met1 of the leaves abut, and the met2 strap joins their met2
+        row = gdstk.Cell("row")
+        row.add( gdstk.Reference(leaf, (0.0, 0.0), columns = 3, rows = 1, spacing = (2.0, 0.0)) )
+        row.add( gdstk.rectangle( (0.0, 2.75), (6.0, 3.5), **met2 ) )
+        top = gdstk.Cell("top")
+        top.add(
+            gdstk.Reference(row, (0.0, 0.0)),
+            gdstk.Reference(row, (0.0, 10.0), rotation = np.pi / 2),
+            gdstk.Reference(row, (20.0, 0.0), x_reflection = True),
+            gdstk.Reference(leaf, (6.0, 0.0)),
+        )
+        abstracts = hierarchical_extract(top, _get_test_gds_table())
+        # each unique cell is extracted once, from its own geometry
+        self.assertEqual( list(abstracts.keys()), ["leaf", "row", "top"] )
+        self.assertEqual( [len(abstracts[name].graph) for name in abstracts], [4, 1, 0] )
+        self.assertEqual( [abstracts[name].nNets for name in abstracts], [2, 4, 13] )
+        # the same partition as the flat extraction
+        flat = _total_unlabeled_net_extract(top.copy("flat").flatten(), _get_test_gds_table())
+        self.assertEqual( len(flat.cells), 13 )
+        polygons, _, nets = get_window_polygons(abstracts, "top", abstracts["top"].bbox)
+        self.assertEqual( len(polygons), 3 * 4 * 3 + 3 + 4 )
+        pairs = set()
+        for poly, net in zip(polygons, nets):
+            center = poly.points.mean(axis = 0)
+            for flatNet, cell in enumerate(flat.cells):
+                if any(
+                    (other.layer, other.datatype) == (poly.layer, poly.datatype) and gdstk.inside([center], other)[0]
+                    for other in cell.polygons
+                ):
+                    pairs.add((int(net), flatNet))
+        self.assertEqual( len(pairs), 13 )
+        self.assertEqual( len({net for net, _ in pairs}), 13 )
+        self.assertEqual( len({flatNet for _, flatNet in pairs}), 13 )
+        # the fragments are instantiated under the reference transforms
+        table = abstracts["leaf"].fragments
+        rotated = transform_fragment_table(table, abstracts["top"].transforms[1])
+        area = lambda boxes: ((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])).sum()
+        self.assertAlmostEqual( area(rotated.boxes), area(table.boxes) )
+        self.assertEqual( rotated.neighbours.tolist(), table.neighbours.tolist() )
+        # the assembled mesh joins the fragments of the levels into the nets
+        mesh = assemble_fragment_mesh(abstracts, "top")
+        labels = SpeedsterConnectionGraph(np.concatenate([mesh.neighbours, mesh.vias]), mesh.layers).connected_components()
+        self.assertEqual( labels.max() + 1, 13 )
+        self.assertEqual( len(mesh.vias), 10 )
+        # a via of the parent landing on the metal of a child cuts the child fragments
+        bar = gdstk.Cell("bar")
+        bar.add( gdstk.rectangle( (0.0, 0.0), (10.0, 1.0), **met1 ) )
+        top = gdstk.Cell("top")
+        top.add(
+            gdstk.Reference(bar, (0.0, 0.0)),
+            gdstk.rectangle( (4.2, 0.2), (4.8, 0.8), **via ),
+            gdstk.rectangle( (4.0, 0.0), (5.0, 10.0), **met2 ),
+        )
+        abstracts = hierarchical_extract(top, _get_test_gds_table())
+        self.assertEqual( abstracts["top"].boundaryVias.tolist(), [[4.2, 0.2, 4.8, 0.8]] )
+        mesh = assemble_fragment_mesh(abstracts, "top")
+        self.assertEqual( mesh.viaShares.tolist(), [1.0] )
+        self.assertEqual( [mesh.boxes[k].tolist() for k in mesh.vias[0]], [[4.2, 0.2, 4.8, 0.8]] * 2 )
+        labels = SpeedsterConnectionGraph(np.concatenate([mesh.neighbours, mesh.vias]), mesh.layers).connected_components()
+        self.assertEqual( labels.max() + 1, 1 )
+        self.assertAlmostEqual( area(mesh.boxes), 20.0 )
+
+    def test_roi_net_extract(self):
+        ports = [
+            SpeedsterPort(name = "a", location = [0.5, 0.5], layer = "met1"),
+            SpeedsterPort(name = "b", location = [0.5, 5.0], layer = "met2"),
+        ]
+        self.assertEqual( get_port_window(ports).tolist(), [-1.75, -1.75, 2.75, 7.25] )
+        self.assertEqual( get_port_window(ports, 0.5).tolist(), [0.0, 0.0, 1.0, 5.5] )
+        layout = _get_test_layout()
+        # a far away net, never clipped into the window
+        layout.add( gdstk.rectangle( (100.0, 100.0), (110.0, 101.0), layer = 68, datatype = 20 ) )
+        store = SpeedsterPolygonStore.from_cell(layout)
+        self.assertEqual( len(clip_layout(store, get_port_window(ports, 0.5))), 3 )
+        reference = _unlabeled_net_extraction(
+            gdstk.rectangle( (0.0, 0.0), (1.0, 1.0), layer = 68, datatype = 20 ), layout, _get_test_gds_table()
+        )
+        # the window grows until the net is closed inside it
+        for margin in [None, 0.1, 50.0]:
+            net = roi_net_extract(layout, _get_test_gds_table(), ports, margin = margin)
+            self.assertEqual( get_polygon_hashes(net.polygons), get_polygon_hashes(reference.polygons) )
+        lib = gdstk.read_gds(os.path.join(dataPath, "crossed_metal.gds"))
+        nets = _total_unlabeled_net_extract(lib.top_level()[0], _get_test_gds_table())
+        store = SpeedsterPolygonStore.from_cell(lib.top_level()[0])
+        for reference in nets.cells:
+            entry = [p for p in reference.polygons if (p.layer, p.datatype) == (68, 20)][0]
+            port = SpeedsterPort(name = "a", location = entry.points.mean(axis = 0).tolist(), layer = "met1")
+            net = roi_net_extract(store, _get_test_gds_table(), [port], margin = 0.1)
+            self.assertEqual( get_polygon_hashes(net.polygons), get_polygon_hashes(reference.polygons) )
+
+    def test_lazy_net_extract(self):
+        met1 = dict(layer = 68, datatype = 20)
+        via = dict(layer = 68, datatype = 44)
+        met2 = dict(layer = 69, datatype = 20)
+        leaf = gdstk.Cell("leaf")
+        leaf.add(
+            gdstk.rectangle( (0.0, 0.0), (2.0, 1.0), **met1 ),
+            gdstk.rectangle( (0.5, 0.25), (0.75, 0.75), **via ),
+            gdstk.rectangle( (0.25, 0.0), (1.0, 3.0), **met2 ),
+        )
+        row = gdstk.Cell("row")
+        row.add( gdstk.Reference(leaf, (0.0, 0.0), columns = 10, rows = 1, spacing = (2.0, 0.0)) )
+        top = gdstk.Cell("top")
+        top.add(
+            gdstk.Reference(row, (0.0, 0.0)),
+            gdstk.Reference(row, (0.0, 10.0), rotation = np.pi),
+            gdstk.Reference(row, (0.0, 20.0), columns = 1, rows = 10, spacing = (0.0, 10.0)),
+        )
+        # a top level strap joins the met2 of the first row
+        top.add( gdstk.rectangle( (0.0, 2.5), (20.0, 3.0), **met2 ) )
+        flat = top.copy("flat").flatten()
+        for entry in [
+            gdstk.rectangle( (0.0, 0.0), (1.0, 1.0), **met1 ),
+            gdstk.rectangle( (-1.0, 9.0), (0.0, 10.0), **met1 ),
+        ]:
+            layout = SpeedsterLazyLayout(top, list(_get_test_gds_table().getDrawingMetalLayersMap().values()))
+            net = lazy_net_extract(entry, layout, _get_test_gds_table())
+            reference = _unlabeled_net_extraction(entry, flat, _get_test_gds_table())
+            self.assertEqual( get_polygon_hashes(net.polygons), get_polygon_hashes(reference.polygons) )
+            # only the row reached by the net is materialized, the other 11 rows stay pending
+            self.assertEqual( len(layout), 1 + 12 + 10 )
+            self.assertEqual( np.count_nonzero(~layout.pending), 1 + 1 + 10 )
+
+    def test_connection_graph(self):
+        rng = np.random.default_rng(1)
+        n = 200
+        edges = rng.integers(0, n, size = (150, 2))
+        graph = SpeedsterConnectionGraph(edges, np.zeros(n))
+        # reference nets, labelled by a breadth first search from their smallest node
+        adjacency = [set() for _ in range(n)]
+        for a, b in edges:
+            adjacency[a].add(b)
+            adjacency[b].add(a)
+        labels = np.full(n, -1)
+        for start in range(n):
+            frontier = [start] if labels[start] < 0 else []
+            while len(frontier) > 0:
+                labels[frontier] = start
+                frontier = [node for node in set().union(*(adjacency[k] for k in frontier)) if labels[node] < 0]
+        self.assertEqual(
+            [list(net) for net in graph.get_nets()],
+            [list(np.flatnonzero(labels == label)) for label in np.unique(labels)]
+        )
+        self.assertEqual( list(graph.get_net(edges[0][1])), list(graph.get_net(edges[0][0])) )
+        self.assertIn( edges[0][1], graph.neighbours(edges[0][0]) )
+    
+    def test_unlabeled_net_extraction(self):
+        entry = gdstk.rectangle( (0.0, 0.0), (1.0, 1.0), layer = 68, datatype = 20 )
+        net = _unlabeled_net_extraction(entry, _get_test_layout(), _get_test_gds_table(), "vdd")
+        self.assertEqual( len(net.polygons), 5 )
+        self.assertEqual( len(get_polygon_hashes(net.polygons)), 5 )
+        # early exit once the port on met2 is reached
+        port = SpeedsterPort(name = "out", location = [0.5, 5.0], layer = "met2")
+        net = _unlabeled_net_extraction(entry, _get_test_layout(), _get_test_gds_table(), "vdd", ports = [port])
+        self.assertEqual( sorted((p.layer, p.datatype) for p in net.polygons), [(68, 20), (68, 44), (69, 20)] )
+        # a port out of the geometry disables the early exit
+        port = SpeedsterPort(name = "out", location = [50.0, 5.0], layer = "met2")
+        net = _unlabeled_net_extraction(entry, _get_test_layout(), _get_test_gds_table(), "vdd", ports = [port])
+        self.assertEqual( len(net.polygons), 5 )
+        lib = gdstk.read_gds(os.path.join(dataPath, "crossed_metal.gds"))
+        layout = lib.top_level()[0]
+        nets = _total_unlabeled_net_extract(layout, _get_test_gds_table())
+        for reference in nets.cells:
+            entry = [p for p in reference.polygons if (p.layer, p.datatype) == (68, 20)][0]
+            net = _unlabeled_net_extraction(entry, layout, _get_test_gds_table())
+            self.assertEqual( get_polygon_hashes(net.polygons), get_polygon_hashes(reference.polygons) )
+    
+    def test_get_via_contacts_table(self):
+        table = _get_test_gds_table()
+        layout = _get_test_layout()
+        polyDict = {key: [p for p in layout.polygons if (p.layer, p.datatype) == key] for key in table.getDrawingMetalLayersMap().values()}
+        contacts = get_via_contacts_table(polyDict, list(table.getDrawingMetalLayersMap().keys()))
+        self.assertEqual( [tuple(p) for p in contacts[((68, 20), (68, 44))]], [(0, 0), (1, 1)] )
+        self.assertEqual( [tuple(p) for p in contacts[((69, 20), (68, 44))]], [(0, 0), (1, 1)] )
+        self.assertEqual( [tuple(p) for p in contacts[((69, 20), (69, 44))]], [(0, 0)] )
+        self.assertEqual( [tuple(p) for p in contacts[((70, 20), (69, 44))]], [(0, 0)] )
+    
+    def test_graph_net_extract(self):
+        layout = _get_test_layout()
+        graph = build_connection_graph(layout, _get_test_gds_table())
+        entry = gdstk.rectangle( (0.0, 9.5), (1.0, 10.0), layer = 70, datatype = 20 )
+        net = _graph_net_extract(entry, graph, "vdd")
+        self.assertEqual( len(net.polygons), 5 )
+        entry = gdstk.rectangle( (8.0, 6.0), (9.0, 7.0), layer = 69, datatype = 20 )
+        self.assertEqual( len(_graph_net_extract(entry, graph, "vss").polygons), 3 )
+        nets = _total_unlabeled_net_extract(layout, _get_test_gds_table(), graph = graph)
+        self.assertEqual( len(nets.cells), 2 )
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
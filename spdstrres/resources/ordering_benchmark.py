@@ -0,0 +1,72 @@
+"""_summary_
+Script to benchmark the fill reducing orderings of the
+direct solver of the resistance extraction engine:
+the nets of the crossed_metal.gds layout are meshed with
+decreasing cell sizes (up to millions of nodes) and the
+grounded conductance matrix of the largest net is factored
+with the symmetric minimum degree ordering of SuperLU and
+with the geometric nested dissection ordering, reporting
+the nnz of the L factor and the ordering/factor times.
+Usage: python ordering_benchmark.py [step ...]
+"""
+import os
+import sys
+import time
+import numpy as np
+import gdstk
+from spdstrutil import(
+    GdsTable,
+)
+from spdstrnet.net import(
+    _total_unlabeled_net_extract,
+)
+from spdstrres import(
+    mesh_net,
+    get_grounded_index,
+    factor_grounded_laplacian,
+    get_nested_dissection_order,
+)
+from scipy.sparse.csgraph import connected_components
+
+dataPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "spdstrnet", "resources", "data")
+steps = [float(step) for step in sys.argv[1:]] or [0.04, 0.02, 0.01, 0.007]
+
+gdsTable = GdsTable()
+gdsTable.add(68, 20, "met1", ["DRAWING"], "Metal 1")
+gdsTable.add(68, 44, "via", ["DRAWING"], "Via 1-2")
+gdsTable.add(69, 20, "met2", ["DRAWING"], "Metal 2")
+gdsTable.add(69, 44, "via2", ["DRAWING"], "Via 2-3")
+gdsTable.add(70, 20, "met3", ["DRAWING"], "Metal 3")
+
+layout = gdstk.read_gds(os.path.join(dataPath, "crossed_metal.gds")).top_level()[0]
+nets = _total_unlabeled_net_extract(layout, gdsTable)
+net = max(nets.cells, key = lambda cell: len(cell.polygons))
+
+print("{:>8} {:>10} | {:>12} {:>9} | {:>12} {:>9} {:>9}".format(
+    "step", "nodes", "nnz(L) mmd", "factor", "nnz(L) nd", "order", "factor"
+))
+for step in steps:
+    network = mesh_net(net, gdsTable, step)
+    laplacian = network.laplacian()
+    _, labels = connected_components(laplacian, directed = False)
+    reference = int(np.argmax(np.bincount(labels)[labels]))
+    reducedIndex = get_grounded_index(labels, reference)
+    grounded = np.flatnonzero(reducedIndex >= 0)
+    reduced = laplacian[grounded][:, grounded].tocsc()
+    start = time.time()
+    mmd = factor_grounded_laplacian(reduced)
+    mmdTime = time.time() - start
+    start = time.time()
+    localEdges = reducedIndex[network.edges]
+    order = get_nested_dissection_order(
+        np.asarray(network.nodeCoords)[grounded],
+        network.nodeLayers[grounded],
+        localEdges[(localEdges >= 0).all(axis = 1)],
+    )
+    orderTime = time.time() - start
+    start = time.time()
+    nd = factor_grounded_laplacian(reduced, order)
+    ndTime = time.time() - start
+    print("{:>8g} {:>10d} | {:>12d} {:>8.2f}s | {:>12d} {:>8.2f}s {:>8.2f}s".format(
+        step, len(grounded), mmd.L.nnz, mmdTime, nd.L.nnz, orderTime, ndTime
+    ))
@@ -9,11 +9,14 @@ import sys
 from loguru import logger
 import argparse
 
-from ...spdstrnet.spdstrnet.data import(
-    SpeedsterPath,
-)
 from .read import *
 from .write import *
+from .solver import *
+from .ordering import *
+from .res import *
+from .reduce import *
+from .macromodel import *
+from .rpex import *
 from .util import *
 
 def verboseInfo():
@@ -0,0 +1,356 @@
+"""_summary_
+macromodel.py contains the hierarchical resistance extraction:
+each unique subcell geometry is meshed and reduced once into a
+port to port conductance macromodel (the Schur complement of its
+resistor network onto its pin nodes), which is cached and stitched
+at the pins of every instance of the subcell in the parent network
+
+[author]    Diogo André Silvares Dias
+[date]      2026-10-16
+[contact]   das.dias@campus.fct.unl.pt
+"""
+import hashlib
+import numpy as np
+from loguru import logger
+from gdstk import(
+    Cell,
+    inside,
+)
+from .res import(
+    SpeedsterResistanceNetwork,
+    SpeedsterResistanceMatrix,
+    get_resistance_matrix,
+    mesh_net,
+)
+from .reduce import(
+    reduce_network,
+)
+from spdstrnet.data import(
+    SpeedsterPort,
+)
+from spdstrnet.hierarchy import(
+    get_reference_transforms,
+    transform_points,
+)
+from spdstrutil import(
+    GdsTable,
+    timer,
+)
+
+
+class SpeedsterMacromodel(object):
+    """_summary_
+    Port to port conductance macromodel of a subcell: the resistor
+    network of the subcell reduced onto the nodes of its pins, in the
+    subcell coordinates
+    """
+    __slots__ = [
+        "key",
+        "network",
+        "pins",
+    ]
+
+    def __init__(
+        self,
+        key: str,
+        network: SpeedsterResistanceNetwork,
+        pins: list,
+    ):
+        """_summary_
+        Args:
+            key     (str)                           : geometry key of the subcell (see get_macromodel_key)
+            network (SpeedsterResistanceNetwork)    : reduced network, whose ports are the pins
+            pins    (list)                          : list of the SpeedsterPort pins of the subcell
+        """
+        self.key = key
+        self.network = network
+        self.pins = list(pins)
+
+    def __len__(self) -> int:
+        return len(self.network)
+
+    def __str__(self) -> str:
+        return "Macromodel: {} pins, {} nodes, {} conductances".format(
+            len(self.pins), len(self.network), len(self.network.edges)
+        )
+
+
+def _get_location_key(
+    layer: str,
+    location: np.array,
+    precision: float = 1e-3,
+) -> tuple:
+    """_summary_
+    Gets the key of a pin location, snapped to the database grid
+    Args:
+        layer       (str)               : name of the layer of the pin
+        location    (np.array)          : (x, y) location of the pin
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+    Returns:
+        tuple: (layer name, x, y) key, with x and y in database units
+    """
+    x, y = np.round(np.asarray(location, dtype = float) / precision).astype(np.int64)
+    return (layer, int(x), int(y))
+
+
+def _check_port_covered(
+    cell: Cell,
+    layerMap: dict,
+    port: SpeedsterPort,
+) -> bool:
+    """_summary_
+    Checks if a port is placed over the geometry of its layer in a cell
+    Args:
+        cell        (Cell)          : Cell object
+        layerMap    (dict)          : dictionary of {"layer name": (layer, datatype)}
+        port        (SpeedsterPort) : port to be checked
+    Returns:
+        bool: True if the port location is inside a polygon of its layer
+    """
+    if port.layer not in layerMap:
+        return False
+    layer, datatype = layerMap[port.layer]
+    polygons = cell.get_polygons(depth = 0, layer = layer, datatype = datatype)
+    return len(polygons) > 0 and bool(inside([port.location], polygons)[0])
+
+
+def _get_geometry_key(
+    cell: Cell,
+    layerMap: dict,
+    keys: dict,
+    precision: float = 1e-3,
+) -> str:
+    """_summary_
+    Hashes the metal/via geometry of a cell: its own polygons, snapped to
+    the database grid and sorted, and the key and transform of each of its
+    references, so that the cells with identical geometry share a key
+    Args:
+        cell        (Cell)              : Cell object
+        layerMap    (dict)              : dictionary of {"layer name": (layer, datatype)}
+        keys        (dict)              : dictionary of {cell name: key} of the already hashed cells
+        precision   (float, optional)   : size of the database unit. Defaults to 1e-3.
+    Returns:
+        str: the geometry key of the cell
+    """
+    if cell.name in keys:
+        return keys[cell.name]
+    digest = hashlib.sha1()
+    for layer, datatype in layerMap.values():
+        polygons = sorted(
+            np.round(poly.points / precision).astype(np.int64).tobytes()
+            for poly in cell.get_polygons(depth = 0, layer = layer, datatype = datatype)
+        )
+        digest.update("{}/{}:{}".format(layer, datatype, len(polygons)).encode())
+        for points in polygons:
+            digest.update(points)
+    references = sorted(
+        _get_geometry_key(ref.cell, layerMap, keys, precision)
+        + np.round(get_reference_transforms(ref) / precision).astype(np.int64).tobytes().hex()
+        for ref in cell.references if isinstance(ref.cell, Cell)
+    )
+    for reference in references:
+        digest.update(reference.encode())
+    keys[cell.name] = digest.hexdigest()
+    return keys[cell.name]
+
+
+def get_macromodel_key(
+    cell: Cell,
+    gdsTable: GdsTable,
+    pins: list,
+    step: float = None,
+    sheetResistance: dict = None,
+    viaResistance: dict = None,
+    keys: dict = None,
+) -> str:
+    """_summary_
+    Gets the cache key of the macromodel of a subcell: the hash of its
+    geometry (see _get_geometry_key), pins and meshing parameters
+    Args:
+        cell            (Cell)      : Cell object of the subcell
+        gdsTable        (GdsTable)  : GdsTable object containing the gds information
+        pins            (list)      : list of the SpeedsterPort pins of the subcell
+        step            (float)     : maximal side of the fragments (see mesh_net)
+        sheetResistance (dict)      : dictionary of {"metal layer name": sheet resistance [Ohm/sq]}
+        viaResistance   (dict)      : dictionary of {"via layer name": resistance of a via [Ohm]}
+        keys            (dict)      : dictionary of {cell name: geometry key} of the already hashed cells (optional)
+    Returns:
+        str: the cache key of the macromodel
+    """
+    keys = keys if keys is not None else {}
+    digest = hashlib.sha1(_get_geometry_key(cell, gdsTable.getDrawingMetalLayersMap(), keys).encode())
+    digest.update(repr(sorted((pin.name, pin.layer, tuple(pin.location)) for pin in pins)).encode())
+    digest.update(repr((
+        step,
+        sorted((sheetResistance or {}).items()),
+        sorted((viaResistance or {}).items()),
+    )).encode())
+    return digest.hexdigest()
+
+
+def build_macromodel(
+    cell: Cell,
+    gdsTable: GdsTable,
+    pins: dict,
+    step: float = None,
+    sheetResistance: dict = None,
+    viaResistance: dict = None,
+    cache: dict = None,
+) -> SpeedsterMacromodel:
+    """_summary_
+    Builds (or gets from the cache) the macromodel of a subcell: the
+    subcell network is stitched from its own geometry and the macromodels
+    of its own subcells (see stitch_macromodels), and reduced onto its pins
+    Args:
+        cell            (Cell)      : Cell object of the subcell
+        gdsTable        (GdsTable)  : GdsTable object containing the gds information
+        pins            (dict)      : dictionary of {cell name: list of SpeedsterPort pins}
+        step            (float)     : maximal side of the fragments (see mesh_net)
+        sheetResistance (dict)      : dictionary of {"metal layer name": sheet resistance [Ohm/sq]}
+        viaResistance   (dict)      : dictionary of {"via layer name": resistance of a via [Ohm]}
+        cache           (dict)      : dictionary of {key: SpeedsterMacromodel} of the built macromodels (optional)
+    Returns:
+        SpeedsterMacromodel: the macromodel of the subcell
+    """
+    cache = cache if cache is not None else {}
+    key = get_macromodel_key(cell, gdsTable, pins[cell.name], step, sheetResistance, viaResistance)
+    if key not in cache:
+        network = stitch_macromodels(
+            cell, gdsTable, pins, pins[cell.name], step, sheetResistance, viaResistance, cache
+        )
+        cache[key] = SpeedsterMacromodel(key, reduce_network(network), pins[cell.name])
+        logger.info("Macromodel of {}: {}".format(cell.name, cache[key]))
+    return cache[key]
+
+
+def stitch_macromodels(
+    cell: Cell,
+    gdsTable: GdsTable,
+    pins: dict,
+    ports: list = None,
+    step: float = None,
+    sheetResistance: dict = None,
+    viaResistance: dict = None,
+    cache: dict = None,
+) -> SpeedsterResistanceNetwork:
+    """_summary_
+    Builds the resistor network of a cell from its own geometry and
+    the macromodels of its subcells: the own geometry (and the references
+    to the cells without pins, flattened) is meshed, and the conductances
+    of the macromodel of each instance are added between the nodes of its
+    transformed pins. A pin lands on the own mesh cell under it, or on a
+    node of its own, shared by the pins of the other instances at the same
+    location (e.g. abutting cells)
+    Args:
+        cell            (Cell)      : Cell object
+        gdsTable        (GdsTable)  : GdsTable object containing the gds information
+        pins            (dict)      : dictionary of {cell name: list of SpeedsterPort pins} of the subcells
+        ports           (list)      : list of SpeedsterPort objects to be placed in the network (optional)
+        step            (float)     : maximal side of the fragments (see mesh_net)
+        sheetResistance (dict)      : dictionary of {"metal layer name": sheet resistance [Ohm/sq]}
+        viaResistance   (dict)      : dictionary of {"via layer name": resistance of a via [Ohm]}
+        cache           (dict)      : dictionary of {key: SpeedsterMacromodel} of the built macromodels (optional)
+    Returns:
+        SpeedsterResistanceNetwork: the stitched resistor network of the cell
+    """
+    cache = cache if cache is not None else {}
+    ports = ports if ports is not None else []
+    layerMap = gdsTable.getDrawingMetalLayersMap()
+    layerNames = list(layerMap.keys())
+    own = Cell(cell.name)
+    own.add(*cell.get_polygons(depth = 0))
+    # the macromodel and the {pin name: location key} of each instance
+    instances = []
+    locations = {}
+    models = {}
+    for ref in cell.references:
+        if not isinstance(ref.cell, Cell):
+            continue
+        if ref.cell.name not in pins:
+            own.add(*ref.get_polygons())
+            continue
+        if ref.cell.name not in models:
+            models[ref.cell.name] = build_macromodel(ref.cell, gdsTable, pins, step, sheetResistance, viaResistance, cache)
+        model = models[ref.cell.name]
+        for transform in get_reference_transforms(ref):
+            points = transform_points([pin.location for pin in model.pins], transform)
+            keys = {}
+            for pin, point in zip(model.pins, points):
+                keys[pin.name] = _get_location_key(pin.layer, point)
+                locations.setdefault(keys[pin.name], point)
+            instances.append((model, keys))
+    # the pins covered by the own geometry are placed in the own mesh
+    pinPorts = {
+        key: SpeedsterPort(name = "pin_{}".format(k), location = list(point), layer = key[0])
+        for k, (key, point) in enumerate(locations.items())
+    }
+    pinPorts = {key: port for key, port in pinPorts.items() if _check_port_covered(own, layerMap, port)}
+    ownPorts = [port for port in ports if _check_port_covered(own, layerMap, port)]
+    if len(own.polygons) > 0:
+        network = mesh_net(own, gdsTable, step, sheetResistance, viaResistance, ownPorts + list(pinPorts.values()))
+    else:
+        network = SpeedsterResistanceNetwork(np.empty((0, 2)), np.empty(0), np.empty(0, dtype = np.int64), np.empty((0, 2)))
+    portNodes = dict(network.ports)
+    pinNodes = {key: portNodes.pop(port.name) for key, port in pinPorts.items()}
+    # the other pins are new nodes, shared by the pins of the instances at the same location
+    free = [key for key in locations if key not in pinNodes]
+    pinNodes.update({key: len(network) + k for k, key in enumerate(free)})
+    nodeLayers = np.concatenate([network.nodeLayers, [layerNames.index(key[0]) for key in free]])
+    nodeCoords = np.concatenate([np.asarray(network.nodeCoords).reshape(-1, 2)] + [locations[key].reshape(1, 2) for key in free])
+    # the ports outside of the own geometry must be placed over a pin
+    for port in ports:
+        if port.name not in portNodes:
+            key = _get_location_key(port.layer, np.asarray(port.location, dtype = float))
+            if key not in pinNodes:
+                raise ValueError("Port {} is not placed over the net geometry!".format(port.name))
+            portNodes[port.name] = pinNodes[key]
+    edges = [network.edges]
+    conductances = [network.conductances]
+    for model, keys in instances:
+        stitched = np.zeros(len(model.network), dtype = np.int64)
+        for name, node in model.network.ports.items():
+            stitched[node] = pinNodes[keys[name]]
+        edges.append(stitched[model.network.edges])
+        conductances.append(model.network.conductances)
+    logger.info("Stitched {} instances of {} macromodels in {}".format(
+        len(instances), len({model.key for model, _ in instances}), cell.name
+    ))
+    return SpeedsterResistanceNetwork(
+        np.concatenate(edges),
+        np.concatenate(conductances),
+        nodeLayers.astype(np.int64),
+        nodeCoords = nodeCoords,
+        ports = portNodes,
+    )
+
+
+@timer
+def extract_hierarchical_resistance_matrix(
+    cell: Cell,
+    gdsTable: GdsTable,
+    ports: list,
+    pins: dict,
+    step: float = None,
+    sheetResistance: dict = None,
+    viaResistance: dict = None,
+    cache: dict = None,
+) -> SpeedsterResistanceMatrix:
+    """_summary_
+    Extracts the port to port resistance matrix of a hierarchical net,
+    stitching the cached macromodels of the subcells with pins instead
+    of meshing every instance (see stitch_macromodels)
+    Args:
+        cell            (Cell)      : Cell object containing the net
+        gdsTable        (GdsTable)  : GdsTable object containing the gds information
+        ports           (list)      : list of SpeedsterPort objects placed on the net
+        pins            (dict)      : dictionary of {cell name: list of SpeedsterPort pins} of the subcells
+        step            (float)     : maximal side of the fragments (see mesh_net)
+        sheetResistance (dict)      : dictionary of {"metal layer name": sheet resistance [Ohm/sq]}
+        viaResistance   (dict)      : dictionary of {"via layer name": resistance of a via [Ohm]}
+        cache           (dict)      : dictionary of {key: SpeedsterMacromodel} of the built macromodels (optional)
+    Returns:
+        SpeedsterResistanceMatrix: (N, N) effective resistance matrix of the ports
+    """
+    network = stitch_macromodels(cell, gdsTable, pins, ports, step, sheetResistance, viaResistance, cache)
+    logger.info("{}".format(network))
+    return get_resistance_matrix(network, ports)
@@ -0,0 +1,129 @@
+"""_summary_
+ordering.py contains the fill reducing orderings of the
+conductance matrices of the resistor networks, built from
+the physical (x, y, layer) placement of the mesh nodes
+
+[author]    Diogo André Silvares Dias
+[date]      2026-10-16
+[contact]   das.dias@campus.fct.unl.pt
+"""
+import numpy as np
+
+orderings = ["mmd", "nd"]
+
+
+def _get_bisection(
+    nodes: np.array,
+    edges: np.array,
+    keys: np.array,
+    balance: float,
+) -> tuple:
+    """_summary_
+    Finds the cheapest axis aligned cut of a set of nodes: for each of the
+    (x, y, layer) keys, every threshold between the balance quantiles of the
+    nodes is scored by the number of edges it cuts (the edges whose keys
+    straddle the threshold), counted at once through sorted searches
+    Args:
+        nodes   (np.array)  : (n,) nodes of the set
+        edges   (np.array)  : (m, 2) edges with both nodes in the set
+        keys    (np.array)  : (N, 3) x, y and layer index of the nodes
+        balance (float)     : smallest fraction of the nodes on each side of the cut
+    Returns:
+        tuple: (key column, threshold) of the cut, None if the nodes cannot be split
+    """
+    best = None
+    for column in range(keys.shape[1]):
+        key = keys[:, column]
+        sortedKeys = np.sort(key[nodes])
+        lo = int(balance * len(nodes))
+        candidates = np.unique(sortedKeys[lo : len(nodes) - lo + 1])
+        candidates = candidates[candidates > sortedKeys[0]]
+        if len(candidates) == 0:
+            continue
+        a, b = key[edges[:, 0]], key[edges[:, 1]]
+        low = np.sort(np.minimum(a, b))
+        high = np.sort(np.maximum(a, b))
+        cuts = np.searchsorted(low, candidates) - np.searchsorted(high, candidates)
+        i = int(np.argmin(cuts))
+        if best is None or cuts[i] < best[0]:
+            best = (cuts[i], column, candidates[i])
+    return None if best is None else best[1:]
+
+
+def _dissect(
+    nodes: np.array,
+    edges: np.array,
+    keys: np.array,
+    side: np.array,
+    leafSize: int,
+    balance: float,
+    order: list,
+):
+    """_summary_
+    Recursive geometric bisection of a set of nodes: the set is split by
+    the cheapest balanced axis aligned cut (see _get_bisection), the
+    endpoints of the cut edges lying on the smaller side form the separator,
+    and the separator is ordered after both halves
+    Args:
+        nodes       (np.array)  : (n,) nodes of the set
+        edges       (np.array)  : (m, 2) edges with both nodes in the set
+        keys        (np.array)  : (N, 3) x, y and layer index of the nodes
+        side        (np.array)  : (N,) scratch array of the side of each node
+        leafSize    (int)       : size below which a set is not split
+        balance     (float)     : smallest fraction of the nodes on each side of the cut
+        order       (list)      : list of the ordered node sets
+    """
+    bisection = None
+    if len(nodes) > leafSize and len(edges) > 0:
+        bisection = _get_bisection(nodes, edges, keys, balance)
+    if bisection is None:
+        order.append(nodes)
+        return
+    column, threshold = bisection
+    side[nodes] = keys[nodes, column] >= threshold
+    a, b = edges[:, 0], edges[:, 1]
+    cut = side[a] != side[b]
+    ends = np.concatenate([a[cut], b[cut]])
+    left = np.unique(ends[side[ends] == 0])
+    right = np.unique(ends[side[ends] == 1])
+    separator = left if len(left) <= len(right) else right
+    side[separator] = 2
+    # the scratch sides are overwritten by the recursion, so both halves are split first
+    parts = [
+        (nodes[side[nodes] == part], edges[(side[a] == part) & (side[b] == part)])
+        for part in [0, 1]
+    ]
+    for partNodes, partEdges in parts:
+        _dissect(partNodes, partEdges, keys, side, leafSize, balance, order)
+    order.append(separator)
+
+
+def get_nested_dissection_order(
+    coords: np.array,
+    layers: np.array,
+    edges: np.array,
+    leafSize: int = 16,
+    balance: float = 0.45,
+) -> np.array:
+    """_summary_
+    Geometric nested dissection ordering of a resistor network: the nodes
+    are recursively bisected through their (x, y) coordinates and layer
+    index, cutting where the fewest resistors cross (e.g. between the
+    parallel routing tracks instead of along them), and each separator is
+    eliminated after the two halves it splits
+    Args:
+        coords      (np.array)          : (N, 2) coordinates of the nodes
+        layers      (np.array)          : (N,) layer index of the nodes
+        edges       (np.array)          : (K, 2) node pairs connected by a conductance
+        leafSize    (int, optional)     : size below which a set is not split. Defaults to 16.
+        balance     (float, optional)   : smallest fraction of the nodes on each side of a cut. Defaults to 0.45.
+    Returns:
+        np.array: (N,) elimination order of the nodes
+    """
+    coords = np.asarray(coords, dtype = float).reshape(-1, 2)
+    keys = np.column_stack([coords, np.asarray(layers, dtype = float)])
+    edges = np.asarray(edges, dtype = np.int64).reshape(-1, 2)
+    side = np.zeros(len(coords), dtype = np.int8)
+    order = [np.empty(0, dtype = np.int64)]
+    _dissect(np.arange(len(coords)), edges, keys, side, leafSize, balance, order)
+    return np.concatenate(order)
@@ -8,3 +8,52 @@ and saved in memory in YAML format
 [date]      2022-04-17
 [contact]   das.dias@campus.fct.unl.pt
 """
+
+import os
+import yaml
+from spdstrnet.data import(
+    SpeedsterPortLibrary,
+)
+
+def _readYaml(filePath = "") -> dict:
+    """_summary_
+    Reads a yaml file
+    Args:
+        filePath (str): path of the yaml file
+    Returns:
+        dict: the parsed yaml data
+    """
+    if filePath == "":
+        raise ValueError("No file name provided")
+    path = os.path.abspath(filePath)
+    if not os.path.exists(path):
+        raise ValueError("Invalid file path provided : {}".format(path))
+    with open(path, "r") as file:
+        data = yaml.safe_load(file)
+    return data if data is not None else {}
+
+def readPortLibrary(filePath = "") -> SpeedsterPortLibrary:
+    """_summary_
+    Reads the ports of a layout from a yaml file
+    of {port name: {name, ioType, resistance, location, width, layer, datatype}}
+    Args:
+        filePath (str): path of the ports file
+    Returns:
+        SpeedsterPortLibrary: the library of ports
+    """
+    portLib = SpeedsterPortLibrary()
+    portLib.parseData(_readYaml(filePath))
+    return portLib
+
+def readTechResistances(filePath = "") -> tuple:
+    """_summary_
+    Reads the resistance data of the technology from a yaml file
+    containing the "sheetResistance" {metal layer name: Ohm/sq} and
+    "viaResistance" {via layer name: Ohm} dictionaries
+    Args:
+        filePath (str): path of the technology file
+    Returns:
+        tuple: (sheet resistance dict, via resistance dict)
+    """
+    tech = _readYaml(filePath)
+    return tech.get("sheetResistance", {}), tech.get("viaResistance", {})
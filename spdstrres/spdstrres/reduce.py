@@ -0,0 +1,226 @@
+"""_summary_
+reduce.py contains the reduction algorithms of the
+resistor networks, eliminating the internal mesh nodes
+while preserving the resistance between the kept nodes
+(series/parallel collapsing, star-mesh transformation
+and Schur complement, also known as Kron reduction)
+
+[author]    Diogo André Silvares Dias
+[date]      2026-10-16
+[contact]   das.dias@campus.fct.unl.pt
+"""
+import numpy as np
+from loguru import logger
+from scipy.sparse.csgraph import connected_components
+from .res import(
+    SpeedsterResistanceNetwork,
+    get_laplacian,
+    factor_grounded_laplacian,
+)
+from spdstrutil import(
+    timer,
+)
+
+
+def coalesce_edges(
+    edges: np.array,
+    conductances: np.array,
+    nNodes: int,
+) -> tuple:
+    """_summary_
+    Collapses the parallel resistors of a network (summing their
+    conductances) and removes the self loops
+    Args:
+        edges           (np.array)  : (K, 2) node pairs connected by a conductance
+        conductances    (np.array)  : (K,) conductance of each edge
+        nNodes          (int)       : number of nodes
+    Returns:
+        tuple: ((M, 2) sorted unique edges, (M,) conductances)
+    """
+    edges = np.asarray(edges, dtype = np.int64).reshape(-1, 2)
+    a = np.minimum(edges[:, 0], edges[:, 1])
+    b = np.maximum(edges[:, 0], edges[:, 1])
+    loop = a == b
+    keys, inverse = np.unique(a[~loop] * nNodes + b[~loop], return_inverse = True)
+    g = np.bincount(inverse, weights = np.asarray(conductances, dtype = float)[~loop], minlength = len(keys))
+    return np.column_stack([keys // nNodes, keys % nNodes]), g
+
+
+def _star_mesh(
+    centers: np.array,
+    others: np.array,
+    g: np.array,
+    maxDegree: int,
+) -> tuple:
+    """_summary_
+    Star-mesh transformation of a set of independent nodes:
+    a node of degree k connected to nodes i and j through
+    conductances gi and gj is replaced by the conductance
+    gi*gj/sum(g) between i and j (series for k = 2, and a
+    dangling node simply vanishes for k = 1)
+    Args:
+        centers     (np.array)  : (E,) eliminated node of each incident edge
+        others      (np.array)  : (E,) other node of each incident edge
+        g           (np.array)  : (E,) conductance of each incident edge
+        maxDegree   (int)       : maximum degree of the eliminated nodes
+    Returns:
+        tuple: ((M, 2) new edges, (M,) new conductances)
+    """
+    order = np.argsort(centers, kind = "stable")
+    others = others[order]
+    g = g[order]
+    _, starts, counts = np.unique(centers[order], return_index = True, return_counts = True)
+    edges = [np.empty((0, 2), dtype = np.int64)]
+    conductances = [np.empty(0)]
+    for k in range(2, maxDegree + 1):
+        sel = starts[counts == k]
+        if len(sel) == 0:
+            continue
+        idx = sel[:, None] + np.arange(k)
+        nodes = others[idx]
+        gs = g[idx]
+        total = gs.sum(axis = 1)
+        i, j = np.triu_indices(k, 1)
+        edges.append(np.column_stack([nodes[:, i].ravel(), nodes[:, j].ravel()]))
+        conductances.append((gs[:, i] * gs[:, j] / total[:, None]).ravel())
+    return np.concatenate(edges), np.concatenate(conductances)
+
+
+def eliminate_low_degree_nodes(
+    nNodes: int,
+    edges: np.array,
+    conductances: np.array,
+    keep: np.array,
+    maxDegree: int = 3,
+    seed: int = 0,
+) -> tuple:
+    """_summary_
+    Eliminates the internal nodes of degree up to maxDegree through
+    series/parallel collapsing and star-mesh transformations, which
+    never increase the number of resistors for maxDegree <= 3.
+    Each round eliminates an independent set of low degree nodes
+    (the nodes with a lower random priority than all their low degree
+    neighbours) in a vectorized way, so chains of n resistors
+    collapse in O(log n) rounds
+    Args:
+        nNodes          (int)               : number of nodes
+        edges           (np.array)          : (K, 2) node pairs connected by a conductance
+        conductances    (np.array)          : (K,) conductance of each edge
+        keep            (np.array)          : (N,) boolean mask of the nodes to be kept
+        maxDegree       (int, optional)     : maximum degree of the eliminated nodes. Defaults to 3.
+        seed            (int, optional)     : seed of the elimination priorities. Defaults to 0.
+    Returns:
+        tuple: ((N,) mask of the remaining nodes, (M, 2) edges, (M,) conductances)
+    """
+    priority = np.random.default_rng(seed).permutation(nNodes)
+    alive = np.ones(nNodes, dtype = bool)
+    edges, g = coalesce_edges(edges, conductances, nNodes)
+    while True:
+        degree = np.bincount(edges.ravel(), minlength = nNodes)
+        candidate = alive & ~keep & (degree <= maxDegree)
+        if not candidate.any():
+            break
+        a, b = edges[:, 0], edges[:, 1]
+        # among adjacent candidates, only the lowest priority one is eliminated
+        both = candidate[a] & candidate[b]
+        blocked = np.zeros(nNodes, dtype = bool)
+        blocked[np.where(priority[a] > priority[b], a, b)[both]] = True
+        eliminated = candidate & ~blocked
+        atA = eliminated[a]
+        incident = atA | eliminated[b]
+        newEdges, newG = _star_mesh(
+            np.where(atA, a, b)[incident],
+            np.where(atA, b, a)[incident],
+            g[incident],
+            maxDegree,
+        )
+        edges, g = coalesce_edges(
+            np.concatenate([edges[~incident], newEdges]),
+            np.concatenate([g[~incident], newG]),
+            nNodes,
+        )
+        alive &= ~eliminated
+    return alive, edges, g
+
+
+def schur_reduce(
+    nNodes: int,
+    edges: np.array,
+    conductances: np.array,
+    keep: np.array,
+) -> np.array:
+    """_summary_
+    Schur complement (Kron reduction) of the Laplacian onto the kept nodes:
+    G = L_KK - L_KI L_II^-1 L_IK, with L_II factored once (sparse LU with a
+    fill reducing symmetric minimum degree ordering) and solved for all the
+    kept nodes at once. The internal nodes not connected to any kept node
+    carry no current and are dropped
+    Args:
+        nNodes          (int)       : number of nodes
+        edges           (np.array)  : (K, 2) node pairs connected by a conductance
+        conductances    (np.array)  : (K,) conductance of each edge
+        keep            (np.array)  : (N,) boolean mask of the nodes to be kept
+    Returns:
+        np.array: (k, k) dense reduced Laplacian of the kept nodes (in increasing node order)
+    """
+    laplacian = get_laplacian(nNodes, edges, conductances)
+    kept = np.flatnonzero(keep)
+    _, labels = connected_components(laplacian, directed = False)
+    anchored = np.zeros(labels.max() + 1, dtype = bool)
+    anchored[labels[kept]] = True
+    internal = np.flatnonzero(~keep & anchored[labels] & (np.diff(laplacian.indptr) > 0))
+    reduced = laplacian[kept][:, kept].toarray()
+    if len(internal) == 0:
+        return reduced
+    lii = laplacian[internal][:, internal].tocsc()
+    lik = laplacian[internal][:, kept]
+    x = factor_grounded_laplacian(lii).solve(lik.toarray())
+    return reduced - lik.T @ x
+
+
+@timer
+def reduce_network(
+    network: SpeedsterResistanceNetwork,
+    keep: list = None,
+    maxDegree: int = 3,
+    tolerance: float = 1e-12,
+) -> SpeedsterResistanceNetwork:
+    """_summary_
+    Reduces a resistor network onto a set of kept nodes: the low degree
+    internal nodes are eliminated first through series/parallel collapsing
+    and star-mesh transformations, and the remaining internal nodes are
+    eliminated through a sparse Schur complement. The resistance between
+    any pair of kept nodes is preserved
+    Args:
+        network     (SpeedsterResistanceNetwork)    : resistor network of the net
+        keep        (list, optional)                : nodes (or port names) to be kept. Defaults to the port nodes.
+        maxDegree   (int, optional)                 : maximum degree of the star-mesh eliminated nodes. Defaults to 3.
+        tolerance   (float, optional)               : relative threshold below which the reduced
+                                                      conductances are dropped. Defaults to 1e-12.
+    Returns:
+        SpeedsterResistanceNetwork: the reduced network, with the kept nodes renumbered in increasing order
+    """
+    nNodes = len(network)
+    if keep is None:
+        keep = list(network.ports.values())
+    keepMask = np.zeros(nNodes, dtype = bool)
+    keepMask[[network.get_port_node(node) for node in keep]] = True
+    alive, edges, g = eliminate_low_degree_nodes(
+        nNodes, network.edges, network.conductances, keepMask, maxDegree
+    )
+    logger.info("Star-mesh elimination: {} of {} nodes left".format(np.count_nonzero(alive), nNodes))
+    reduced = schur_reduce(nNodes, edges, g, keepMask)
+    kept = np.flatnonzero(keepMask)
+    newIndex = np.full(nNodes, -1, dtype = np.int64)
+    newIndex[kept] = np.arange(len(kept))
+    i, j = np.triu_indices(len(kept), 1)
+    gs = -reduced[i, j]
+    scale = np.abs(np.diag(reduced)).max(initial = 0.0)
+    significant = gs > tolerance * scale
+    return SpeedsterResistanceNetwork(
+        np.column_stack([i[significant], j[significant]]),
+        gs[significant],
+        network.nodeLayers[kept],
+        nodeCoords = network.nodeCoords[kept] if network.nodeCoords is not None else None,
+        ports = {name: int(newIndex[node]) for name, node in network.ports.items() if keepMask[node]},
+    )
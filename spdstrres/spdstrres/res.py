@@ -1,9 +1,797 @@
 """_summary_
 res.py contains the main algorithms for the
 computation of the point to point resistance
-networks throughout all the IC layout 
+networks throughout all the IC layout
 
 [author]    Diogo André Silvares Dias
 [date]      2022-04-17
 [contact]   das.dias@campus.fct.unl.pt
-"""
\ No newline at end of file
+"""
+import numpy as np
+from loguru import logger
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import splu
+from .solver import(
+    solve_cg,
+)
+from .ordering import(
+    orderings,
+    get_nested_dissection_order,
+)
+from gdstk import(
+    Cell,
+    inside,
+)
+from spdstrnet.data import(
+    SpeedsterPort,
+)
+from spdstrnet.geometry import(
+    join_overlapping_polygons_cell,
+)
+from spdstrnet.index import(
+    sweep_overlapping_boxes,
+)
+from spdstrnet.fragment import(
+    get_net_fragment_table,
+)
+from spdstrutil import(
+    GdsTable,
+    timer,
+)
+
+
+class SpeedsterResistanceNetwork(object):
+    """_summary_
+    Resistor network of an extracted net: the nodes are
+    the fragments of the routing metal layers and the edges
+    are the conductances between adjacent fragments of the same
+    polygon and between the fragments of the metals connected by a via
+    """
+    __slots__ = [
+        "edges",
+        "conductances",
+        "nodeLayers",
+        "nodeCoords",
+        "ports",
+    ]
+
+    def __init__(
+        self,
+        edges: np.array,
+        conductances: np.array,
+        nodeLayers: np.array,
+        nodeCoords: np.array = None,
+        ports: dict = None,
+    ):
+        """_summary_
+        Args:
+            edges           (np.array)  : (K, 2) node pairs connected by a conductance
+            conductances    (np.array)  : (K,) conductance of each edge [S]
+            nodeLayers      (np.array)  : (N,) layer index of each node
+            nodeCoords      (np.array)  : (N, 2) coordinates of each node (optional)
+            ports           (dict)      : dictionary of {port name: node} (optional)
+        """
+        self.edges = np.asarray(edges, dtype = np.int64).reshape(-1, 2)
+        self.conductances = np.asarray(conductances, dtype = float)
+        if len(self.conductances) != len(self.edges):
+            raise ValueError("There must be a conductance for each edge!")
+        self.nodeLayers = np.asarray(nodeLayers)
+        self.nodeCoords = nodeCoords
+        self.ports = ports if ports is not None else {}
+
+    def __len__(self) -> int:
+        return len(self.nodeLayers)
+
+    def __str__(self) -> str:
+        return "Resistance Network: {} nodes, {} resistors, {} ports".format(
+            len(self), len(self.edges), len(self.ports)
+        )
+
+    def get_port_node(
+        self,
+        port,
+    ) -> int:
+        """_summary_
+        Args:
+            port (str | SpeedsterPort | int): port name, port or node
+        Returns:
+            int: the node of the port
+        """
+        if isinstance(port, SpeedsterPort):
+            port = port.name
+        if isinstance(port, str):
+            if port not in self.ports:
+                raise KeyError("Port {} is not part of the network".format(port))
+            return self.ports[port]
+        return int(port)
+
+    def laplacian(self):
+        """_summary_
+        Returns:
+            csr_matrix: the (N, N) weighted Laplacian (conductance matrix) of the network
+        """
+        return get_laplacian(len(self), self.edges, self.conductances)
+
+
+def get_laplacian(
+    nNodes: int,
+    edges: np.array,
+    conductances: np.array,
+):
+    """_summary_
+    Assembles the weighted Laplacian of a resistor network
+    (the nodal analysis conductance matrix), stamping each
+    conductance on the (a, a), (b, b), (a, b) and (b, a) entries.
+    The diagonal is accumulated beforehand through bincount, so only
+    2K + N COO triplets are converted to CSR (summing the duplicates)
+    Args:
+        nNodes          (int)       : number of nodes
+        edges           (np.array)  : (K, 2) node pairs connected by a conductance
+        conductances    (np.array)  : (K,) conductance of each edge
+    Returns:
+        csr_matrix: (N, N) Laplacian
+    """
+    edges = np.asarray(edges, dtype = np.int64).reshape(-1, 2)
+    g = np.asarray(conductances, dtype = float)
+    a, b = edges[:, 0], edges[:, 1]
+    nodes = np.arange(nNodes)
+    diagonal = np.bincount(a, g, nNodes) + np.bincount(b, g, nNodes)
+    rows = np.concatenate([nodes, a, b])
+    cols = np.concatenate([nodes, b, a])
+    data = np.concatenate([diagonal, -g, -g])
+    return coo_matrix((data, (rows, cols)), shape = (nNodes, nNodes)).tocsr()
+
+
+def get_fragment_conductances(
+    lengths: np.array,
+    widths: np.array,
+    sheetResistances: np.array,
+) -> np.array:
+    """_summary_
+    Computes the conductance of rectangular fragments of metal,
+    G = W / (Rs * L), with the current flowing along the length
+    Args:
+        lengths             (np.array)          : (K,) lengths of the fragments
+        widths              (np.array)          : (K,) widths of the fragments
+        sheetResistances    (np.array | float)  : (K,) sheet resistance of each fragment [Ohm/sq]
+                                                  (e.g. the layer resistances indexed by the fragment layers)
+    Returns:
+        np.array: (K,) conductance of each fragment [S]
+    """
+    lengths = np.asarray(lengths, dtype = float)
+    if np.any(lengths <= 0.0):
+        raise ValueError("The fragment lengths must be positive!")
+    return np.asarray(widths, dtype = float) / (np.asarray(sheetResistances, dtype = float) * lengths)
+
+
+def stamp_fragments(
+    nNodes: int,
+    nodePairs: np.array,
+    lengths: np.array,
+    widths: np.array,
+    sheetResistances: np.array,
+) -> tuple:
+    """_summary_
+    Assembles the conductance matrix of a fragmented net at once:
+    the conductances of all the fragments are computed in a single
+    array expression and stamped between their node pairs
+    Args:
+        nNodes              (int)               : number of nodes
+        nodePairs           (np.array)          : (K, 2) nodes connected by each fragment
+        lengths             (np.array)          : (K,) lengths of the fragments
+        widths              (np.array)          : (K,) widths of the fragments
+        sheetResistances    (np.array | float)  : (K,) sheet resistance of each fragment [Ohm/sq]
+    Returns:
+        tuple: ((K,) conductances, (N, N) csr_matrix Laplacian)
+    """
+    conductances = get_fragment_conductances(lengths, widths, sheetResistances)
+    return conductances, get_laplacian(nNodes, nodePairs, conductances)
+
+
+def get_node_labels(
+    nNodes: int,
+    edges: np.array,
+) -> np.array:
+    """_summary_
+    Labels the connected components of a resistor network straight
+    from its edges, without assembling the weighted Laplacian
+    Args:
+        nNodes  (int)       : number of nodes
+        edges   (np.array)  : (K, 2) node pairs connected by a conductance
+    Returns:
+        np.array: (N,) connected component of each node
+    """
+    edges = np.asarray(edges, dtype = np.int64).reshape(-1, 2)
+    adjacency = coo_matrix((np.ones(len(edges), dtype = np.int8), (edges[:, 0], edges[:, 1])), shape = (nNodes, nNodes))
+    _, labels = connected_components(adjacency, directed = False)
+    return labels
+
+
+def get_grounded_index(
+    labels: np.array,
+    reference: int,
+) -> np.array:
+    """_summary_
+    Numbers the nodes of the grounded system of a reference node:
+    the nodes connected to the reference, except the reference itself
+    Args:
+        labels      (np.array)  : (N,) connected component of each node
+        reference   (int)       : reference (ground) node
+    Returns:
+        np.array: (N,) index of each node in the grounded system, -1 if removed
+    """
+    keep = labels == labels[reference]
+    keep[reference] = False
+    nodes = np.flatnonzero(keep)
+    reducedIndex = np.full(len(labels), -1, dtype = np.int64)
+    reducedIndex[nodes] = np.arange(len(nodes))
+    return reducedIndex
+
+
+def ground_laplacian(
+    laplacian,
+    reference: int,
+) -> tuple:
+    """_summary_
+    Grounds the reference node of a Laplacian: the reference
+    row and column are removed, together with all the nodes
+    not connected to the reference (which would render the
+    system singular)
+    Args:
+        laplacian   (csr_matrix)    : (N, N) Laplacian
+        reference   (int)           : reference (ground) node
+    Returns:
+        tuple: (reduced csc_matrix, (N,) index of each node in the reduced system, -1 if removed)
+    """
+    _, labels = connected_components(laplacian, directed = False)
+    reducedIndex = get_grounded_index(labels, reference)
+    nodes = np.flatnonzero(reducedIndex >= 0)
+    return laplacian[nodes][:, nodes].tocsc(), reducedIndex
+
+
+class SpeedsterOrderedFactor(object):
+    """_summary_
+    Factorization of a symmetrically permuted matrix A[order][:, order],
+    solving the systems of the original matrix A
+    """
+    __slots__ = [
+        "factor",
+        "order",
+        "inverse",
+    ]
+
+    def __init__(
+        self,
+        factor,
+        order: np.array,
+    ):
+        """_summary_
+        Args:
+            factor  (SuperLU)   : factorization of the permuted matrix
+            order   (np.array)  : (n,) elimination order of the rows/columns of A
+        """
+        self.factor = factor
+        self.order = np.asarray(order, dtype = np.int64)
+        self.inverse = np.argsort(self.order)
+
+    @property
+    def L(self):
+        return self.factor.L
+
+    @property
+    def U(self):
+        return self.factor.U
+
+    def solve(
+        self,
+        rhs: np.array,
+    ) -> np.array:
+        """_summary_
+        Args:
+            rhs (np.array): (n,) or (n, k) right-hand side of A x = rhs
+        Returns:
+            np.array: the solution x
+        """
+        return self.factor.solve(np.asarray(rhs)[self.order])[self.inverse]
+
+
+def factor_grounded_laplacian(
+    reduced,
+    order: np.array = None,
+):
+    """_summary_
+    Factors a grounded Laplacian. The grounded conductance matrix
+    of a connected network is symmetric positive definite, so the
+    LU factorization is performed in symmetric mode, with a
+    symmetric minimum degree ordering and without pivoting.
+    Given an elimination order (e.g. get_nested_dissection_order),
+    the permuted matrix is factored in its natural order instead
+    Args:
+        reduced (csc_matrix)            : grounded Laplacian (see ground_laplacian)
+        order   (np.array, optional)    : (n,) elimination order of the nodes. Defaults to None.
+    Returns:
+        SuperLU | SpeedsterOrderedFactor: the factorization of the grounded Laplacian
+    """
+    if order is None:
+        return splu(
+            reduced,
+            permc_spec = "MMD_AT_PLUS_A",
+            diag_pivot_thresh = 0.0,
+            options = dict(SymmetricMode = True),
+        )
+    factor = splu(
+        reduced[order][:, order].tocsc(),
+        permc_spec = "NATURAL",
+        diag_pivot_thresh = 0.0,
+        options = dict(SymmetricMode = True),
+    )
+    return SpeedsterOrderedFactor(factor, order)
+
+
+def get_ptp_resistance(
+    network: SpeedsterResistanceNetwork,
+    portA,
+    portB,
+) -> float:
+    """_summary_
+    Computes the point to point resistance between two ports:
+    port B is grounded, a unit current is injected in port A and
+    the grounded conductance system is solved through a sparse
+    LU factorization, the resistance being the voltage of port A
+    Args:
+        network (SpeedsterResistanceNetwork)    : resistor network of the net
+        portA   (str | SpeedsterPort | int)     : port name, port or node
+        portB   (str | SpeedsterPort | int)     : port name, port or node
+    Returns:
+        float: the resistance between the ports [Ohm], inf if they are not connected
+    """
+    nodeA = network.get_port_node(portA)
+    nodeB = network.get_port_node(portB)
+    if nodeA == nodeB:
+        return 0.0
+    reduced, reducedIndex = ground_laplacian(network.laplacian(), nodeB)
+    if reducedIndex[nodeA] < 0:
+        return np.inf
+    rhs = np.zeros(reduced.shape[0])
+    rhs[reducedIndex[nodeA]] = 1.0
+    voltages = factor_grounded_laplacian(reduced).solve(rhs)
+    return float(voltages[reducedIndex[nodeA]])
+
+
+class SpeedsterResistanceMatrix(object):
+    """_summary_
+    Port to port effective resistance matrix of a net,
+    indexed by the port names
+    """
+    __slots__ = [
+        "names",
+        "r",
+    ]
+
+    def __init__(
+        self,
+        names: list,
+        r: np.array,
+    ):
+        """_summary_
+        Args:
+            names   (list)      : names of the ports
+            r       (np.array)  : (N, N) symmetric matrix of effective resistances [Ohm]
+        """
+        self.names = list(names)
+        self.r = np.asarray(r, dtype = float)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __str__(self) -> str:
+        return "Resistance Matrix: {}\n{}".format(self.names, self.r)
+
+    def __getitem__(self, key: tuple) -> float:
+        portA, portB = key
+        return float(self.r[self.names.index(portA), self.names.index(portB)])
+
+    def __dict__(self) -> dict:
+        return {
+            portA: {portB: float(self.r[i, j]) for j, portB in enumerate(self.names)}
+            for i, portA in enumerate(self.names)
+        }
+
+
+def get_resistance_matrix(
+    network: SpeedsterResistanceNetwork,
+    ports: list = None,
+    solver: str = "direct",
+    tolerance: float = 1e-8,
+    preconditioner: str = "auto",
+    ordering: str = "mmd",
+) -> SpeedsterResistanceMatrix:
+    """_summary_
+    Computes the effective resistance between every pair of ports,
+    factoring the conductance matrix once per connected component
+    of the network. The first port of each component is grounded,
+    a unit current is injected in each of the other ports as a single
+    blocked multi right-hand side solve, and the grounded impedance
+    matrix Z gives R(i, j) = Z(i, i) + Z(j, j) - 2 Z(i, j).
+    For the meshes too large to be factored, the "cg" solver solves
+    the grounded systems by matrix-free preconditioned conjugate gradient
+    Args:
+        network         (SpeedsterResistanceNetwork)    : resistor network of the net
+        ports           (list)                          : port names, ports or nodes. Defaults to all the network ports
+        solver          (str)                           : "direct" (sparse LU) or "cg". Defaults to "direct".
+        tolerance       (float)                         : relative residual tolerance of the cg solver. Defaults to 1e-8.
+        preconditioner  (str)                           : preconditioner of the cg solver (see get_preconditioner).
+                                                          Defaults to "auto".
+        ordering        (str)                           : elimination ordering of the direct solver, "mmd" (minimum
+                                                          degree) or "nd" (geometric nested dissection of the node
+                                                          coordinates and layers). Defaults to "mmd".
+    Returns:
+        SpeedsterResistanceMatrix: (N, N) effective resistance matrix, inf between disconnected ports
+    """
+    if ports is None:
+        ports = list(network.ports.keys())
+    names = [port.name if isinstance(port, SpeedsterPort) else port for port in ports]
+    nodes = np.array([network.get_port_node(port) for port in ports], dtype = np.int64)
+    if solver not in ["direct", "cg"]:
+        raise ValueError("Unknown solver {}! Choose direct or cg".format(solver))
+    if ordering not in orderings:
+        raise ValueError("Unknown ordering {}! Choose one of {}".format(ordering, orderings))
+    if ordering == "nd" and network.nodeCoords is None:
+        raise ValueError("The nested dissection ordering requires the node coordinates!")
+    r = np.full((len(nodes), len(nodes)), np.inf)
+    np.fill_diagonal(r, 0.0)
+    # the cg solver applies the Laplacian from the edge arrays, so it is only assembled for the direct solver
+    laplacian = network.laplacian() if solver == "direct" else None
+    labels = get_node_labels(len(network), network.edges)
+    for label in np.unique(labels[nodes]):
+        members = np.flatnonzero(labels[nodes] == label)
+        if len(members) < 2:
+            continue
+        reducedIndex = get_grounded_index(labels, nodes[members[0]])
+        rows = reducedIndex[nodes[members]]
+        # the reference port (and the ports placed over it) have null voltage
+        injected = np.flatnonzero(rows >= 0)
+        z = np.zeros((len(members), len(members)))
+        if len(injected) > 0:
+            grounded = np.flatnonzero(reducedIndex >= 0)
+            rhs = np.zeros((len(grounded), len(injected)))
+            rhs[rows[injected], np.arange(len(injected))] = 1.0
+            if solver == "cg":
+                voltages = solve_cg(
+                    network.edges, network.conductances, reducedIndex, rhs,
+                    tolerance = tolerance, preconditioner = preconditioner,
+                )
+            else:
+                order = None
+                if ordering == "nd":
+                    localEdges = reducedIndex[network.edges]
+                    order = get_nested_dissection_order(
+                        np.asarray(network.nodeCoords)[grounded],
+                        network.nodeLayers[grounded],
+                        localEdges[(localEdges >= 0).all(axis = 1)],
+                    )
+                voltages = factor_grounded_laplacian(laplacian[grounded][:, grounded].tocsc(), order).solve(rhs)
+            z[np.ix_(injected, injected)] = voltages[rows[injected]]
+        zDiag = np.diag(z)
+        r[np.ix_(members, members)] = zDiag[:, None] + zDiag[None, :] - z - z.T
+    return SpeedsterResistanceMatrix(names, r)
+
+
+def _rasterize_layer(
+    polygons: list,
+    origin: np.array,
+    shape: tuple,
+    step: float,
+) -> np.array:
+    """_summary_
+    Rasterizes the polygons of a layer on a regular grid,
+    testing the center of each grid cell
+    Args:
+        polygons    (list)      : list of Polygon objects
+        origin      (np.array)  : (x, y) lower left corner of the grid
+        shape       (tuple)     : (rows, columns) of the grid
+        step        (float)     : size of the grid cells
+    Returns:
+        np.array: (rows, columns) index of the polygon covering each cell (-1 if uncovered)
+    """
+    owner = np.full(shape, -1, dtype = np.int64)
+    for k, poly in enumerate(polygons):
+        (bx0, by0), (bx1, by1) = poly.bounding_box()
+        ix0 = max(int(np.floor((bx0 - origin[0]) / step)), 0)
+        iy0 = max(int(np.floor((by0 - origin[1]) / step)), 0)
+        ix1 = min(int(np.ceil((bx1 - origin[0]) / step)), shape[1])
+        iy1 = min(int(np.ceil((by1 - origin[1]) / step)), shape[0])
+        if ix0 >= ix1 or iy0 >= iy1:
+            continue
+        x, y = np.meshgrid(
+            origin[0] + (np.arange(ix0, ix1) + 0.5) * step,
+            origin[1] + (np.arange(iy0, iy1) + 0.5) * step,
+        )
+        covered = np.array(inside(np.column_stack([x.ravel(), y.ravel()]), [poly]), dtype = bool)
+        window = owner[iy0:iy1, ix0:ix1]
+        window[covered.reshape(window.shape)] = k
+    return owner
+
+
+@timer
+def mesh_net(
+    net: Cell,
+    gdsTable: GdsTable,
+    step: float = None,
+    sheetResistance: dict = None,
+    viaResistance: dict = None,
+    ports: list = None,
+    aspect: float = 1.0,
+    precision: float = 1e-3,
+    workers: int = 1,
+) -> SpeedsterResistanceNetwork:
+    """_summary_
+    Meshes an extracted net into a resistor network of its fragments:
+    the routing metal polygons of each layer are merged and decomposed
+    into rectangular fragments (see get_net_fragment_table), each fragment
+    being a node. The neighbouring fragments of a polygon are connected by
+    the conductance of the metal between their centres, and the fragments
+    below and above each via by their share of the via conductance. The
+    long fragments are split into pieces of bounded aspect ratio, so the
+    number of nodes follows the number of squares of the wires, not the
+    area of the net bounding box
+    Args:
+        net             (Cell)      : Cell object containing the extracted net
+        gdsTable        (GdsTable)  : GdsTable object containing the gds information
+        step            (float)     : maximal side of the fragments, to resolve the current flow
+                                      and the port locations. Defaults to None (see aspect)
+        sheetResistance (dict)      : dictionary of {"metal layer name": sheet resistance [Ohm/sq]}.
+                                      Defaults to 1.0 Ohm/sq
+        viaResistance   (dict)      : dictionary of {"via layer name": resistance of a via [Ohm]}.
+                                      Defaults to 1.0 Ohm
+        ports           (list)      : list of SpeedsterPort objects to be placed in the network (optional)
+        aspect          (float)     : maximal aspect ratio of the fragments. Defaults to 1.0.
+        precision       (float)     : size of the database unit. Defaults to 1e-3.
+        workers         (int)       : number of worker processes of the fragmentation. Defaults to 1.
+    Returns:
+        SpeedsterResistanceNetwork: resistor network of the net, with a node per fragment
+    """
+    sheetResistance = sheetResistance if sheetResistance is not None else {}
+    viaResistance = viaResistance if viaResistance is not None else {}
+    if step is not None and step <= 0:
+        raise ValueError("The mesh step must be positive!")
+    # layerMap starts in met1 layer, followed by a via, met, via ....
+    layerMap = gdsTable.getDrawingMetalLayersMap()
+    layerNames = list(layerMap.keys())
+    isVia = ["via" in name for name in layerNames]
+    # the metal layers are merged, the vias are kept whole
+    merged = join_overlapping_polygons_cell(
+        net, {name: spec for name, spec, via in zip(layerNames, layerMap.values(), isVia) if not via}, workers
+    )
+    for (layer, datatype), via in zip(layerMap.values(), isVia):
+        if via:
+            merged.add(*net.get_polygons(layer = layer, datatype = datatype))
+    table = get_net_fragment_table(merged, gdsTable, precision, workers, step, aspect)
+    if len(table) == 0:
+        raise ValueError("The net has no metal or via polygons!")
+    pairs, lengths, widths, rs = table.get_resistor_arrays(
+        [sheetResistance.get(name, 1.0) for name in layerNames]
+    )
+    viaPairs, viaConductances = table.get_via_arrays(
+        [viaResistance.get(name, 1.0) for name in layerNames]
+    )
+    # place the ports in the fragment containing their location
+    portNodes = {}
+    ports = ports if ports is not None else []
+    locations = np.array([port.location for port in ports], dtype = float).reshape(-1, 2)
+    hits = sweep_overlapping_boxes(np.concatenate([locations, locations], axis = 1), table.boxes)
+    for k, port in enumerate(ports):
+        if port.layer not in layerNames or isVia[layerNames.index(port.layer)]:
+            raise ValueError("Port {} must be placed in a routing metal layer!".format(port.name))
+        nodes = hits[hits[:, 0] == k, 1]
+        nodes = nodes[table.layers[nodes] == layerNames.index(port.layer)]
+        if len(nodes) == 0:
+            raise ValueError("Port {} is not placed over the net geometry!".format(port.name))
+        portNodes[port.name] = int(nodes[0])
+    return SpeedsterResistanceNetwork(
+        np.concatenate([pairs, viaPairs]),
+        np.concatenate([get_fragment_conductances(lengths, widths, rs), viaConductances]),
+        table.layers,
+        nodeCoords = (table.boxes[:, :2] + table.boxes[:, 2:]) / 2,
+        ports = portNodes,
+    )
+
+
+@timer
+def raster_mesh_net(
+    net: Cell,
+    gdsTable: GdsTable,
+    step: float = None,
+    sheetResistance: dict = None,
+    viaResistance: dict = None,
+    ports: list = None,
+) -> SpeedsterResistanceNetwork:
+    """_summary_
+    Meshes an extracted net into a resistor network on a regular grid,
+    as a reference for debugging mesh_net: each routing
+    metal layer is rasterized on a regular grid of square cells, each
+    cell being a node connected to its 4 neighbours by the sheet conductance
+    of the layer (a square cell has the sheet resistance). The cells of a via
+    connect the cells of the metals below and above it, in parallel,
+    summing up to the via conductance. The grid covers the bounding box
+    of the net in every layer, so its memory and time grow with the area
+    of the bounding box over the square of the step
+    Args:
+        net             (Cell)      : Cell object containing the extracted net
+        gdsTable        (GdsTable)  : GdsTable object containing the gds information
+        step            (float)     : size of the mesh cells. Defaults to a quarter of the
+                                      smallest polygon bounding box side of the net
+        sheetResistance (dict)      : dictionary of {"metal layer name": sheet resistance [Ohm/sq]}.
+                                      Defaults to 1.0 Ohm/sq
+        viaResistance   (dict)      : dictionary of {"via layer name": resistance of a via [Ohm]}.
+                                      Defaults to 1.0 Ohm
+        ports           (list)      : list of SpeedsterPort objects to be placed in the network (optional)
+    Returns:
+        SpeedsterResistanceNetwork: resistor network of the net
+    """
+    sheetResistance = sheetResistance if sheetResistance is not None else {}
+    viaResistance = viaResistance if viaResistance is not None else {}
+    # layerMap starts in met1 layer, followed by a via, met, via ....
+    layerMap = gdsTable.getDrawingMetalLayersMap()
+    layerNames = list(layerMap.keys())
+    layerPolys = [net.get_polygons(layer = layer, datatype = datatype) for layer, datatype in layerMap.values()]
+    allPolys = [poly for polys in layerPolys for poly in polys]
+    if len(allPolys) == 0:
+        raise ValueError("The net has no metal or via polygons!")
+    boxes = np.array([np.ravel(poly.bounding_box()) for poly in allPolys])
+    if step is None:
+        step = np.min(np.minimum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])) / 4
+    if step <= 0:
+        raise ValueError("The mesh step must be positive!")
+    origin = boxes[:, :2].min(axis = 0)
+    shape = (
+        max(int(np.ceil((boxes[:, 3].max() - origin[1]) / step)), 1),
+        max(int(np.ceil((boxes[:, 2].max() - origin[0]) / step)), 1),
+    )
+    isVia = ["via" in name for name in layerNames]
+    owners = [_rasterize_layer(polys, origin, shape, step) for polys in layerPolys]
+    # number the cells of the metal layers
+    nodeIds = []
+    offset = 0
+    for layerIndex, owner in enumerate(owners):
+        ids = np.full(shape, -1, dtype = np.int64)
+        if not isVia[layerIndex]:
+            covered = owner >= 0
+            ids[covered] = offset + np.arange(np.count_nonzero(covered))
+            offset += np.count_nonzero(covered)
+        nodeIds.append(ids)
+    nodeLayers = np.empty(offset, dtype = np.int64)
+    nodeCoords = np.empty((offset, 2), dtype = float)
+    cy, cx = np.indices(shape)
+    edges = [np.empty((0, 2), dtype = np.int64)]
+    conductances = [np.empty(0)]
+    for layerIndex, ids in enumerate(nodeIds):
+        if isVia[layerIndex]:
+            # the via cells connect the metals below and above
+            if layerIndex == 0 or layerIndex + 1 >= len(nodeIds):
+                continue
+            if isVia[layerIndex - 1] or isVia[layerIndex + 1]:
+                continue
+            below = nodeIds[layerIndex - 1]
+            above = nodeIds[layerIndex + 1]
+            owner = owners[layerIndex]
+            connected = (owner >= 0) & (below >= 0) & (above >= 0)
+            if not connected.any():
+                continue
+            cells = np.bincount(owner[connected], minlength = len(layerPolys[layerIndex]))
+            r = viaResistance.get(layerNames[layerIndex], 1.0)
+            edges.append(np.column_stack([below[connected], above[connected]]))
+            conductances.append(1.0 / (r * cells[owner[connected]]))
+            continue
+        covered = ids >= 0
+        nodeLayers[ids[covered]] = layerIndex
+        nodeCoords[ids[covered]] = np.column_stack([
+            origin[0] + (cx[covered] + 0.5) * step,
+            origin[1] + (cy[covered] + 0.5) * step,
+        ])
+        g = 1.0 / sheetResistance.get(layerNames[layerIndex], 1.0)
+        for a, b in ((ids[:, :-1], ids[:, 1:]), (ids[:-1, :], ids[1:, :])):
+            adjacent = (a >= 0) & (b >= 0)
+            edges.append(np.column_stack([a[adjacent], b[adjacent]]))
+            conductances.append(np.full(np.count_nonzero(adjacent), g))
+    # place the ports in the cell containing their location
+    portNodes = {}
+    for port in (ports if ports is not None else []):
+        if port.layer not in layerNames or isVia[layerNames.index(port.layer)]:
+            raise ValueError("Port {} must be placed in a routing metal layer!".format(port.name))
+        ix = int(np.floor((port.location[0] - origin[0]) / step))
+        iy = int(np.floor((port.location[1] - origin[1]) / step))
+        node = -1
+        if 0 <= ix < shape[1] and 0 <= iy < shape[0]:
+            node = nodeIds[layerNames.index(port.layer)][iy, ix]
+        if node < 0:
+            raise ValueError("Port {} is not placed over the net geometry!".format(port.name))
+        portNodes[port.name] = int(node)
+    return SpeedsterResistanceNetwork(
+        np.concatenate(edges),
+        np.concatenate(conductances),
+        nodeLayers,
+        nodeCoords = nodeCoords,
+        ports = portNodes,
+    )
+
+
+@timer
+def extract_ptp_resistance(
+    net: Cell,
+    gdsTable: GdsTable,
+    ports: list,
+    reference = None,
+    step: float = None,
+    sheetResistance: dict = None,
+    viaResistance: dict = None,
+    solver: str = "direct",
+    tolerance: float = 1e-8,
+    ordering: str = "mmd",
+    preconditioner: str = "auto",
+) -> dict:
+    """_summary_
+    Extracts the point to point resistance between the
+    reference port and each of the other ports of a net
+    Args:
+        net             (Cell)                  : Cell object containing the extracted net
+        gdsTable        (GdsTable)              : GdsTable object containing the gds information
+        ports           (list)                  : list of SpeedsterPort objects placed on the net
+        reference       (str | SpeedsterPort)   : reference port. Defaults to the first port
+        step            (float)                 : maximal side of the fragments (see mesh_net)
+        sheetResistance (dict)                  : dictionary of {"metal layer name": sheet resistance [Ohm/sq]}
+        viaResistance   (dict)                  : dictionary of {"via layer name": resistance of a via [Ohm]}
+        solver          (str)                   : "direct" or "cg" (see get_resistance_matrix)
+        tolerance       (float)                 : relative residual tolerance of the cg solver
+        ordering        (str)                   : elimination ordering of the direct solver, "mmd" or "nd"
+        preconditioner  (str)                   : preconditioner of the cg solver (see get_preconditioner)
+    Returns:
+        dict: dictionary of {port name: resistance to the reference port [Ohm]}
+    """
+    if len(ports) == 0:
+        return {}
+    if reference is None:
+        reference = ports[0]
+    if isinstance(reference, SpeedsterPort):
+        reference = reference.name
+    matrix = extract_resistance_matrix(
+        net, gdsTable, ports, step, sheetResistance, viaResistance, solver, tolerance, ordering, preconditioner,
+    )
+    return {port.name: matrix[(port.name, reference)] for port in ports}
+
+
+@timer
+def extract_resistance_matrix(
+    net: Cell,
+    gdsTable: GdsTable,
+    ports: list,
+    step: float = None,
+    sheetResistance: dict = None,
+    viaResistance: dict = None,
+    solver: str = "direct",
+    tolerance: float = 1e-8,
+    ordering: str = "mmd",
+    preconditioner: str = "auto",
+) -> SpeedsterResistanceMatrix:
+    """_summary_
+    Extracts the port to port resistance matrix of a net,
+    meshing the net and factoring its conductance matrix once
+    Args:
+        net             (Cell)      : Cell object containing the extracted net
+        gdsTable        (GdsTable)  : GdsTable object containing the gds information
+        ports           (list)      : list of SpeedsterPort objects placed on the net
+        step            (float)     : maximal side of the fragments (see mesh_net)
+        sheetResistance (dict)      : dictionary of {"metal layer name": sheet resistance [Ohm/sq]}
+        viaResistance   (dict)      : dictionary of {"via layer name": resistance of a via [Ohm]}
+        solver          (str)       : "direct" or "cg" (see get_resistance_matrix)
+        tolerance       (float)     : relative residual tolerance of the cg solver
+        ordering        (str)       : elimination ordering of the direct solver, "mmd" or "nd"
+                                      (see get_resistance_matrix)
+        preconditioner  (str)       : preconditioner of the cg solver (see get_preconditioner)
+    Returns:
+        SpeedsterResistanceMatrix: (N, N) effective resistance matrix of the ports
+    """
+    network = mesh_net(net, gdsTable, step, sheetResistance, viaResistance, ports)
+    logger.info("{}".format(network))
+    return get_resistance_matrix(network, ports, solver, tolerance, preconditioner, ordering)
@@ -14,10 +14,49 @@ import sys
 sys.path.append("../spdstrutil")
 from spdstrutil import (
     Unimplemented,
+    readGdsTable,
 )
 from spdstrlib import (
     SpdstrWorkspace,
 )
+from spdstrnet.net import(
+    _total_unlabeled_net_extract,
+)
+from spdstrnet.stream import(
+    read_gds_store,
+)
+from .read import(
+    readPortLibrary,
+    readTechResistances,
+)
+from .res import(
+    extract_ptp_resistance,
+)
+
+def _get_net_ports(
+    net,
+    ports,
+    gdsTable,
+) -> list:
+    """_summary_
+    Gets the ports placed over the polygons of a net
+    Args:
+        net         (Cell)                  : Cell object containing the extracted net
+        ports       (SpeedsterPortLibrary)  : library of ports
+        gdsTable    (GdsTable)              : GdsTable object containing the gds information
+    Returns:
+        list: list of the SpeedsterPort objects of the net
+    """
+    layerMap = gdsTable.getDrawingMetalLayersMap()
+    ret = []
+    for port in ports:
+        if port.layer not in layerMap:
+            continue
+        layer, datatype = layerMap[port.layer]
+        if any(poly.contain(tuple(port.location)) for poly in net.get_polygons(layer = layer, datatype = datatype)):
+            ret.append(port)
+    return ret
+
 def runResPex(
     workspace: SpdstrWorkspace,
     ptp = False,
@@ -26,6 +65,61 @@ def runResPex(
     bench = False,
     netlistName = "",
     spefName = "",
-) -> Unimplemented:
-    return Unimplemented("spdstrres/rpex/runResPex")
-
+    solver = "direct",
+    tolerance = 1e-8,
+    ordering = "mmd",
+    preconditioner = "auto",
+) -> dict:
+    """_summary_
+    Runs the resistance extraction of the layout of a workspace.
+    With ptp, the nets of the layout are extracted and the point to point
+    resistance between the first port of each net (the reference) and 
+    each one of the other ports of the net is computed
+    Args:
+        workspace   (SpdstrWorkspace)   : workspace holding the layout, gds table, ports and technology files
+        ptp         (bool)              : perform point to point resistance extraction
+        vis         (bool)              : visualize the results
+        out         (bool)              : export the results
+        bench       (bool)              : benchmark the extraction
+        netlistName (str)               : name of the output netlist
+        spefName    (str)               : name of the output spef file
+        solver      (str)               : "direct" (sparse LU) or "cg" (preconditioned conjugate gradient)
+        tolerance   (float)             : relative residual tolerance of the cg solver
+        ordering    (str)               : elimination ordering of the direct solver, "mmd" (minimum degree)
+                                          or "nd" (nested dissection)
+        preconditioner (str)            : preconditioner of the cg solver (see get_preconditioner)
+    Returns:
+        dict: dictionary of {net name: {port name: resistance to the reference port [Ohm]}}
+    """
+    if not ptp:
+        return Unimplemented("spdstrres/rpex/runResPex")
+    for option, enabled in (("visualization", vis), ("output", out), ("benchmark", bench)):
+        if enabled:
+            logger.warning("Resistance extraction {} is not supported yet!".format(option))
+    gdsTable = readGdsTable(workspace.gdsTablePath)
+    # only the metal and via layers are streamed from the layout
+    layout = read_gds_store(workspace.layoutPath, list(gdsTable.getDrawingMetalLayersMap().values()))
+    ports = readPortLibrary(workspace.portsPath)
+    sheetResistance, viaResistance = {}, {}
+    if workspace.techPath != "":
+        sheetResistance, viaResistance = readTechResistances(workspace.techPath)
+    nets = _total_unlabeled_net_extract(layout, gdsTable)
+    results = {}
+    for net in nets.cells:
+        netPorts = _get_net_ports(net, ports, gdsTable)
+        if len(netPorts) < 2:
+            continue
+        results[net.name] = extract_ptp_resistance(
+            net, 
+            gdsTable, 
+            netPorts,
+            sheetResistance = sheetResistance,
+            viaResistance = viaResistance,
+            solver = solver,
+            tolerance = tolerance,
+            ordering = ordering,
+            preconditioner = preconditioner,
+        )
+        for portName, resistance in results[net.name].items():
+            logger.info("{} : {} -> {} : {:.6g} Ohm".format(net.name, netPorts[0].name, portName, resistance))
+    return results
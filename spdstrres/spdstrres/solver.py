@@ -0,0 +1,180 @@
+"""_summary_
+solver.py contains the iterative solvers of the resistor
+networks, for the meshes too large to be factored: the
+grounded conductance systems are solved by preconditioned
+conjugate gradient, applying the Laplacian directly from
+the edge arrays so that the memory stays linear in the
+number of nodes
+
+[author]    Diogo André Silvares Dias
+[date]      2026-10-16
+[contact]   das.dias@campus.fct.unl.pt
+"""
+import numpy as np
+from loguru import logger
+from scipy.sparse import coo_matrix
+from scipy.sparse.linalg import(
+    LinearOperator,
+    cg,
+    spilu,
+    spsolve_triangular,
+)
+try:
+    import pyamg
+except ImportError:
+    pyamg = None
+
+preconditioners = ["auto", "amg", "ilu", "jacobi", "none"]
+
+
+def _get_grounded_edges(
+    edges: np.array,
+    conductances: np.array,
+    reducedIndex: np.array,
+) -> tuple:
+    """_summary_
+    Maps the edges of a network onto the nodes of a grounded system.
+    The grounded node is mapped to the extra index n (held at null voltage)
+    and the edges without any node in the system are dropped
+    Args:
+        edges           (np.array)  : (K, 2) node pairs connected by a conductance
+        conductances    (np.array)  : (K,) conductance of each edge
+        reducedIndex    (np.array)  : (N,) index of each node in the grounded system, -1 if grounded or removed
+    Returns:
+        tuple: (n, (M,) first nodes, (M,) second nodes, (M,) conductances)
+    """
+    edges = np.asarray(edges, dtype = np.int64).reshape(-1, 2)
+    n = int(reducedIndex.max(initial = -1)) + 1
+    ra = reducedIndex[edges[:, 0]]
+    rb = reducedIndex[edges[:, 1]]
+    valid = (ra >= 0) | (rb >= 0)
+    ra = np.where(ra[valid] >= 0, ra[valid], n)
+    rb = np.where(rb[valid] >= 0, rb[valid], n)
+    return n, ra, rb, np.asarray(conductances, dtype = float)[valid]
+
+
+def get_laplacian_operator(
+    edges: np.array,
+    conductances: np.array,
+    reducedIndex: np.array,
+) -> LinearOperator:
+    """_summary_
+    Matrix-free grounded Laplacian: the action L x is applied straight
+    from the edge arrays, scattering the branch currents g (x[a] - x[b])
+    onto their nodes, without ever assembling the matrix
+    Args:
+        edges           (np.array)  : (K, 2) node pairs connected by a conductance
+        conductances    (np.array)  : (K,) conductance of each edge
+        reducedIndex    (np.array)  : (N,) index of each node in the grounded system, -1 if grounded or removed
+    Returns:
+        LinearOperator: (n, n) grounded Laplacian operator
+    """
+    n, ra, rb, g = _get_grounded_edges(edges, conductances, reducedIndex)
+
+    def matvec(x):
+        voltages = np.append(np.ravel(x), 0.0)
+        currents = g * (voltages[ra] - voltages[rb])
+        return (np.bincount(ra, currents, n + 1) - np.bincount(rb, currents, n + 1))[:n]
+
+    return LinearOperator((n, n), matvec = matvec, rmatvec = matvec, dtype = float)
+
+
+def get_preconditioner(
+    edges: np.array,
+    conductances: np.array,
+    reducedIndex: np.array,
+    kind: str = "auto",
+) -> LinearOperator:
+    """_summary_
+    Builds the preconditioner of the grounded Laplacian:
+        amg     : smoothed aggregation algebraic multigrid (requires pyamg)
+        ilu     : incomplete Cholesky (L D L^T) factor of the grounded
+                  Laplacian, taken from the unit lower factor and the pivots
+                  of the SuperLU incomplete factorization. It forms fill (up
+                  to 10 times the nonzeros of the Laplacian), so it is opt-in only
+        jacobi  : inverse of the diagonal, computed from the edge arrays
+        none    : no preconditioning
+        auto    : amg if pyamg is installed, jacobi otherwise, so that
+                  the memory stays linear in the number of nodes
+    Args:
+        edges           (np.array)      : (K, 2) node pairs connected by a conductance
+        conductances    (np.array)      : (K,) conductance of each edge
+        reducedIndex    (np.array)      : (N,) index of each node in the grounded system, -1 if grounded or removed
+        kind            (str, optional) : kind of preconditioner. Defaults to "auto".
+    Returns:
+        LinearOperator: the preconditioner (None if kind is "none")
+    """
+    if kind not in preconditioners:
+        raise ValueError("Unknown preconditioner {}! Choose one of {}".format(kind, preconditioners))
+    if kind == "auto":
+        kind = "amg" if pyamg is not None else "jacobi"
+    if kind == "none":
+        return None
+    n, ra, rb, g = _get_grounded_edges(edges, conductances, reducedIndex)
+    diagonal = (np.bincount(ra, g, n + 1) + np.bincount(rb, g, n + 1))[:n]
+    if kind == "jacobi":
+        return LinearOperator((n, n), matvec = lambda x: np.ravel(x) / diagonal, dtype = float)
+    inner = (ra < n) & (rb < n)
+    rows = np.concatenate([np.arange(n), ra[inner], rb[inner]])
+    cols = np.concatenate([np.arange(n), rb[inner], ra[inner]])
+    data = np.concatenate([diagonal, -g[inner], -g[inner]])
+    matrix = coo_matrix((data, (rows, cols)), shape = (n, n)).tocsr()
+    if kind == "amg":
+        if pyamg is None:
+            raise ImportError("The amg preconditioner requires the pyamg package!")
+        return pyamg.smoothed_aggregation_solver(matrix, symmetry = "symmetric").aspreconditioner(cycle = "V")
+    factor = spilu(
+        matrix.tocsc(),
+        drop_tol = 1e-4,
+        fill_factor = 10.0,
+        permc_spec = "MMD_AT_PLUS_A",
+        diag_pivot_thresh = 0.0,
+        options = dict(SymmetricMode = True),
+    )
+    # the incomplete upper factor is not exactly D L^T, so only the lower
+    # factor is used, keeping the preconditioner symmetric positive definite
+    lower = factor.L.tocsr()
+    upper = factor.L.T.tocsr()
+    pivots = factor.U.diagonal()
+    order = factor.perm_c
+    inverse = np.argsort(order)
+
+    def solve(x):
+        y = spsolve_triangular(lower, np.ravel(x)[inverse], lower = True, unit_diagonal = True) / pivots
+        return spsolve_triangular(upper, y, lower = False, unit_diagonal = True)[order]
+
+    return LinearOperator((n, n), matvec = solve, dtype = float)
+
+
+def solve_cg(
+    edges: np.array,
+    conductances: np.array,
+    reducedIndex: np.array,
+    rhs: np.array,
+    tolerance: float = 1e-8,
+    preconditioner: str = "auto",
+    maxiter: int = None,
+) -> np.array:
+    """_summary_
+    Solves a grounded conductance system L v = i through the
+    preconditioned conjugate gradient method, one column at a time
+    Args:
+        edges           (np.array)          : (K, 2) node pairs connected by a conductance
+        conductances    (np.array)          : (K,) conductance of each edge
+        reducedIndex    (np.array)          : (N,) index of each node in the grounded system, -1 if grounded or removed
+        rhs             (np.array)          : (n,) or (n, k) injected currents
+        tolerance       (float, optional)   : relative residual tolerance. Defaults to 1e-8.
+        preconditioner  (str, optional)     : kind of preconditioner (see get_preconditioner). Defaults to "auto".
+        maxiter         (int, optional)     : maximum number of iterations per column. Defaults to 10 n.
+    Returns:
+        np.array: (n,) or (n, k) node voltages
+    """
+    operator = get_laplacian_operator(edges, conductances, reducedIndex)
+    m = get_preconditioner(edges, conductances, reducedIndex, preconditioner)
+    columns = np.asarray(rhs, dtype = float).reshape(operator.shape[0], -1)
+    voltages = np.zeros_like(columns)
+    for k in range(columns.shape[1]):
+        voltages[:, k], info = cg(operator, columns[:, k], rtol = tolerance, atol = 0.0, maxiter = maxiter, M = m)
+        if info > 0:
+            logger.warning("Conjugate gradient did not converge to {:.1e} in {} iterations!".format(tolerance, info))
+    return voltages.reshape(np.shape(rhs))
@@ -9,6 +9,9 @@ from spdstrlib import (
     SpdstrWorkspaceLib,
     SpdstrWorkspace,
 )
+from .rpex import(
+    runResPex,
+)
 def handleMutuallyExclusive(argv: Namespace) -> None:
     """_summary_
     handler for the mutually exclusive options
@@ -67,4 +70,4 @@ def handleResistanceExtraction(argv : Namespace) -> None:
     workspaceJsonPath = lib[workspaceName]["fullpath"]
     workspace = read(workspaceJsonPath)
     # parse the workspace to resistance extraction brigding function, along with the remaining options
-    
\ No newline at end of file
+    return runResPex(workspace, ptp, vis, out, bench, netlistName, spefName)
@@ -1,8 +1,371 @@
 import sys
+import os
+import tempfile
+import numpy as np
+import gdstk
+import yaml
+import pytest
 sys.path.append("../spdstrres")
 from spdstrres import(
     __version__,
+    SpeedsterResistanceNetwork,
+    get_laplacian,
+    get_ptp_resistance,
+    get_fragment_conductances,
+    stamp_fragments,
+    mesh_net,
+    raster_mesh_net,
+    extract_ptp_resistance,
+    get_resistance_matrix,
+    extract_resistance_matrix,
+    get_nested_dissection_order,
+    factor_grounded_laplacian,
+    get_laplacian_operator,
+    get_preconditioner,
+    solve_cg,
+    coalesce_edges,
+    eliminate_low_degree_nodes,
+    reduce_network,
+    build_macromodel,
+    stitch_macromodels,
+    extract_hierarchical_resistance_matrix,
+    runResPex,
 )
+from spdstrres import solver
+from spdstrnet.data import(
+    SpeedsterPort,
+    SpeedsterPortType,
+)
+from spdstrutil import(
+    GdsTable,
+    writeGdsTable,
+)
+from spdstrlib import(
+    SpdstrWorkspace,
+)
+
+def _get_test_gds_table() -> GdsTable:
+    table = GdsTable()
+    table.add(68, 20, "met1", ["DRAWING"], "Metal 1")
+    table.add(68, 44, "via", ["DRAWING"], "Via 1-2")
+    table.add(69, 20, "met2", ["DRAWING"], "Metal 2")
+    return table
+
+def _get_test_net() -> gdstk.Cell:
+    """met1 strip connected through a via to a met2 strip"""
+    net = gdstk.Cell("net")
+    net.add(
+        gdstk.rectangle( (0.0, 0.0), (10.0, 1.0), layer = 68, datatype = 20 ),
+        gdstk.rectangle( (9.0, 0.0), (10.0, 1.0), layer = 68, datatype = 44 ),
+        gdstk.rectangle( (9.0, 0.0), (10.0, 10.0), layer = 69, datatype = 20 ),
+    )
+    return net
 
 def test_version():
-    assert __version__ == '0.1.2'
\ No newline at end of file
+    assert __version__ == '0.1.2'
+
+def test_get_laplacian():
+    laplacian = get_laplacian(3, [[0, 1], [1, 2], [0, 1]], [1.0, 2.0, 3.0]).toarray()
+    assert np.allclose(laplacian, [[4.0, -4.0, 0.0], [-4.0, 6.0, -2.0], [0.0, -2.0, 2.0]])
+    assert np.allclose(laplacian.sum(axis = 1), 0.0)
+
+def test_stamp_fragments():
+    # a 2 x 1 fragment of a 0.5 Ohm/sq layer and a 1 x 1 fragment of a 2.0 Ohm/sq layer
+    layerResistances = np.array([0.5, 2.0])
+    g = get_fragment_conductances([2.0, 1.0], [1.0, 1.0], layerResistances[[0, 1]])
+    assert np.allclose(g, [1.0, 0.5])
+    conductances, laplacian = stamp_fragments(3, [[0, 1], [1, 2]], [2.0, 1.0], [1.0, 1.0], layerResistances[[0, 1]])
+    assert np.allclose(conductances, g)
+    assert np.allclose(laplacian.toarray(), get_laplacian(3, [[0, 1], [1, 2]], g).toarray())
+    assert np.allclose(laplacian.toarray(), [[1.0, -1.0, 0.0], [-1.0, 1.5, -0.5], [0.0, -0.5, 0.5]])
+    with pytest.raises(ValueError):
+        get_fragment_conductances([0.0], [1.0], 1.0)
+
+def test_get_ptp_resistance():
+    # 1 Ohm in series with (2 Ohm // 2 Ohm), and an isolated node
+    network = SpeedsterResistanceNetwork(
+        [[0, 1], [1, 2], [1, 2]],
+        [1.0, 0.5, 0.5],
+        np.zeros(4),
+        ports = {"a": 0, "b": 2, "c": 3},
+    )
+    assert np.isclose(get_ptp_resistance(network, "a", "b"), 2.0)
+    assert np.isclose(get_ptp_resistance(network, "b", "a"), 2.0)
+    assert get_ptp_resistance(network, "a", "a") == 0.0
+    assert get_ptp_resistance(network, "a", "c") == np.inf
+
+def test_mesh_net():
+    strip = gdstk.Cell("strip")
+    strip.add(gdstk.rectangle( (0.0, 0.0), (10.0, 0.5), layer = 68, datatype = 20 ))
+    ports = [
+        SpeedsterPort(name = "a", location = [0.25, 0.25], layer = "met1"),
+        SpeedsterPort(name = "b", location = [9.75, 0.25], layer = "met1"),
+    ]
+    network = mesh_net(strip, _get_test_gds_table(), 0.5, {"met1": 2.0}, ports = ports)
+    assert len(network) == 20
+    assert len(network.edges) == 19
+    # 19 squares between the centers of the end cells
+    assert np.isclose(get_ptp_resistance(network, "a", "b"), 19 * 2.0)
+    # the strip is split into squares by default, as the grid of the rasterizer
+    network = mesh_net(strip, _get_test_gds_table(), sheetResistance = {"met1": 2.0}, ports = ports)
+    assert len(network) == 20
+    raster = raster_mesh_net(strip, _get_test_gds_table(), 0.5, {"met1": 2.0}, ports = ports)
+    assert np.isclose(get_ptp_resistance(network, "a", "b"), get_ptp_resistance(raster, "a", "b"))
+    # a sparse net: a 1 mm long met1 wire, a via and a 1 mm long met2 wire, 0.2 um wide
+    sparse = gdstk.Cell("sparse")
+    sparse.add(
+        gdstk.rectangle( (0.0, 0.0), (1000.0, 0.2), layer = 68, datatype = 20 ),
+        gdstk.rectangle( (999.8, 0.0), (1000.0, 0.2), layer = 68, datatype = 44 ),
+        gdstk.rectangle( (999.8, 0.0), (1000.0, 1000.0), layer = 69, datatype = 20 ),
+    )
+    ports = [
+        SpeedsterPort(name = "a", location = [0.1, 0.1], layer = "met1"),
+        SpeedsterPort(name = "b", location = [999.9, 999.9], layer = "met2"),
+    ]
+    network = mesh_net(sparse, _get_test_gds_table(), sheetResistance = {"met1": 0.1, "met2": 0.1}, viaResistance = {"via": 5.0}, ports = ports)
+    # a node per square of the wires, not per grid cell of the 1 mm x 1 mm bounding box
+    assert len(network) == 2 * 5000
+    assert np.isclose(get_ptp_resistance(network, "a", "b"), 2 * 4999 * 0.1 + 5.0)
+
+def test_get_resistance_matrix():
+    rng = np.random.default_rng(0)
+    # a random connected network (spanning chain plus random edges) and an isolated pair
+    n = 60
+    edges = np.concatenate([
+        np.column_stack([np.arange(n - 1), np.arange(1, n)]),
+        rng.integers(0, n, size = (80, 2)),
+        [[n, n + 1]],
+    ])
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    network = SpeedsterResistanceNetwork(
+        edges, rng.uniform(0.5, 2.0, len(edges)), np.zeros(n + 2),
+        ports = {"a": 0, "b": 17, "c": 31, "d": 59, "e": 31, "f": n, "g": n + 1},
+    )
+    matrix = get_resistance_matrix(network)
+    assert len(matrix) == 7
+    assert np.allclose(matrix.r, matrix.r.T)
+    for portA in network.ports:
+        for portB in network.ports:
+            assert np.isclose(matrix[(portA, portB)], get_ptp_resistance(network, portA, portB))
+    assert matrix[("c", "e")] == 0.0
+    assert matrix[("a", "f")] == np.inf
+    assert np.isclose(matrix.__dict__()["f"]["g"], 1.0 / network.conductances[-1])
+
+def test_solve_cg(monkeypatch):
+    rng = np.random.default_rng(1)
+    n = 200
+    edges = np.concatenate([
+        np.column_stack([np.arange(n - 1), np.arange(1, n)]),
+        rng.integers(0, n, size = (300, 2)),
+    ])
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    conductances = rng.uniform(0.5, 2.0, len(edges))
+    # ground the node 0
+    reducedIndex = np.arange(n) - 1
+    laplacian = get_laplacian(n, edges, conductances).toarray()[1:, 1:]
+    x = rng.normal(size = n - 1)
+    assert np.allclose(get_laplacian_operator(edges, conductances, reducedIndex) @ x, laplacian @ x)
+    rhs = rng.normal(size = (n - 1, 3))
+    assert get_preconditioner(edges, conductances, reducedIndex, "none") is None
+    for kind in ["ilu", "jacobi", "none"]:
+        voltages = solve_cg(edges, conductances, reducedIndex, rhs, tolerance = 1e-10, preconditioner = kind)
+        assert np.allclose(laplacian @ voltages, rhs)
+    with pytest.raises(ValueError):
+        get_preconditioner(edges, conductances, reducedIndex, "multigrid")
+    # without pyamg, the default falls back to the fill-free jacobi preconditioner
+    monkeypatch.setattr(solver, "pyamg", None)
+    diagonal = np.diag(laplacian)
+    assert np.allclose(get_preconditioner(edges, conductances, reducedIndex) @ x, x / diagonal)
+
+def test_get_resistance_matrix_cg(monkeypatch):
+    strip = gdstk.Cell("strip")
+    strip.add(
+        gdstk.rectangle( (0.0, 0.0), (10.0, 1.0), layer = 68, datatype = 20 ),
+        gdstk.rectangle( (4.0, 0.0), (5.0, 4.0), layer = 68, datatype = 20 ),
+        gdstk.rectangle( (20.0, 0.0), (21.0, 1.0), layer = 68, datatype = 20 ),
+    )
+    ports = [
+        SpeedsterPort(name = "a", location = [0.1, 0.5], layer = "met1"),
+        SpeedsterPort(name = "b", location = [9.9, 0.5], layer = "met1"),
+        SpeedsterPort(name = "c", location = [4.5, 3.9], layer = "met1"),
+        SpeedsterPort(name = "d", location = [20.5, 0.5], layer = "met1"),
+    ]
+    network = mesh_net(strip, _get_test_gds_table(), 0.25, ports = ports)
+    direct = get_resistance_matrix(network)
+    # the cg solver never assembles the Laplacian
+    monkeypatch.setattr(SpeedsterResistanceNetwork, "laplacian", None)
+    iterative = get_resistance_matrix(network, solver = "cg", tolerance = 1e-10)
+    assert np.allclose(iterative.r, direct.r)
+    assert iterative[("a", "d")] == np.inf
+    # a looser tolerance trades accuracy for speed
+    loose = get_resistance_matrix(network, solver = "cg", tolerance = 1e-3, preconditioner = "jacobi")
+    assert np.allclose(loose.r[:3, :3], direct.r[:3, :3], rtol = 1e-2)
+    with pytest.raises(ValueError):
+        get_resistance_matrix(network, solver = "gmres")
+
+def test_get_nested_dissection_order():
+    # a 1D chain of 100 nodes: the first separator is a single middle node
+    coords = np.column_stack([np.arange(100.0), np.zeros(100)])
+    edges = np.column_stack([np.arange(99), np.arange(1, 100)])
+    order = get_nested_dissection_order(coords, np.zeros(100), edges, leafSize = 4)
+    assert sorted(order.tolist()) == list(range(100))
+    assert 40 <= order[-1] <= 60
+    # a two layer 20 x 20 grid, connected through the corners
+    x, y = np.meshgrid(np.arange(20.0), np.arange(20.0))
+    coords = np.tile(np.column_stack([x.ravel(), y.ravel()]), (2, 1))
+    layers = np.repeat([0, 2], 400)
+    grid = np.arange(400).reshape(20, 20)
+    edges = np.concatenate([
+        np.column_stack([grid[:, :-1].ravel(), grid[:, 1:].ravel()]),
+        np.column_stack([grid[:-1].ravel(), grid[1:].ravel()]),
+    ])
+    edges = np.concatenate([edges, edges + 400, [[0, 400], [399, 799]]])
+    order = get_nested_dissection_order(coords, layers, edges)
+    assert sorted(order.tolist()) == list(range(800))
+    laplacian = get_laplacian(800, edges, np.ones(len(edges)))[1:, 1:].tocsc()
+    order = get_nested_dissection_order(coords[1:], layers[1:], edges[(edges > 0).all(axis = 1)] - 1)
+    factor = factor_grounded_laplacian(laplacian, order)
+    rhs = np.random.default_rng(0).normal(size = (799, 2))
+    assert np.allclose(laplacian @ factor.solve(rhs), rhs)
+    network = SpeedsterResistanceNetwork(edges, np.ones(len(edges)), layers, coords, {"a": 5, "b": 799, "c": 410})
+    assert np.allclose(get_resistance_matrix(network, ordering = "nd").r, get_resistance_matrix(network).r)
+    with pytest.raises(ValueError):
+        get_resistance_matrix(SpeedsterResistanceNetwork(edges, np.ones(len(edges)), layers), [5, 799], ordering = "nd")
+
+def test_eliminate_low_degree_nodes():
+    # two parallel chains of 1 Ohm resistors between the nodes 0 and 9
+    edges = [[k, k + 1] for k in range(9)] + [[0, 10], [10, 11], [11, 9]]
+    edges, g = coalesce_edges(edges + [[3, 4], [5, 5]], np.ones(len(edges) + 2), 12)
+    assert len(edges) == 12
+    assert g[np.flatnonzero((edges[:, 0] == 3) & (edges[:, 1] == 4))[0]] == 2.0
+    keep = np.zeros(12, dtype = bool)
+    keep[[0, 9]] = True
+    alive, edges, g = eliminate_low_degree_nodes(12, edges, g, keep)
+    assert np.flatnonzero(alive).tolist() == [0, 9]
+    assert edges.tolist() == [[0, 9]]
+    # 8.5 Ohm (one doubled resistor) in parallel with 3 Ohm
+    assert np.isclose(1.0 / g[0], 8.5 * 3.0 / 11.5)
+
+def test_reduce_network():
+    strip = gdstk.Cell("strip")
+    strip.add(
+        gdstk.rectangle( (0.0, 0.0), (10.0, 1.0), layer = 68, datatype = 20 ),
+        gdstk.rectangle( (4.0, 0.0), (5.0, 4.0), layer = 68, datatype = 20 ),
+    )
+    ports = [
+        SpeedsterPort(name = "a", location = [0.1, 0.5], layer = "met1"),
+        SpeedsterPort(name = "b", location = [9.9, 0.5], layer = "met1"),
+        SpeedsterPort(name = "c", location = [4.5, 3.9], layer = "met1"),
+    ]
+    network = mesh_net(strip, _get_test_gds_table(), 0.25, ports = ports)
+    matrix = get_resistance_matrix(network)
+    for maxDegree in [1, 3]:
+        reduced = reduce_network(network, maxDegree = maxDegree)
+        assert len(reduced) == 3
+        assert len(reduced.edges) == 3
+        assert np.allclose(get_resistance_matrix(reduced).r, matrix.r)
+    # keep an internal node too
+    reduced = reduce_network(network, keep = ["a", "b", 100])
+    assert len(reduced) == 3
+    assert np.isclose(get_resistance_matrix(reduced)[("a", "b")], matrix[("a", "b")])
+
+def test_stitch_macromodels():
+    unit = gdstk.Cell("unit")
+    unit.add(
+        gdstk.rectangle( (0.0, 0.0), (4.0, 1.0), layer = 68, datatype = 20 ),
+        gdstk.rectangle( (1.5, 0.0), (2.5, 3.0), layer = 68, datatype = 20 ),
+    )
+    pins = {"unit": [
+        SpeedsterPort(name = "l", location = [0.125, 0.5], layer = "met1"),
+        SpeedsterPort(name = "r", location = [3.875, 0.5], layer = "met1"),
+        SpeedsterPort(name = "t", location = [2.0, 2.875], layer = "met1"),
+    ]}
+    network = mesh_net(unit, _get_test_gds_table(), 0.25, ports = pins["unit"])
+    cache = {}
+    model = build_macromodel(unit, _get_test_gds_table(), pins, 0.25, cache = cache)
+    assert len(model) == 3
+    assert np.allclose(get_resistance_matrix(model.network, ["l", "r", "t"]).r, get_resistance_matrix(network, ["l", "r", "t"]).r)
+    # a chain of abutting units, joined at their shared pins
+    chain = gdstk.Cell("chain")
+    chain.add( gdstk.Reference(unit, (0.0, 0.0), columns = 20, rows = 1, spacing = (3.75, 0.0)) )
+    ports = [
+        SpeedsterPort(name = "a", location = [0.125, 0.5], layer = "met1"),
+        SpeedsterPort(name = "b", location = [75.125, 0.5], layer = "met1"),
+    ]
+    stitched = stitch_macromodels(chain, _get_test_gds_table(), pins, ports, 0.25, cache = cache)
+    assert len(cache) == 1
+    assert len(stitched) == 21 + 20
+    assert np.isclose(get_resistance_matrix(stitched)[("a", "b")], 20 * get_resistance_matrix(network)[("l", "r")])
+    # a renamed copy of the unit reuses the cached macromodel, and the own geometry is meshed
+    copy = unit.copy("copy")
+    pins["copy"] = pins["unit"]
+    top = gdstk.Cell("top")
+    top.add(
+        gdstk.Reference(unit, (0.0, 0.0)),
+        gdstk.Reference(copy, (3.75, 0.0)),
+        gdstk.rectangle( (0.0, 2.5), (7.75, 3.25), layer = 68, datatype = 20 ),
+    )
+    ports = [
+        SpeedsterPort(name = "a", location = [0.125, 0.5], layer = "met1"),
+        SpeedsterPort(name = "b", location = [7.625, 3.0], layer = "met1"),
+    ]
+    matrix = extract_hierarchical_resistance_matrix(top, _get_test_gds_table(), ports, pins, 0.25, cache = cache)
+    assert len(cache) == 1
+    flat = extract_resistance_matrix(top.copy("flat").flatten(), _get_test_gds_table(), ports, 0.25)
+    # the instances only connect at their pins
+    assert np.isclose(matrix[("a", "b")], flat[("a", "b")], rtol = 0.15)
+
+def test_extract_ptp_resistance():
+    ports = [
+        SpeedsterPort(name = "a", location = [0.25, 0.5], layer = "met1"),
+        SpeedsterPort(name = "b", location = [9.5, 9.75], layer = "met2"),
+    ]
+    res = extract_ptp_resistance(
+        _get_test_net(), _get_test_gds_table(), ports,
+        step = 0.25, sheetResistance = {"met1": 1e-3, "met2": 1e-3}, viaResistance = {"via": 10.0},
+    )
+    assert res["a"] == 0.0
+    # the via dominates the resistance of the net
+    assert 10.0 < res["b"] < 10.0 + 20 * 1e-3
+    matrix = extract_resistance_matrix(
+        _get_test_net(), _get_test_gds_table(), ports,
+        step = 0.25, sheetResistance = {"met1": 1e-3, "met2": 1e-3}, viaResistance = {"via": 10.0},
+    )
+    assert np.isclose(matrix[("b", "a")], res["b"])
+    nested = extract_ptp_resistance(
+        _get_test_net(), _get_test_gds_table(), ports,
+        step = 0.25, sheetResistance = {"met1": 1e-3, "met2": 1e-3}, viaResistance = {"via": 10.0}, ordering = "nd",
+    )
+    assert np.isclose(nested["b"], res["b"])
+    iterative = extract_ptp_resistance(
+        _get_test_net(), _get_test_gds_table(), ports,
+        step = 0.25, sheetResistance = {"met1": 1e-3, "met2": 1e-3}, viaResistance = {"via": 10.0},
+        solver = "cg", tolerance = 1e-10, preconditioner = "jacobi",
+    )
+    assert np.isclose(iterative["b"], res["b"])
+
+def test_run_res_pex():
+    with tempfile.TemporaryDirectory() as path:
+        lib = gdstk.Library()
+        lib.add(_get_test_net())
+        lib.write_gds(os.path.join(path, "layout.gds"))
+        writeGdsTable(_get_test_gds_table(), path)
+        ports = {
+            "a": {"name": "a", "ioType": "INPUT", "resistance": 0.0, "location": [0.25, 0.5], "width": 0.1, "layer": "met1", "datatype": "drawing"},
+            "b": {"name": "b", "ioType": "OUTPUT", "resistance": 0.0, "location": [9.5, 9.75], "width": 0.1, "layer": "met2", "datatype": "drawing"},
+        }
+        with open(os.path.join(path, "ports.yaml"), "w") as file:
+            yaml.dump(ports, file)
+        with open(os.path.join(path, "tech.yaml"), "w") as file:
+            yaml.dump({"sheetResistance": {"met1": 0.1, "met2": 0.1}, "viaResistance": {"via": 5.0}}, file)
+        workspace = SpdstrWorkspace("test")
+        workspace.layoutPath = os.path.join(path, "layout.gds")
+        workspace.gdsTablePath = os.path.join(path, "gds_table.yaml")
+        workspace.portsPath = os.path.join(path, "ports.yaml")
+        workspace.techPath = os.path.join(path, "tech.yaml")
+        results = runResPex(workspace, ptp = True)
+        assert list(results.keys()) == ["net_0"]
+        assert results["net_0"]["a"] == 0.0
+        assert 5.0 < results["net_0"]["b"] < 5.0 + 0.1 * 20
+        nested = runResPex(workspace, ptp = True, ordering = "nd")
+        assert np.isclose(nested["net_0"]["b"], results["net_0"]["b"])